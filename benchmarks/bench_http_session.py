@@ -0,0 +1,115 @@
+"""Compares the per-request latency of one-shot requests with the pooled session of the Client.
+
+A local stand-in server answers small JSON requests (like the folder items, breadcrumb or rating calls). The
+"before" numbers use the module level requests.get the Client used before, the "after" numbers use Client.get
+with its pooled keep-alive session.
+
+    python benchmarks/bench_http_session.py --requests 2000 --threads 8
+
+Pass --certfile/--keyfile (e.g. a self-signed pair from "openssl req -x509 -newkey rsa:2048 -nodes ...") to serve
+over TLS, which is where the saved handshakes matter most.
+"""
+import argparse
+import http.server
+import json
+import ssl
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+import urllib3
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gtagora.http.client import Client  # NOQA
+from gtagora.http.connection import ApiKeyConnection  # NOQA
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+PAYLOAD = json.dumps([{'id': i, 'name': f'item {i}', 'object_id': i} for i in range(10)]).encode()
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(fct, nr_requests, nr_threads):
+    latencies = []
+    lock = threading.Lock()
+
+    def timed(index):
+        start = time.perf_counter()
+        response = fct(f'/api/v1/folder/{index}/items/')
+        response.content
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=nr_threads) as executor:
+        list(executor.map(timed, range(nr_requests)))
+    total = time.perf_counter() - start
+    return total, latencies
+
+
+def report(name, total, latencies):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    mean = statistics.mean(latencies) * 1000
+    print(f'{name:<22} mean={mean:7.3f}ms p50={p50:7.3f}ms p99={p99:7.3f}ms '
+          f'throughput={len(latencies) / total:8.1f} req/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--certfile', default=None)
+    parser.add_argument('--keyfile', default=None)
+    args = parser.parse_args()
+
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.daemon_threads = True
+    scheme = 'http'
+    if args.certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(args.certfile, args.keyfile)
+        httpd.socket = context.wrap_socket(httpd.socket, server_side=True)
+        scheme = 'https'
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f'{scheme}://127.0.0.1:{httpd.server_address[1]}'
+
+    connection = ApiKeyConnection(url, api_key='benchmark', verify_certificate=False)
+
+    def one_shot(path):
+        return requests.get(url + path, auth=connection.get_auth(), timeout=Client.TIMEOUT,
+                            verify=connection.verify_certificate)
+
+    client = Client(connection, pool_maxsize=max(args.threads, Client.POOL_MAXSIZE))
+
+    print(f'{args.requests} requests, {args.threads} thread(s) against {url}')
+    report('before (requests.get)', *run(one_shot, args.requests, args.threads))
+    report('after (Client.get)', *run(client.get, args.requests, args.threads))
+
+    client.close()
+    httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()
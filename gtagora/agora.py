@@ -5,8 +5,13 @@ from typing import List, Union, Optional
 import urllib3
 
 from gtagora.exception import AgoraException
+from gtagora.hash_index import HashIndex, set_hash_index
+from gtagora.http.cache import ResponseCache
+from gtagora.http.chunk_size import AdaptiveChunkSize
 from gtagora.http.client import Client, ProgressCallback
 from gtagora.http.connection import ApiKeyConnection, TokenConnection
+from gtagora.http.retry import RetryPolicy
+from gtagora.models.cache import FolderPathCache, IdentityMap
 from gtagora.models.dataset import Dataset
 from gtagora.models.exam import Exam
 from gtagora.models.folder import Folder
@@ -44,7 +49,8 @@ class Agora:
         self.import_directroy = self.import_directory # for backward-compatibility.
 
     @staticmethod
-    def create(url, api_key=None, user=None, password=None, token=None):
+    def create(url, api_key=None, user=None, password=None, token=None, pool_maxsize: int = None,
+               retry_policy: RetryPolicy = None):
         """Creates an Agora instance. Prefer this method over using the Agora constructor.
 
         To authenticate use either the api_key parameter or the user and password parameter.
@@ -58,6 +64,10 @@ class Agora:
             api_key {string} -- The API key of  (default: {None})
             user {string} -- The username (default: {None})
             password {string} -- The password (default: {None})
+            pool_maxsize {int} -- The maximum number of pooled connections to the server. Raise it when the
+                                  instance is shared between many threads (default: {Client.POOL_MAXSIZE})
+            retry_policy {RetryPolicy} -- Decides which failed requests are retried and how long to wait before.
+                                          Pass RetryPolicy(max_retries=0) to disable the retries (default: {None})
 
         Returns:
             Agora -- The agora instance
@@ -66,14 +76,14 @@ class Agora:
 
         if api_key:
             connection = ApiKeyConnection(url, api_key=api_key, verify_certificate=Agora.verify_certificate)
-            client = Client(connection=connection)
+            client = Client(connection=connection, pool_maxsize=pool_maxsize, retry_policy=retry_policy)
         elif token:
             connection = TokenConnection(url, verify_certificate=Agora.verify_certificate)
-            client = Client(connection=connection)
+            client = Client(connection=connection, pool_maxsize=pool_maxsize, retry_policy=retry_policy)
             connection.token = token
         else:
             connection = TokenConnection(url, verify_certificate=Agora.verify_certificate)
-            client = Client(connection=connection)
+            client = Client(connection=connection, pool_maxsize=pool_maxsize, retry_policy=retry_policy)
             connection.login(client, user, password)
 
         if not client.check_connection():
@@ -164,6 +174,17 @@ class Agora:
         """
         return Folder.get(folder_id, http_client=self.http_client)
 
+    def get_folders(self, folder_ids: List[int]):
+        """Returns many folders. The folders are requested concurrently.
+
+        Arguments:
+            folder_ids {List[int]} -- The IDs of the folders to be retrieved
+
+        Returns:
+            tuple -- (folders, errors), see BaseModel.get_many
+        """
+        return Folder.get_many(folder_ids, http_client=self.http_client)
+
     def get_or_create_folder(self, folder_path: Path, base_folder: Folder = None):
         """Creates a path in the base folder (base_folder_id).
 
@@ -181,6 +202,23 @@ class Agora:
 
         return base_folder.get_or_create(folder_path)
 
+    def get_or_create_folders(self, folder_paths: List[Path], base_folder: Folder = None):
+        """Creates many paths in the base folder, see Folder.get_or_create_many
+
+        Arguments:
+            folder_paths {List[Path]} -- The paths to be created.
+
+        Keyword Arguments:
+            base_folder {Folder} -- The base folder. If None the root_folder is assumed. (default: {None})
+
+        Returns:
+            Dict[Path, Folder] -- The folder of every path
+        """
+        if base_folder is None:
+            base_folder = self.get_root_folder()
+
+        return base_folder.get_or_create_many(folder_paths)
+
     # Patient
     def get_patients(self, filters=None):
         return Patient.get_list(filters, http_client=self.http_client)
@@ -188,6 +226,9 @@ class Agora:
     def get_patient(self, patient_id):
         return Patient.get(patient_id, http_client=self.http_client)
 
+    def get_many_patients(self, patient_ids: List[int]):
+        return Patient.get_many(patient_ids, http_client=self.http_client)
+
     # Exam
     def get_exam_list(self, filters=None):
         return Exam.get_list(filters, http_client=self.http_client)
@@ -195,6 +236,9 @@ class Agora:
     def get_exam(self, exam_id: int):
         return Exam.get(exam_id, http_client=self.http_client)
 
+    def get_exams(self, exam_ids: List[int]):
+        return Exam.get_many(exam_ids, http_client=self.http_client)
+
     def get_exam_by_uid(self, project: Union[int, Project], uid: str):
         if isinstance(project, Project):
             project = project.id
@@ -210,6 +254,9 @@ class Agora:
     def get_series(self, series_id):
         return Series.get(series_id, http_client=self.http_client)
 
+    def get_many_series(self, series_ids: List[int]):
+        return Series.get_many(series_ids, http_client=self.http_client)
+
     def get_series_by_uid(self, project: Union[int, Project], uid: str):
         if isinstance(project, Project):
             project = project.id
@@ -221,9 +268,15 @@ class Agora:
     def get_dataset(self, dataset_id):
         return Dataset.get(dataset_id, http_client=self.http_client)
 
+    def get_datasets(self, dataset_ids: List[int]):
+        return Dataset.get_many(dataset_ids, http_client=self.http_client)
+
     def get_parameterset(self, parameterset_id):
         return ParameterSet.get(parameterset_id, http_client=self.http_client)
 
+    def get_parametersets(self, parameterset_ids: List[int]):
+        return ParameterSet.get_many(parameterset_ids, http_client=self.http_client)
+
     def get_task(self, task_id, type=TaskType.UI):
         if type == TaskType.SCRIPT:
             return self.get_script_task(task_id)
@@ -258,8 +311,10 @@ class Agora:
         return Series.search(aSearchString, self.http_client)
 
     # Import
-    def upload(self, paths: List[Path], target_folder_id: int = None, target_project_id: int = None, json_import_file: Path = None, wait=True,
-               verbose=False, relations: dict =None, progress_file:Path = None, progress_callback: Optional[ProgressCallback] = None):
+    def upload(self, paths: List[Path], target_folder_id: int = None, target_project_id: int = None,
+               json_import_file: Path = None, wait=True, verbose=False, relations: dict = None,
+               progress_file: Path = None, progress_callback: Optional[ProgressCallback] = None,
+               workers: int = None, max_bytes_in_flight: int = None):
         """Upload and import files to Agora
 
         Arguments:
@@ -271,6 +326,10 @@ class Agora:
             json_import_file {Path} -- The path to a JSON import file. Will be used to import data and parameters (default: {None})
             wait {bool} -- Wait until the full upload has been finished (default: {True})
             progress {bool} -- Show a progress (default: {False})
+            workers {int} -- The number of files or zip packages which are uploaded at the same time
+                             (default: {UploadScheduler.WORKERS})
+            max_bytes_in_flight {int} -- The maximum number of bytes held by the running uploads
+                                         (default: {UploadScheduler.MAX_BYTES})
 
         Returns:
             [type] -- [description]
@@ -290,7 +349,8 @@ class Agora:
 
         return import_data(self.http_client, paths=paths, target_folder_id=target_folder_id, target_project_id=target_project_id,
                            json_import_file=json_import_file, wait=wait, verbose=verbose, relations=relations,
-                           progress_file=progress_file, progress_callback=progress_callback)
+                           progress_file=progress_file, progress_callback=progress_callback, workers=workers,
+                           max_bytes_in_flight=max_bytes_in_flight)
 
     def create_upload_session(self, paths: List[Path] = None, progress_file:Path = None, target_folder_id: int = None,
                               json_import_file: Path = None, verbose=True, relations: dict =None):
@@ -437,5 +497,121 @@ class Agora:
     def get_vendors(self):
         return Vendor.get_list(http_client=self.http_client)
 
+    def enable_response_cache(self, path: Path = None, max_size: int = None, default_ttl: float = None,
+                              ttl_rules: List[tuple] = None):
+        """Stores the GET responses in an on-disk cache which is kept between runs
+
+        Cached responses are revalidated with a conditional request (If-None-Match/If-Modified-Since), so that an
+        unchanged response is not transferred again. Responses younger than their TTL are returned without asking
+        the server at all.
+
+        Keyword Arguments:
+            path {Path} -- The cache database (default: {~/.gtagora/http_cache.sqlite})
+            max_size {int} -- The maximum size of the cache in bytes (default: {ResponseCache.MAX_SIZE})
+            default_ttl {float} -- The TTL in seconds of the urls without a rule (default: {ResponseCache.DEFAULT_TTL})
+            ttl_rules {List[tuple]} -- (regex, seconds) tuples giving the TTL of the urls whose path matches the regex,
+                                       e.g. [(r'/parameterset/', 3600)] (default: {None})
+
+        Returns:
+            ResponseCache -- The cache
+        """
+        path = path if path else Path.home() / '.gtagora' / 'http_cache.sqlite'
+        cache = ResponseCache(path, max_size=max_size, default_ttl=default_ttl, ttl_rules=ttl_rules)
+        self.http_client.response_cache = cache
+        return cache
+
+    def enable_hash_index(self, path: Path = None):
+        """Stores the SHA-1 and SHA-256 hashes of local files in an on-disk index which is kept between runs
+
+        The existing files of a download and the uploaded files of an import are then only read again if their size,
+        modification time or inode changed. The downloaded files are hashed once right after they were written. The
+        index is used by all clients of the process.
+
+        Keyword Arguments:
+            path {Path} -- The index database (default: {~/.gtagora/hash_index.sqlite})
+
+        Returns:
+            HashIndex -- The index
+        """
+        path = path if path else Path.home() / '.gtagora' / 'hash_index.sqlite'
+        index = HashIndex(path)
+        set_hash_index(index)
+        return index
+
+    def enable_identity_map(self, max_size: int = None, ttl: float = None):
+        """Lets get_exam, get_folder, get_dataset, ... return the already loaded instance of an object instead of
+        requesting it again
+
+        The instances are kept for ttl seconds. The changes made through this library (rename, move, tag, delete, ...)
+        remove the changed object from the map, changes made by others are only seen after the TTL.
+
+        Keyword Arguments:
+            max_size {int} -- The maximum number of kept instances (default: {IdentityMap.MAX_SIZE})
+            ttl {float} -- The time in seconds an instance is kept (default: {IdentityMap.TTL})
+
+        Returns:
+            IdentityMap -- The identity map. Call clear() to forget all instances
+        """
+        identity_map = IdentityMap(max_size=max_size, ttl=ttl)
+        self.http_client.identity_map = identity_map
+        return identity_map
+
+    def enable_folder_path_cache(self, max_size: int = None, ttl: float = None):
+        """Lets get_or_create_folder, Folder.get_folder and Folder.get_or_create resolve known paths without requests
+
+        The cache learns the subfolders from the folder listings, trees and breadcrumbs and from the created folders.
+        The breadcrumbs of the known folders are built from the cache too, so that Folder.is_subfolder_of,
+        Folder.path, Folder.parent and is_in_folder need at most one breadcrumb request per folder tree. Folders
+        which are renamed or moved by others are only seen after the TTL.
+
+        Keyword Arguments:
+            max_size {int} -- The maximum number of cached folders (default: {FolderPathCache.MAX_SIZE})
+            ttl {float} -- The time in seconds an entry is used (default: {FolderPathCache.TTL})
+
+        Returns:
+            FolderPathCache -- The cache. Call clear() to forget all paths
+        """
+        cache = FolderPathCache(max_size=max_size, ttl=ttl)
+        self.http_client.folder_path_cache = cache
+        return cache
+
+    def use_adaptive_upload_chunks(self, min_chunk_size: int = None, max_chunk_size: int = None,
+                                   target_duration: float = None):
+        """Lets the uploads choose the chunk size from the measured throughput instead of using a fixed size
+
+        The chunk size is chosen per file so that a chunk takes about target_duration seconds. Failed chunks make the
+        following files use smaller chunks and the upload timeout grows with the expected duration of a chunk.
+
+        Keyword Arguments:
+            min_chunk_size {int} -- The smallest chunk size in bytes (default: {AdaptiveChunkSize.MIN_CHUNK_SIZE})
+            max_chunk_size {int} -- The largest chunk size in bytes (default: {AdaptiveChunkSize.MAX_CHUNK_SIZE})
+            target_duration {float} -- The time in seconds a chunk should take
+                                       (default: {AdaptiveChunkSize.TARGET_DURATION})
+
+        Returns:
+            AdaptiveChunkSize -- The chunk size policy. Its chunk_size, throughput and error_rate can be inspected
+        """
+        policy = AdaptiveChunkSize(initial_chunk_size=self.http_client.UPLOAD_CHUCK_SIZE, min_chunk_size=min_chunk_size,
+                                   max_chunk_size=max_chunk_size, target_duration=target_duration)
+        self.http_client.upload_chunk_policy = policy
+        return policy
+
+    def create_async_client(self, limit: int = None, limit_per_host: int = 0):
+        """Creates an AsyncClient for the asyncio model methods (e.g. Folder.aget_items or Datafile.adownload)
+
+        The AsyncClient needs aiohttp ("pip install gtagora-connector[async]") and shares the connection of this Agora
+        instance. Close it with "await client.close()" or use it as an async context manager.
+
+        Keyword Arguments:
+            limit {int} -- The maximum number of open connections (default: {AsyncClient.LIMIT})
+            limit_per_host {int} -- The maximum number of open connections per host, 0 means no limit (default: {0})
+
+        Returns:
+            AsyncClient -- The async client
+        """
+        from gtagora.http.async_client import AsyncClient
+        return AsyncClient(self.http_client.connection, client=self.http_client, limit=limit,
+                           limit_per_host=limit_per_host)
+
     def close(self):
-        pass
+        self.http_client.close()
@@ -3,4 +3,9 @@ class AgoraException(Exception):
 
 
 class DownloadError(AgoraException):
-    pass
+    """A download failed. transient is True if the same download can succeed when it is tried again (e.g. after an
+    interrupted connection or a 503), but not if the server refused it (e.g. 403 or 404)."""
+
+    def __init__(self, message='', transient=False):
+        super().__init__(message)
+        self.transient = transient
@@ -0,0 +1,91 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Union
+
+
+class HashIndex:
+    """A persistent index of the hashes of local files, so that unchanged files are not read again.
+
+    An entry is keyed by the absolute path and the hash algorithm and is only used while the size, the modification
+    time (in ns) and the inode of the file are the same as when it was hashed. A file which is changed in place
+    without changing its size and modification time is not detected.
+
+    Arguments:
+        path {Path} -- The SQLite database file
+    """
+
+    def __init__(self, path: Union[Path, str]):
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS hashes (path TEXT, algorithm TEXT, size INTEGER, '
+                             'mtime_ns INTEGER, inode INTEGER, digest TEXT, PRIMARY KEY (path, algorithm))')
+
+    def get(self, path: Path, algorithm: str, stat: os.stat_result = None):
+        """Returns the stored digest of the file or None if the file is unknown or was changed"""
+        stat = stat if stat else os.stat(path)
+        with self._lock:
+            row = self._db.execute('SELECT size, mtime_ns, inode, digest FROM hashes WHERE path = ? AND algorithm = ?',
+                                   (self._key(path), algorithm)).fetchone()
+            if row is None or tuple(row[:3]) != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[3]
+
+    def put(self, path: Path, algorithm: str, digest: str, stat: os.stat_result = None):
+        """Stores the digest of the file. stat must be taken before the file was hashed, so that a file which
+        is changed while it is hashed is not stored with the old digest"""
+        current = os.stat(path)
+        if stat is not None and self._signature(stat) != self._signature(current):
+            return False
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)',
+                             (self._key(path), algorithm, current.st_size, current.st_mtime_ns, current.st_ino, digest))
+        return True
+
+    def invalidate(self, path: Path):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM hashes WHERE path = ?', (self._key(path),))
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM hashes')
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM hashes').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _key(path: Path):
+        return str(Path(path).resolve())
+
+    @staticmethod
+    def _signature(stat: os.stat_result):
+        return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+_hash_index = None
+
+
+def get_hash_index():
+    """Returns the hash index used by gtagora.utils.sha1 and sha256 or None"""
+    return _hash_index
+
+
+def set_hash_index(index: Union[HashIndex, None]):
+    """Sets the hash index used by gtagora.utils.sha1 and sha256. None disables the index"""
+    global _hash_index
+    _hash_index = index
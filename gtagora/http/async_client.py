@@ -0,0 +1,291 @@
+import asyncio
+import json as _json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from gtagora.exception import AgoraException, DownloadError
+from gtagora.http.client import Client, ProgressCallback
+from gtagora.http.multipart import StreamHash
+from gtagora.utils import UploadFile
+
+
+async def gather_or_cancel(*awaitables):
+    """Like asyncio.gather, but the other awaitables are cancelled (and awaited) as soon as one of them fails, so
+    that nothing keeps running in the background once the error is raised."""
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+class AsyncResponse:
+    """A completely read response of the AsyncClient which can be used like a requests response."""
+
+    def __init__(self, status_code, headers, content: bytes, url: str):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return _json.loads(self.content)
+
+
+class AsyncClient:
+    """An asyncio HTTP client with the same interface as the Client. All methods are coroutines.
+
+    The AsyncClient needs aiohttp ("pip install gtagora-connector[async]"). Use it as an async context manager or call
+    close() when done. The models returned by the async model methods (e.g. Folder.aget_items) use the synchronous
+    client of the AsyncClient, so that their synchronous methods keep working.
+
+    Arguments:
+        connection {Connection} -- The connection holding the server url and the credentials
+
+    Keyword Arguments:
+        client {Client} -- The synchronous client for the returned models. A new one is created if None
+                           (default: {None})
+        limit {int} -- The maximum number of open connections (default: {LIMIT})
+        limit_per_host {int} -- The maximum number of open connections per host, 0 means no limit (default: {0})
+        keep_alive {bool} -- Keep the connections open between requests (default: {True})
+    """
+
+    LIMIT = 100
+
+    def __init__(self, connection, client: Client = None, limit: int = None, limit_per_host: int = 0,
+                 keep_alive=True):
+        if aiohttp is None:
+            raise AgoraException('The AsyncClient needs aiohttp. '
+                                 'Install it with "pip install gtagora-connector[async]"')
+
+        self.connection = connection
+        self.client = client if client else Client(connection)
+        self._owns_client = client is None
+        self.limit = limit if limit else self.LIMIT
+        self.limit_per_host = limit_per_host
+        self.keep_alive = keep_alive
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             force_close=not self.keep_alive,
+                                             ssl=None if self.connection.verify_certificate else False)
+            # like the Client the AsyncClient doesn't store cookies, every request sends the authentication
+            self._session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._owns_client:
+            self.client.close()
+
+    def _auth_headers(self):
+        return self.client._auth_headers()
+
+    @staticmethod
+    def _to_params(params):
+        if not params:
+            return None
+        # aiohttp doesn't accept booleans as query parameters, requests sends them as "True" and "False"
+        return {key: str(value) if isinstance(value, bool) else value for key, value in params.items()}
+
+    async def request(self, method, url, timeout=None, params=None, headers=None, idempotent: bool = None,
+                      max_retries: int = None, **kwargs):
+        """Sends a request like Client.request. Transient failures are retried with the retry_policy of the client."""
+        url = self.connection.url + url
+        timeout = aiohttp.ClientTimeout(total=timeout if timeout else self.client.TIMEOUT)
+        headers = {**self._auth_headers(), **(headers if headers else {})}
+        retry_policy = self.client.retry_policy
+        retry_policy.on_request()
+
+        metrics = self.client.metrics
+        loop = asyncio.get_running_loop()
+
+        retry = 0
+        while True:
+            start_time = loop.time()
+            try:
+                async with self.session.request(method, url, params=self._to_params(params), headers=headers,
+                                                timeout=timeout, **kwargs) as response:
+                    content = await response.read()
+                    response = AsyncResponse(response.status, response.headers, content, str(response.url))
+                metrics.record(method, url, loop.time() - start_time, status_code=response.status_code,
+                               retry=retry > 0, bytes_sent=int(headers.get('Content-Length') or 0),
+                               bytes_received=len(content))
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                metrics.record(method, url, loop.time() - start_time, error=True, retry=retry > 0)
+                connect_error = isinstance(e, aiohttp.ClientConnectorError)
+                if not retry_policy.should_retry(method, retry, error=e, connect_error=connect_error,
+                                                 idempotent=idempotent, max_retries=max_retries):
+                    raise
+                delay = retry_policy.delay(retry)
+            else:
+                if not retry_policy.should_retry(method, retry, status_code=response.status_code,
+                                                 idempotent=idempotent, max_retries=max_retries):
+                    return response
+                delay = retry_policy.delay(retry, response.headers.get('Retry-After'))
+            await asyncio.sleep(delay)
+            retry += 1
+
+    async def check_connection(self):
+        response = await self.get('/api/v1/user/current/')
+        if response.status_code == 200:
+            return 'institution' in response.json()
+        return False
+
+    async def get(self, url, timeout=None, params=None, **kwargs):
+        return await self.request('GET', url, timeout=timeout, params=params, **kwargs)
+
+    async def post(self, url, data=None, json=None, timeout=None, params=None, **kwargs):
+        return await self.request('POST', url, data=data, json=json, timeout=timeout, params=params, **kwargs)
+
+    async def put(self, url, json, timeout=None, params=None, **kwargs):
+        return await self.request('PUT', url, json=json, timeout=timeout, params=params, **kwargs)
+
+    async def patch(self, url, json=None, data=None, timeout=None, params=None, **kwargs):
+        return await self.request('PATCH', url, data=data, json=json, timeout=timeout, params=params, **kwargs)
+
+    async def delete(self, url, timeout=None, **kwargs):
+        return await self.request('DELETE', url, timeout=timeout, **kwargs)
+
+    async def download(self, url, target_filename):
+        """Downloads a file like Client.download, but always in a single stream.
+
+        The data is written to "<target_filename>.part" which is renamed to target_filename once the download is
+        complete. An interrupted download is resumed from the partial file.
+        """
+        loop = asyncio.get_running_loop()
+        target = Path(target_filename)
+        part_file = target.with_name(target.name + '.part')
+        offset = part_file.stat().st_size if part_file.exists() else 0
+
+        headers = {**self._auth_headers()}
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=self.client.TIMEOUT)
+
+        try:
+            async with self.session.get(self.connection.url + url, headers=headers, timeout=timeout) as response:
+                if response.status == 416 and offset:
+                    if response.headers.get('Content-Range', '').endswith(f'/{offset}'):
+                        os.replace(part_file, target)
+                        return target
+                    part_file.unlink()
+                    return await self.download(url, target_filename)
+                if response.status not in (200, 206):
+                    raise DownloadError(f'Could not download {url}: status = {response.status}',
+                                        transient=response.status in self.client.retry_policy.RETRY_STATUS_CODES)
+
+                with open(part_file, 'ab' if response.status == 206 else 'wb') as file:
+                    async for chunk in response.content.iter_chunked(self.client.DOWNLOAD_CHUNK_SIZE):
+                        await loop.run_in_executor(None, file.write, chunk)
+        except aiohttp.ClientError as e:
+            raise DownloadError(f'The download of {url} was interrupted: {e}', transient=True) from e
+
+        os.replace(part_file, target)
+        return target
+
+    async def upload(self, url, files: List[UploadFile], verify_hash=False, max_retries=5,
+                     progress_callback: Optional[ProgressCallback] = None, parallel_chunks: int = None):
+        """Uploads files with the flow.js protocol like Client.upload."""
+        response = await self.get('/api/v1/version/')
+        if response.status_code != 200:
+            raise AgoraException("cannot connect to the Agora server")
+
+        parallel_chunks = parallel_chunks if parallel_chunks else self.client.upload_parallel_chunks
+
+        for cur_file in files:
+            filesize, chunks = self.client._start_file_upload(cur_file)
+            file_hash = self.client._start_file_hash(cur_file)
+            # a chunk is only opened when its upload starts, so there are never more than parallel_chunks in flight
+            semaphore = asyncio.Semaphore(parallel_chunks)
+            completed_chunks = set()
+
+            async def upload_chunk(chunk):
+                # the semaphore is only released by chunks which succeeded, so that no further chunk starts before
+                # the others are cancelled
+                await semaphore.acquire()
+                if progress_callback:
+                    progress_callback(cur_file)
+                size = await self._upload_chunk(url, cur_file, chunk, filesize, verify_hash, max_retries,
+                                                file_hash=file_hash)
+                Client._set_chunk_completed(cur_file, chunk, size, completed_chunks)
+                if progress_callback:
+                    progress_callback(cur_file)
+                semaphore.release()
+
+            await gather_or_cancel(*[upload_chunk(chunk) for chunk in chunks])
+
+            cur_file.sha1 = file_hash.hexdigest() if file_hash else None
+            cur_file.uploaded = True
+            if progress_callback:
+                progress_callback(cur_file)
+
+        return True
+
+    async def _upload_chunk(self, url, upload_file: UploadFile, chunk: int, filesize: int, verify_hash=False,
+                            max_retries=5, file_hash: StreamHash = None):
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(None, self.client._chunk_body, upload_file, chunk, filesize, verify_hash,
+                                          file_hash)
+
+        async def stream():
+            # the blocks are read on the executor so that the event loop never waits for the disk
+            while True:
+                block = await loop.run_in_executor(None, body.read, body.BLOCK_SIZE)
+                if not block:
+                    return
+                yield block
+
+        retry_policy = self.client.retry_policy
+        retry = 0
+        try:
+            while True:
+                body.rewind()
+                start_time = loop.time()
+                response, error = None, None
+                try:
+                    response = await self.post(url, data=stream(), headers=body.headers,
+                                               timeout=self.client._upload_timeout(body.length), max_retries=0)
+                    if response.status_code == 200:
+                        self.client._record_chunk(body.length, loop.time() - start_time)
+                        return body.length
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = e
+                self.client._record_chunk(body.length, loop.time() - start_time, failed=True)
+
+                if not retry_policy.should_retry('POST', retry, status_code=getattr(response, 'status_code', None),
+                                                 error=error, idempotent=True, max_retries=max_retries - 1):
+                    if response is not None:
+                        raise AgoraException(f"Failed to upload chunk {chunk} of file {upload_file.file}. "
+                                             f"Status code: {response.status_code}")
+                    raise AgoraException(f"Failed to upload chunk {chunk} after {max_retries} retries.")
+                retry_after = response.headers.get('Retry-After') if response is not None else None
+                await asyncio.sleep(retry_policy.delay(retry, retry_after))
+                self.client.metrics.record_retry('POST', url)
+                retry += 1
+        finally:
+            body.close()
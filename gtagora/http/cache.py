@@ -0,0 +1,187 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Tuple, Union
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class CachedResponse:
+    """A response stored in the ResponseCache"""
+
+    def __init__(self, key, url, headers: dict, content: bytes, etag, last_modified, stored):
+        self.key = key
+        self.url = url
+        self.headers = headers
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored = stored
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_response(self):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.url = self.url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = self.content
+        response.from_cache = True
+        return response
+
+
+class ResponseCache:
+    """An on-disk cache of GET responses which is shared between runs (and processes).
+
+    A cached response is revalidated with If-None-Match/If-Modified-Since once it is older than the TTL of its url. A
+    304 response is then answered from the cache, so that only the headers are transferred. The TTL rules are
+    (regex, seconds) tuples which are matched against the path of the url, the first match wins. Responses without
+    ETag and Last-Modified are only stored if their TTL is not 0. The least recently used responses are removed
+    when the cache gets larger than max_size.
+
+    Arguments:
+        path {Path} -- The SQLite database file
+
+    Keyword Arguments:
+        max_size {int} -- The maximum size of the cached content in bytes (default: {MAX_SIZE})
+        default_ttl {float} -- The TTL in seconds of urls without a matching rule (default: {DEFAULT_TTL})
+        ttl_rules {List[Tuple[str, float]]} -- The TTL of the urls whose path matches the regex (default: {None})
+    """
+
+    MAX_SIZE = 512 * 1024 * 1024  # 512MB
+    # responses are revalidated on every request by default
+    DEFAULT_TTL = 0
+    # a write to an action url like /api/v1/folder/5/new/ changes the resource /api/v1/folder/5/
+    RESOURCE_PATTERN = re.compile(r'^(?P<prefix>.*/api/)v\d+/(?P<name>[^/]+)/(?P<id>\d+)/')
+    API_VERSIONS = ('v1', 'v2')
+    # the names of a resource which differ between the API versions
+    RESOURCE_NAMES = {'serie': ('serie', 'series'), 'series': ('serie', 'series')}
+
+    def __init__(self, path: Union[Path, str], max_size: int = None, default_ttl: float = None,
+                 ttl_rules: List[Tuple[str, float]] = None):
+        self.path = Path(path)
+        self.max_size = max_size if max_size else self.MAX_SIZE
+        self.default_ttl = default_ttl if default_ttl is not None else self.DEFAULT_TTL
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in (ttl_rules if ttl_rules else [])]
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, path TEXT, url TEXT, '
+                             'headers TEXT, content BLOB, etag TEXT, last_modified TEXT, stored REAL, accessed REAL, '
+                             'size INTEGER)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    @staticmethod
+    def key(url: str, identity: str = ''):
+        """Returns the cache key of a full url. The identity separates the responses of different users."""
+        return hashlib.sha256(f'{identity} GET {url}'.encode()).hexdigest()
+
+    def ttl(self, path: str):
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(path):
+                return ttl
+        return self.default_ttl
+
+    def get(self, key: str):
+        with self._lock, self._db:
+            row = self._db.execute('SELECT url, headers, content, etag, last_modified, stored FROM responses '
+                                   'WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (time.time(), key))
+        url, headers, content, etag, last_modified, stored = row
+        return CachedResponse(key, url, json.loads(headers), content, etag, last_modified, stored)
+
+    def is_fresh(self, entry: CachedResponse, path: str):
+        return time.time() - entry.stored < self.ttl(path)
+
+    def put(self, key: str, path: str, response):
+        """Stores a 200 response. Returns False if the response can't be cached."""
+        cache_control = response.headers.get('Cache-Control', '').lower()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if 'no-store' in cache_control or (not etag and not last_modified and not self.ttl(path)):
+            return False
+
+        content = response.content
+        if len(content) > self.max_size:
+            return False
+        headers = {k: v for k, v in response.headers.items() if k.lower() in ('content-type', 'etag', 'last-modified')}
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             (key, path, response.url, json.dumps(headers), content, etag, last_modified, now, now,
+                              len(content)))
+            self._evict()
+        return True
+
+    def refresh(self, key: str):
+        """Marks a response as fresh after the server confirmed it with a 304"""
+        with self._lock, self._db:
+            self._db.execute('UPDATE responses SET stored = ? WHERE key = ?', (time.time(), key))
+
+    def invalidate(self, path: str):
+        """Removes the responses of a path and all the paths below it"""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                             (path, self._escape_like(path.rstrip('/')) + '/%'))
+
+    def invalidate_resource(self, path: str):
+        """Removes the responses of the resource which a write to the path changes, in all API versions, and all
+        the paths below it. A path without a resource id only removes the responses of the path and below it."""
+        match = self.RESOURCE_PATTERN.match(path)
+        if match is None:
+            self.invalidate(path)
+            return
+        names = self.RESOURCE_NAMES.get(match.group('name'), (match.group('name'),))
+        for version in self.API_VERSIONS:
+            for name in names:
+                self.invalidate(f"{match.group('prefix')}{version}/{name}/{match.group('id')}/")
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM responses')
+
+    def size(self):
+        with self._lock:
+            return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _evict(self):
+        size = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if size <= self.max_size:
+            return
+        rows = self._db.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall()
+        evicted = []
+        for key, entry_size in rows:
+            if size <= self.max_size:
+                break
+            evicted.append((key,))
+            size -= entry_size
+        self._db.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+    @staticmethod
+    def _escape_like(value: str):
+        return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
@@ -0,0 +1,76 @@
+import threading
+
+
+class AdaptiveChunkSize:
+    """Chooses the upload chunk size from the measured throughput and error rate of the previous chunks.
+
+    The flow.js protocol needs one chunk size for all chunks of a file. The size is therefore chosen when the upload
+    of a file starts and is stored in UploadFile.chunk_size, so that a resumed upload keeps using it. The chunks are
+    sized so that one chunk takes about target_duration seconds. Failed chunks shrink the following chunks.
+
+    Keyword Arguments:
+        initial_chunk_size {int} -- The chunk size before anything has been measured (default: {INITIAL_CHUNK_SIZE})
+        min_chunk_size {int} -- The smallest chunk size (default: {MIN_CHUNK_SIZE})
+        max_chunk_size {int} -- The largest chunk size (default: {MAX_CHUNK_SIZE})
+        target_duration {float} -- The time in seconds a chunk should take (default: {TARGET_DURATION})
+    """
+
+    INITIAL_CHUNK_SIZE = 100 * 1024 * 1024  # 100MB
+    MIN_CHUNK_SIZE = 5 * 1024 * 1024  # 5MB
+    MAX_CHUNK_SIZE = 500 * 1024 * 1024  # 500MB
+    TARGET_DURATION = 20
+    # the weight of a new measurement in the moving averages
+    SMOOTHING = 0.3
+    # the timeout of a chunk is this many times its expected duration
+    TIMEOUT_FACTOR = 3
+    ALIGNMENT = 1024 * 1024
+
+    def __init__(self, initial_chunk_size: int = None, min_chunk_size: int = None, max_chunk_size: int = None,
+                 target_duration: float = None):
+        self.min_chunk_size = min_chunk_size if min_chunk_size else self.MIN_CHUNK_SIZE
+        self.max_chunk_size = max_chunk_size if max_chunk_size else self.MAX_CHUNK_SIZE
+        self.target_duration = target_duration if target_duration else self.TARGET_DURATION
+        self.chunk_size = self._clamp(initial_chunk_size if initial_chunk_size else self.INITIAL_CHUNK_SIZE)
+        self.throughput = None
+        self.error_rate = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, size: int, duration: float, failed=False):
+        """Records the upload of one chunk
+
+        Arguments:
+            size {int} -- The size of the chunk in bytes
+            duration {float} -- The time the upload took in seconds
+
+        Keyword Arguments:
+            failed {bool} -- The upload failed, e.g. because of a timeout (default: {False})
+        """
+        with self._lock:
+            self.error_rate += self.SMOOTHING * ((1.0 if failed else 0.0) - self.error_rate)
+            if failed:
+                # a failed chunk has to be sent again from the start, smaller chunks lose less
+                self.chunk_size = self._clamp(self.chunk_size // 2)
+                return
+
+            throughput = size / max(duration, 1e-3)
+            if self.throughput is None:
+                self.throughput = throughput
+            else:
+                self.throughput += self.SMOOTHING * (throughput - self.throughput)
+            self.chunk_size = self._clamp(self.throughput * self.target_duration * (1 - self.error_rate))
+
+    def next_chunk_size(self) -> int:
+        """Returns the chunk size for the next file"""
+        with self._lock:
+            return self.chunk_size
+
+    def timeout(self, size: int, minimum: float) -> float:
+        """Returns the timeout for a chunk of the given size. It is never shorter than minimum."""
+        with self._lock:
+            if not self.throughput:
+                return minimum
+            return max(minimum, self.TIMEOUT_FACTOR * size / self.throughput)
+
+    def _clamp(self, chunk_size):
+        chunk_size = int(chunk_size) // self.ALIGNMENT * self.ALIGNMENT
+        return min(max(chunk_size, self.min_chunk_size), self.max_chunk_size)
@@ -2,16 +2,26 @@ import hashlib
 import json
 import math
 import os
+import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dataclasses import dataclass, make_dataclass
+from http.cookiejar import DefaultCookiePolicy
 from pathlib import Path
+from types import SimpleNamespace
 from typing import Union, List, Callable, Optional
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 
-from gtagora.exception import AgoraException
-from gtagora.utils import sha256, UploadFile, UploadState
+from gtagora.exception import AgoraException, DownloadError
+from gtagora.http.metrics import MetricsRegistry
+from gtagora.http.multipart import MultipartChunkEncoder, StreamHash, sha256_range
+from gtagora.http.retry import RetryBudget, RetryPolicy
+from gtagora.utils import UploadFile, UploadState
 
 ProgressCallback = Callable[[UploadFile], None]
 
@@ -21,8 +31,80 @@ class Client:
     UPLOAD_CHUCK_SIZE = 100 * 1024 * 1024  # 100MB
     DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
 
-    def __init__(self, connection):
+    POOL_CONNECTIONS = 10
+    POOL_MAXSIZE = 10
+    UPLOAD_PARALLEL_CHUNKS = 1
+    DOWNLOAD_SEGMENTS = 4
+    DOWNLOAD_SEGMENT_MIN_SIZE = 64 * 1024 * 1024  # 64MB
+    TRANSIENT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                        requests.exceptions.ChunkedEncodingError)
+
+    def __init__(self, connection, pool_connections: int = None, pool_maxsize: int = None, pool_block=False,
+                 keep_alive=True, retry_policy: RetryPolicy = None):
+        """The HTTP client used by all the models to talk to the Agora server.
+
+        All requests go through one pooled requests.Session which is created lazily and can safely be shared
+        between threads.
+
+        Arguments:
+            connection {Connection} -- The connection holding the server url and the credentials
+
+        Keyword Arguments:
+            pool_connections {int} -- The number of hosts for which a connection pool is kept
+                                      (default: {POOL_CONNECTIONS})
+            pool_maxsize {int} -- The maximum number of open connections per host (default: {POOL_MAXSIZE})
+            pool_block {bool} -- Block when all connections of a host are in use instead of opening a throwaway
+                                 connection (default: {False})
+            keep_alive {bool} -- Keep the connections open between requests (default: {True})
+            retry_policy {RetryPolicy} -- Decides which failed requests are retried. A RetryPolicy with a RetryBudget
+                                          is used if None (default: {None})
+        """
         self.connection = connection
+        self.pool_connections = pool_connections if pool_connections else self.POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize if pool_maxsize else self.POOL_MAXSIZE
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.upload_parallel_chunks = self.UPLOAD_PARALLEL_CHUNKS
+        self.download_segments = self.DOWNLOAD_SEGMENTS
+        # an AdaptiveChunkSize which chooses the chunk size of every uploaded file. UPLOAD_CHUCK_SIZE is used if None
+        self.upload_chunk_policy = None
+        self.retry_policy = retry_policy if retry_policy else RetryPolicy(budget=RetryBudget())
+        # a ResponseCache for GET requests. Nothing is cached if None
+        self.response_cache = None
+        # an IdentityMap of the model instances returned by BaseModel.get. Nothing is cached if None
+        self.identity_map = None
+        # a FolderPathCache which resolves folder paths without requests. Nothing is cached if None
+        self.folder_path_cache = None
+        self.metrics = MetricsRegistry()
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        # the authentication is sent with every request. Storing cookies (e.g. the session cookie set by the login)
+        # would make the server enforce CSRF checks and the cookie jar is not shared well between threads.
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
 
     def check_connection(self):
         response = self.get('/api/v1/user/current/')
@@ -32,121 +114,495 @@ class Client:
 
         return False
 
-    def get(self, url, timeout=None, params=None, **kwargs):
+    def request(self, method, url, timeout=None, idempotent: bool = None, max_retries: int = None, **kwargs):
+        """Sends a request to the server. Transient failures are retried according to the retry_policy.
+
+        When a response_cache is set, GET requests are answered from it or revalidated with a conditional request
+        and successful writes remove the cached responses of the resource they change.
+
+        Arguments:
+            method {str} -- The HTTP method
+            url {str} -- The url relative to the server url
+
+        Keyword Arguments:
+            timeout {float} -- The timeout in seconds (default: {TIMEOUT})
+            idempotent {bool} -- Retry the request like a GET even if the method is not idempotent (default: {None})
+            max_retries {int} -- Overrides the maximum number of retries of the retry_policy (default: {None})
+        """
+        if self.response_cache is not None:
+            headers = kwargs.get('headers') or {}
+            if method.upper() == 'GET' and not kwargs.get('stream') and 'Range' not in headers:
+                return self._cached_get(url, timeout=timeout, idempotent=idempotent, max_retries=max_retries,
+                                        **kwargs)
+
+        response = self._send(method, url, timeout=timeout, idempotent=idempotent, max_retries=max_retries, **kwargs)
+        if self.response_cache is not None and method.upper() != 'GET' and response.status_code < 400:
+            self.response_cache.invalidate_resource(urlsplit(self.connection.url + url).path)
+        return response
+
+    def _cached_get(self, url, **kwargs):
+        cache = self.response_cache
+        full_url = self._full_url(url, kwargs.get('params'))
+        path = urlsplit(full_url).path
+        key = cache.key(full_url, self._auth_identity())
+
+        entry = cache.get(key)
+        if entry is not None and cache.is_fresh(entry, path):
+            cache.hits += 1
+            self.metrics.record_cache_hit('GET', path)
+            return entry.to_response()
+        if entry is not None:
+            kwargs['headers'] = {**entry.conditional_headers(), **(kwargs.get('headers') or {})}
+
+        response = self._send('GET', url, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            cache.refresh(key)
+            cache.revalidated += 1
+            return entry.to_response()
+
+        cache.misses += 1
+        if response.status_code == 200:
+            cache.put(key, path, response)
+        return response
+
+    def _full_url(self, url, params=None):
+        request = requests.models.PreparedRequest()
+        request.prepare_url(self.connection.url + url, params)
+        return request.url
+
+    def _auth_headers(self):
+        # the connections provide requests auth objects which set the Authorization header on a request
+        request = SimpleNamespace(headers={})
+        self.connection.get_auth()(request)
+        return request.headers
+
+    def _auth_identity(self):
+        authorization = self._auth_headers().get('Authorization', '')
+        return hashlib.sha256(authorization.encode()).hexdigest()
+
+    def _send(self, method, url, timeout=None, idempotent: bool = None, max_retries: int = None, **kwargs):
         url = self.connection.url + url
         timeout = timeout if timeout else self.TIMEOUT
-        auth = self.connection.get_auth()
-        return requests.get(url, auth=auth, params=params, timeout=timeout,
-                            verify=self.connection.verify_certificate, **kwargs)
+        body = kwargs.get('data')
+        self.retry_policy.on_request()
+
+        retry = 0
+        while True:
+            if retry and hasattr(body, 'rewind'):
+                body.rewind()
+            start_time = time.monotonic()
+            try:
+                response = self.session.request(method, url, auth=self.connection.get_auth(), timeout=timeout,
+                                                verify=self.connection.verify_certificate, **kwargs)
+            except self.TRANSIENT_ERRORS as e:
+                self.metrics.record(method, url, time.monotonic() - start_time, error=True, retry=retry > 0)
+                if not self.retry_policy.should_retry(method, retry, error=e, connect_error=self._is_connect_error(e),
+                                                      idempotent=idempotent, max_retries=max_retries):
+                    raise
+                delay = self.retry_policy.delay(retry)
+            else:
+                self._record_response(method, url, response, time.monotonic() - start_time, retry > 0,
+                                      kwargs.get('stream', False))
+                if not self.retry_policy.should_retry(method, retry, status_code=response.status_code,
+                                                      idempotent=idempotent, max_retries=max_retries):
+                    return response
+                delay = self.retry_policy.delay(retry, response.headers.get('Retry-After'))
+                response.close()
+            time.sleep(delay)
+            retry += 1
+
+    def _record_response(self, method, url, response, duration, retry, stream):
+        body = response.request.body if response.request is not None else None
+        try:
+            bytes_sent = len(body) if body is not None else 0
+        except TypeError:
+            bytes_sent = 0
+        # the body of a streamed response hasn't been read yet
+        if stream:
+            bytes_received = int(response.headers.get('Content-Length') or 0)
+        else:
+            bytes_received = len(response.content)
+        self.metrics.record(method, url, duration, status_code=response.status_code, retry=retry,
+                            bytes_sent=bytes_sent, bytes_received=bytes_received)
+
+    @staticmethod
+    def _is_connect_error(error):
+        # the request has certainly not reached the server, so that even a POST can be sent again
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+            return isinstance(getattr(error.args[0], 'reason', None), NewConnectionError)
+        return False
+
+    def get(self, url, timeout=None, params=None, **kwargs):
+        return self.request('GET', url, timeout=timeout, params=params, **kwargs)
 
     def post(self, url, data=None, json=None, timeout=None, params=None, **kwargs):
-        url = self.connection.url + url
-        timeout = timeout if timeout else self.TIMEOUT
-        return requests.post(url, auth=self.connection.get_auth(), data=data, json=json, params=params, timeout=timeout,
-                             verify=self.connection.verify_certificate, **kwargs)
+        return self.request('POST', url, data=data, json=json, timeout=timeout, params=params, **kwargs)
 
     def put(self, url, json, timeout=None, params=None, **kwargs):
-        url = self.connection.url + url
-        timeout = timeout if timeout else self.TIMEOUT
-        return requests.put(url, auth=self.connection.get_auth(), json=json, params=params, timeout=timeout,
-                            verify=self.connection.verify_certificate, **kwargs)
+        return self.request('PUT', url, json=json, timeout=timeout, params=params, **kwargs)
 
     def patch(self, url, json=None, data=None, timeout=None, params=None, **kwargs):
-        url = self.connection.url + url
-        timeout = timeout if timeout else self.TIMEOUT
-        return requests.patch(url, auth=self.connection.get_auth(), data=data, json=json, params=params, timeout=timeout,
-                              verify=self.connection.verify_certificate, **kwargs)
+        return self.request('PATCH', url, data=data, json=json, timeout=timeout, params=params, **kwargs)
 
     def delete(self, url, timeout=None, **kwargs):
-        url = self.connection.url + url
-        timeout = timeout if timeout else self.TIMEOUT
-        return requests.delete(url, auth=self.connection.get_auth(), timeout=timeout,
-                               verify=self.connection.verify_certificate, **kwargs)
+        return self.request('DELETE', url, timeout=timeout, **kwargs)
 
-    def download(self, url, target_filename):
-        response = self.get(url, stream=True)
-        if response.status_code == 200:
-            with open(target_filename, 'wb') as file:
-                for chunk in response.iter_content(self.DOWNLOAD_CHUNK_SIZE):
-                    file.write(chunk)
+    def download(self, url, target_filename, size: int = None, segments: int = None):
+        """Downloads a file.
 
-    def upload(self, url, files: List[UploadFile], verify_hash=False, max_retries=5, progress_callback: Optional[ProgressCallback]=None):
-        response = self.get('/api/v1/version/')
-        if response.status_code == 200:
-            data = response.json()
-        else:
-            raise AgoraException("cannot connect to the Agora server")
+        The data is written to "<target_filename>.part" which is renamed to target_filename once the download is
+        complete. An interrupted download is resumed from the partial file. When the size is known and at least
+        DOWNLOAD_SEGMENT_MIN_SIZE, several byte ranges of the file are downloaded at the same time.
 
-        for index, cur_file in enumerate(files):
-            if not cur_file.file.exists() or not cur_file.file.is_file():
-                raise AgoraException('Could not open file ' + str(cur_file.file))
+        Arguments:
+            url {str} -- The download url
+            target_filename {str} -- The path of the downloaded file
 
-            filesize = cur_file.file.stat().st_size
-            nof_chunks = math.ceil(filesize / self.UPLOAD_CHUCK_SIZE)
-            files[index].nr_chunks = nof_chunks
+        Keyword Arguments:
+            size {int} -- The size of the file (default: {None})
+            segments {int} -- The number of byte ranges downloaded at the same time (default: {download_segments})
 
-            filename = cur_file.file.name
-            target_filename = cur_file.target
+        Raises:
+            DownloadError: The server refused the download or the connection was interrupted
 
-            if files[index].identifier is not None:
-                uid = files[index].identifier
+        Returns:
+            Path -- The path of the downloaded file
+        """
+        target = Path(target_filename)
+        part_file = target.with_name(target.name + '.part')
+        plan_file = target.with_name(target.name + '.part.json')
+        segments = segments if segments else self.download_segments
+
+        use_segments = segments > 1 and size is not None and size >= self.DOWNLOAD_SEGMENT_MIN_SIZE
+        if use_segments and (plan_file.exists() or not part_file.exists()):
+            if not self._download_segmented(url, part_file, plan_file, size, segments):
+                # the server doesn't support range requests
+                self._download_stream(url, part_file)
+        else:
+            if plan_file.exists():
+                # a partial file of a segmented download has gaps and can't be continued as a single stream
+                self._remove_partial_download(part_file, plan_file)
+            self._download_stream(url, part_file)
+
+        os.replace(part_file, target)
+        return target
+
+    def _download_stream(self, url, part_file: Path):
+        offset = part_file.stat().st_size if part_file.exists() else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else None
+        response = self.get(url, stream=True, headers=headers)
+        with response:
+            if response.status_code == 416 and offset:
+                # the partial file is complete if it has the size of the file on the server
+                content_range = response.headers.get('Content-Range', '')
+                if content_range.endswith(f'/{offset}'):
+                    return
+                part_file.unlink()
+                return self._download_stream(url, part_file)
+            if response.status_code == 206:
+                mode = 'ab'
+            elif response.status_code == 200:
+                mode = 'wb'
             else:
-                uid = str(uuid.uuid4())
-                files[index].identifier = uid
-
-            start_chunk = files[index].chunks_completed if files[index].chunks_completed is not None else 0
-
-            with open(cur_file.file, mode='rb') as file:
-                if start_chunk > 0:
-                    file.seek(start_chunk * self.UPLOAD_CHUCK_SIZE, os.SEEK_SET)
-                # chunk number starts from 1
-                for chunk in range(start_chunk+1, nof_chunks+1):
-                    retry_count = 0
-                    while retry_count < max_retries:
-                        try:
-                            if progress_callback:
-                                progress_callback(files[index])
-                            data = file.read(self.UPLOAD_CHUCK_SIZE)
-                            files_to_upload = {'file': (filename, data)}
-                            form = {
-                                'description': '',
-                                'flowChunkNumber': str(chunk),
-                                'flowChunkSize': str(self.UPLOAD_CHUCK_SIZE),
-                                'flowCurrentChunkSize': str(len(data)),
-                                'flowTotalSize': str(filesize),
-                                'flowIdentifier': uid,
-                                'flowFilename': target_filename,
-                                'flowRelativePath': target_filename,
-                                'flowTotalChunks': str(nof_chunks)}
-                            if verify_hash:
-                                sha256 = hashlib.sha256()
-                                sha256.update(data)
-                                data_hash = sha256.hexdigest()
-                                form['flowFileContentHash'] = data_hash
-                            response = self.post(url, files=files_to_upload, data=form, timeout=self.UPLOAD_TIMEOUT)
-                            if response.status_code != 200:
-                                raise AgoraException(
-                                    f"Failed to upload chunk {chunk} of file {cur_file}. Status code: {response.status_code}")
+                raise DownloadError(f'Could not download {url}: status = {response.status_code}',
+                                    transient=response.status_code in self.retry_policy.RETRY_STATUS_CODES)
+
+            try:
+                with open(part_file, mode) as file:
+                    for chunk in response.iter_content(self.DOWNLOAD_CHUNK_SIZE):
+                        file.write(chunk)
+            except requests.exceptions.RequestException as e:
+                raise DownloadError(f'The download of {url} was interrupted: {e}', transient=True) from e
+
+    def _download_segmented(self, url, part_file: Path, plan_file: Path, size: int, segments: int):
+        # The plan is a list of [start, end, position] entries, one per byte range. position is the next byte of the
+        # range to download. It is saved after every write so that an interrupted download can be resumed.
+        plan = self._load_download_plan(plan_file, size) if part_file.exists() else None
+        if plan is None:
+            segment_size = math.ceil(size / segments)
+            plan = [[start, min(start + segment_size, size), start] for start in range(0, size, segment_size)]
+            with open(part_file, 'wb') as file:
+                file.truncate(size)
+            self._save_download_plan(plan_file, size, plan)
+
+        remaining = [segment for segment in plan if segment[2] < segment[1]]
+        if remaining:
+            # the first request tells if the server supports range requests at all
+            response = self._get_range(url, remaining[0])
+            if response.status_code == 200:
+                response.close()
+                self._remove_partial_download(part_file, plan_file)
+                return False
+
+            lock = threading.Lock()
+            with ThreadPoolExecutor(max_workers=len(remaining)) as executor:
+                futures = [executor.submit(self._download_segment, url, part_file, plan_file, size, plan, segment,
+                                           lock, response if index == 0 else None)
+                           for index, segment in enumerate(remaining)]
+                for future in futures:
+                    future.result()
+
+        plan_file.unlink()
+        return True
+
+    def _download_segment(self, url, part_file: Path, plan_file: Path, size: int, plan, segment, lock,
+                          response=None):
+        start, end, position = segment
+        if response is None:
+            response = self._get_range(url, segment)
+
+        with response:
+            if response.status_code != 206:
+                raise DownloadError(f'Could not download the bytes {position}-{end - 1} of {url}: '
+                                    f'status = {response.status_code}',
+                                    transient=response.status_code in self.retry_policy.RETRY_STATUS_CODES)
+            try:
+                with open(part_file, 'r+b') as file:
+                    file.seek(position)
+                    for chunk in response.iter_content(self.DOWNLOAD_CHUNK_SIZE):
+                        chunk = chunk[:end - position]
+                        file.write(chunk)
+                        file.flush()
+                        position += len(chunk)
+                        with lock:
+                            segment[2] = position
+                            self._save_download_plan(plan_file, size, plan)
+                        if position >= end:
                             break
-                        except requests.exceptions.RequestException as e:
-                            # Connection error, retry after waiting for a few seconds
-                            retry_count += 1
-                            delay = 2 ** retry_count
-                            time.sleep(delay)
-                    else:
-                        raise AgoraException(f"Failed to upload chunk {chunk} after {max_retries} retries.")
+            except requests.exceptions.RequestException as e:
+                raise DownloadError(f'The download of {url} was interrupted: {e}', transient=True) from e
+
+        if position < end:
+            raise DownloadError(f'The download of {url} was interrupted at byte {position}', transient=True)
+
+    def _get_range(self, url, segment):
+        start, end, position = segment
+        return self.get(url, stream=True, headers={'Range': f'bytes={position}-{end - 1}'})
+
+    @staticmethod
+    def _load_download_plan(plan_file: Path, size: int):
+        if not plan_file.exists():
+            return None
+        try:
+            with plan_file.open('r') as f:
+                data = json.load(f)
+        except ValueError:
+            return None
+        return data['segments'] if data.get('size') == size else None
+
+    @staticmethod
+    def _save_download_plan(plan_file: Path, size: int, plan):
+        with plan_file.open('w') as f:
+            json.dump({'size': size, 'segments': plan}, f)
+
+    @staticmethod
+    def _remove_partial_download(part_file: Path, plan_file: Path):
+        for file in (part_file, plan_file):
+            if file.exists():
+                file.unlink()
+
+    def upload(self, url, files: List[UploadFile], verify_hash=False, max_retries=5,
+               progress_callback: Optional[ProgressCallback] = None, parallel_chunks: int = None):
+        """Uploads files with the flow.js protocol.
+
+        Arguments:
+            url {str} -- The upload url
+            files {List[UploadFile]} -- The files to upload. Their upload state (identifier, chunks_completed, ...)
+                                        is updated in place so that an interrupted upload can be resumed. The SHA-1
+                                        of a file is computed from the uploaded data and stored in its sha1 (unless
+                                        the upload was resumed, its chunks were uploaded in parallel or it is a
+                                        temporary zip package).
+
+        Keyword Arguments:
+            verify_hash {bool} -- Send the SHA-256 of every chunk so that the server can verify it (default: {False})
+            max_retries {int} -- The number of retries per chunk (default: {5})
+            progress_callback {ProgressCallback} -- Called with the UploadFile whenever its state changes
+                                                    (default: {None})
+            parallel_chunks {int} -- The number of chunks of a file which are uploaded at the same time
+                                     (default: {upload_parallel_chunks})
+        """
+        response = self.get('/api/v1/version/')
+        if response.status_code != 200:
+            raise AgoraException("cannot connect to the Agora server")
 
-                    files[index].chunks_completed = chunk
-                    files[index].size_uploaded += len(data)
+        parallel_chunks = parallel_chunks if parallel_chunks else self.upload_parallel_chunks
 
+        for cur_file in files:
+            filesize, chunks = self._start_file_upload(cur_file)
+            file_hash = self._start_file_hash(cur_file)
+            if parallel_chunks > 1 and len(chunks) > 1:
+                self._upload_chunks_parallel(url, cur_file, chunks, filesize, verify_hash, max_retries,
+                                             parallel_chunks, progress_callback, file_hash=file_hash)
+            else:
+                completed_chunks = set()
+                for chunk in chunks:
+                    if progress_callback:
+                        progress_callback(cur_file)
+                    size = self._upload_chunk(url, cur_file, chunk, filesize, verify_hash, max_retries,
+                                              file_hash=file_hash)
+                    self._set_chunk_completed(cur_file, chunk, size, completed_chunks)
                     if progress_callback:
-                        progress_callback(files[index])
+                        progress_callback(cur_file)
 
-            files[index].uploaded = True
-            progress_callback(files[index])
+            cur_file.sha1 = file_hash.hexdigest() if file_hash else None
+            cur_file.uploaded = True
+            if progress_callback:
+                progress_callback(cur_file)
 
         return True
 
+    def _start_file_upload(self, upload_file: UploadFile):
+        if not upload_file.file.exists() or not upload_file.file.is_file():
+            raise AgoraException('Could not open file ' + str(upload_file.file))
+
+        filesize = upload_file.file.stat().st_size
+        if upload_file.chunk_size is None:
+            # a file which was partially uploaded before the chunk size was stored used the fixed chunk size
+            resumed = upload_file.chunks_completed
+            upload_file.chunk_size = self.UPLOAD_CHUCK_SIZE if resumed or not self.upload_chunk_policy else \
+                self.upload_chunk_policy.next_chunk_size()
+        nof_chunks = math.ceil(filesize / upload_file.chunk_size)
+        upload_file.nr_chunks = nof_chunks
+
+        if upload_file.identifier is None:
+            upload_file.identifier = str(uuid.uuid4())
+
+        # only the chunks up to chunks_completed are known to be on the server. Chunks after it which finished
+        # before an interruption are uploaded again.
+        start_chunk = upload_file.chunks_completed if upload_file.chunks_completed is not None else 0
+        upload_file.chunks_completed = start_chunk
+        upload_file.size_uploaded = min(start_chunk * upload_file.chunk_size, filesize)
+
+        # chunk number starts from 1
+        return filesize, range(start_chunk + 1, nof_chunks + 1)
+
+    @staticmethod
+    def _start_file_hash(upload_file: UploadFile):
+        # the chunks of a resumed upload which are already on the server are not read again. The SHA-1 of a temporary
+        # zip package is not needed, the files in it were hashed while they were zipped.
+        if upload_file.chunks_completed or upload_file.temporary:
+            return None
+        return StreamHash(upload_file.file)
+
+    def _upload_chunks_parallel(self, url, upload_file: UploadFile, chunks, filesize, verify_hash, max_retries,
+                                parallel_chunks, progress_callback: Optional[ProgressCallback] = None,
+                                file_hash: StreamHash = None):
+        # a new chunk is only submitted when another one has finished. Like this there are never more than
+        # parallel_chunks chunks (and open files) in flight.
+        chunks = iter(chunks)
+        completed_chunks = set()
+        pending = {}
+        with ThreadPoolExecutor(max_workers=parallel_chunks) as executor:
+            def submit_next():
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    future = executor.submit(self._upload_chunk, url, upload_file, chunk, filesize, verify_hash,
+                                             max_retries, file_hash)
+                    pending[future] = chunk
+
+            try:
+                for _ in range(parallel_chunks):
+                    submit_next()
+
+                while pending:
+                    if progress_callback:
+                        progress_callback(upload_file)
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        chunk = pending.pop(future)
+                        size = future.result()
+                        self._set_chunk_completed(upload_file, chunk, size, completed_chunks)
+                        submit_next()
+                    if progress_callback:
+                        progress_callback(upload_file)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                # keep the chunks which are still finishing so that a resumed upload doesn't send them again
+                for future, chunk in pending.items():
+                    if not future.cancelled() and future.exception() is None:
+                        self._set_chunk_completed(upload_file, chunk, future.result(), completed_chunks)
+                raise
+
+    @staticmethod
+    def _set_chunk_completed(upload_file: UploadFile, chunk: int, size: int, completed_chunks: set):
+        # chunks_completed is the number of leading chunks which are all on the server. A resumed upload starts after
+        # it, therefore chunks which finish out of order only move it forward once the gap before them is closed.
+        completed_chunks.add(chunk)
+        upload_file.size_uploaded += size
+        while upload_file.chunks_completed + 1 in completed_chunks:
+            upload_file.chunks_completed += 1
+            completed_chunks.discard(upload_file.chunks_completed)
+
+    def _upload_chunk(self, url, upload_file: UploadFile, chunk: int, filesize: int, verify_hash=False, max_retries=5,
+                      file_hash: StreamHash = None):
+        body = self._chunk_body(upload_file, chunk, filesize, verify_hash, file_hash)
+
+        # the chunks are retried here instead of in request() so that every failed attempt is measured
+        retry = 0
+        try:
+            while True:
+                start_time = time.monotonic()
+                response, error = None, None
+                try:
+                    body.rewind()
+                    response = self.post(url, data=body, headers=body.headers,
+                                         timeout=self._upload_timeout(body.length), max_retries=0)
+                    if response.status_code == 200:
+                        self._record_chunk(body.length, time.monotonic() - start_time)
+                        return body.length
+                except requests.exceptions.RequestException as e:
+                    error = e
+                self._record_chunk(body.length, time.monotonic() - start_time, failed=True)
+
+                # a chunk can be sent several times, the server identifies it by the identifier and chunk number
+                if not self.retry_policy.should_retry('POST', retry, status_code=getattr(response, 'status_code', None),
+                                                      error=error, idempotent=True, max_retries=max_retries - 1):
+                    if response is not None:
+                        raise AgoraException(f"Failed to upload chunk {chunk} of file {upload_file.file}. "
+                                             f"Status code: {response.status_code}")
+                    raise AgoraException(f"Failed to upload chunk {chunk} after {max_retries} retries.")
+                retry_after = response.headers.get('Retry-After') if response is not None else None
+                time.sleep(self.retry_policy.delay(retry, retry_after))
+                self.metrics.record_retry('POST', url)
+                retry += 1
+        finally:
+            body.close()
+
+    def _upload_timeout(self, size: int):
+        if self.upload_chunk_policy:
+            return self.upload_chunk_policy.timeout(size, self.UPLOAD_TIMEOUT)
+        return self.UPLOAD_TIMEOUT
+
+    def _record_chunk(self, size: int, duration: float, failed=False):
+        if self.upload_chunk_policy:
+            self.upload_chunk_policy.record(size, duration, failed=failed)
+
+    def _chunk_body(self, upload_file: UploadFile, chunk: int, filesize: int, verify_hash=False,
+                    file_hash: StreamHash = None):
+        # the chunk is streamed from the file while it is sent instead of being read into memory first
+        offset = (chunk - 1) * upload_file.chunk_size
+        length = max(min(upload_file.chunk_size, filesize - offset), 0)
+        form = self._chunk_form(upload_file, chunk, filesize, length)
+        if verify_hash:
+            form['flowFileContentHash'] = sha256_range(upload_file.file, offset, length)
+        return MultipartChunkEncoder(form, 'file', upload_file.file.name, upload_file.file, offset, length,
+                                     file_hash=file_hash)
+
+    def _chunk_form(self, upload_file: UploadFile, chunk: int, filesize: int, chunk_size: int):
+        return {
+            'description': '',
+            'flowChunkNumber': str(chunk),
+            'flowChunkSize': str(upload_file.chunk_size),
+            'flowCurrentChunkSize': str(chunk_size),
+            'flowTotalSize': str(filesize),
+            'flowIdentifier': upload_file.identifier,
+            'flowFilename': upload_file.target,
+            'flowRelativePath': upload_file.target,
+            'flowTotalChunks': str(upload_file.nr_chunks)}
+
     def get_total_size(self, files: List[UploadFile]):
         total_size = 0
         for file in files:
@@ -17,33 +17,42 @@ class BasicConnection(Connection):
         super().__init__(url, verify_certificate=verify_certificate)
         self.user = user
         self.password = password
+        self._auth = None
 
     def get_auth(self):
-        return HTTPBasicAuth(self.user, self.password)
+        if self._auth is None or self._auth.username != self.user or self._auth.password != self.password:
+            self._auth = HTTPBasicAuth(self.user, self.password)
+        return self._auth
 
 
 class ApiKeyConnection(Connection):
     def __init__(self, url, api_key, verify_certificate=True):
         super().__init__(url, verify_certificate=verify_certificate)
         self.api_key = api_key
+        self._auth = None
 
     def get_auth(self):
-        return ApiKeyAuth(self.api_key)
+        if self._auth is None or self._auth.api_key != self.api_key:
+            self._auth = ApiKeyAuth(self.api_key)
+        return self._auth
 
 
 class TokenConnection(Connection):
     def __init__(self, url, verify_certificate=True):
         super().__init__(url, verify_certificate=verify_certificate)
         self.token = None
+        self._auth = None
 
     def get_auth(self):
-        if self.token:
-            return TokenAuth(self.token)
-        return NoAuth()
+        if not self.token:
+            return NoAuth()
+        if self._auth is None or self._auth.token != self.token:
+            self._auth = TokenAuth(self.token)
+        return self._auth
 
     def login(self, client, user, password):
         response = client.post("/api/v1/rest-auth/login/", data={'username': user, 'password': password})
         if response.status_code == 200:
             self.token = response.json()['key']
         else:
-            raise Exception(response.text)
\ No newline at end of file
+            raise Exception(response.text)
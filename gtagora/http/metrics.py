@@ -0,0 +1,193 @@
+import math
+import re
+import threading
+from urllib.parse import urlsplit
+
+
+class Histogram:
+    """A histogram with fixed buckets like the Prometheus histograms. The counts are not cumulative."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Returns (upper bound, number of values <= upper bound) tuples including +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class EndpointMetrics:
+    """The metrics of one HTTP method and url template"""
+
+    def __init__(self, buckets):
+        self.requests = 0
+        self.status_codes = {}
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = Histogram(buckets)
+
+    def snapshot(self):
+        return {
+            'requests': self.requests,
+            'status_codes': dict(self.status_codes),
+            'errors': self.errors,
+            'retries': self.retries,
+            'cache_hits': self.cache_hits,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'latency': {
+                'count': self.latency.count,
+                'sum': self.latency.sum,
+                'buckets': [(bound, count) for bound, count in self.latency.cumulative()],
+            },
+        }
+
+
+class MetricsRegistry:
+    """Collects request metrics of a client per HTTP method and url template.
+
+    The url template is the path of the url with the ids replaced by "{id}", e.g. "/api/v1/folder/{id}/items/", so
+    that all the requests to the same endpoint are counted together. Every attempt of a request is counted, the
+    attempts after the first are also counted as retries.
+
+    Keyword Arguments:
+        buckets {tuple} -- The upper bounds of the latency buckets in seconds (default: {BUCKETS})
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+    PREFIX = 'gtagora_http'
+    # numeric ids, UUIDs and hex digests
+    _ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+                             r'|[0-9a-fA-F]{32,64})$')
+
+    def __init__(self, buckets: tuple = None):
+        self.buckets = tuple(buckets) if buckets else self.BUCKETS
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def template(cls, url: str):
+        """Returns the url template of a url, e.g. "/api/v1/folder/{id}/items/" for
+        "/api/v1/folder/12/items/?limit=5"
+        """
+        path = urlsplit(url).path
+        return '/'.join('{id}' if cls._ID_SEGMENT.match(segment) else segment for segment in path.split('/'))
+
+    def record(self, method: str, url: str, duration: float, status_code: int = None, error=False, retry=False,
+               bytes_sent: int = 0, bytes_received: int = 0):
+        """Records one attempt of a request
+
+        Arguments:
+            method {str} -- The HTTP method
+            url {str} -- The url or path of the request
+            duration {float} -- The time until the response (or the error) in seconds
+
+        Keyword Arguments:
+            status_code {int} -- The status code, None if there was no response (default: {None})
+            error {bool} -- The request failed without a response (default: {False})
+            retry {bool} -- The attempt is a retry of a failed attempt (default: {False})
+            bytes_sent {int} -- The size of the request body (default: {0})
+            bytes_received {int} -- The size of the response body (default: {0})
+        """
+        with self._lock:
+            endpoint = self._endpoint(method, url)
+            endpoint.requests += 1
+            if status_code is not None:
+                endpoint.status_codes[status_code] = endpoint.status_codes.get(status_code, 0) + 1
+            if error:
+                endpoint.errors += 1
+            if retry:
+                endpoint.retries += 1
+            endpoint.bytes_sent += bytes_sent
+            endpoint.bytes_received += bytes_received
+            endpoint.latency.observe(duration)
+
+    def record_retry(self, method: str, url: str):
+        """Records a retry which is made outside of the request, e.g. of an upload chunk"""
+        with self._lock:
+            self._endpoint(method, url).retries += 1
+
+    def record_cache_hit(self, method: str, url: str):
+        """Records a request which was answered from the response cache without asking the server"""
+        with self._lock:
+            self._endpoint(method, url).cache_hits += 1
+
+    def snapshot(self):
+        """Returns the metrics as a dict with "<METHOD> <url template>" keys"""
+        with self._lock:
+            return {f'{method} {template}': endpoint.snapshot()
+                    for (method, template), endpoint in sorted(self._endpoints.items())}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+    def to_prometheus(self, prefix: str = None):
+        """Returns the metrics in the Prometheus text exposition format"""
+        prefix = prefix if prefix else self.PREFIX
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines = []
+
+            def metric(name, metric_type, help_text, values):
+                lines.append(f'# HELP {prefix}_{name} {help_text}')
+                lines.append(f'# TYPE {prefix}_{name} {metric_type}')
+                for suffix, labels, value in values:
+                    lines.append(f'{prefix}_{name}{suffix}{{{self._labels(labels)}}} {self._number(value)}')
+
+            def counter(name, help_text, attribute):
+                metric(name, 'counter', help_text,
+                       [('', {'method': m, 'endpoint': t}, getattr(e, attribute)) for (m, t), e in endpoints])
+
+            metric('requests_total', 'counter', 'The number of requests by status code',
+                   [('', {'method': m, 'endpoint': t, 'status': str(status)}, count)
+                    for (m, t), e in endpoints for status, count in sorted(e.status_codes.items())])
+            counter('errors_total', 'The number of requests which failed without a response', 'errors')
+            counter('retries_total', 'The number of retried requests', 'retries')
+            counter('cache_hits_total', 'The number of requests answered from the response cache', 'cache_hits')
+            counter('sent_bytes_total', 'The number of bytes sent in request bodies', 'bytes_sent')
+            counter('received_bytes_total', 'The number of bytes received in response bodies', 'bytes_received')
+
+            histogram = []
+            for (m, t), e in endpoints:
+                labels = {'method': m, 'endpoint': t}
+                for bound, count in e.latency.cumulative():
+                    histogram.append(('_bucket', {**labels, 'le': '+Inf' if math.isinf(bound) else str(bound)}, count))
+                histogram.append(('_sum', labels, e.latency.sum))
+                histogram.append(('_count', labels, e.latency.count))
+            metric('request_duration_seconds', 'histogram', 'The time until the response was received', histogram)
+
+        return '\n'.join(lines) + '\n'
+
+    def _endpoint(self, method, url):
+        key = (method.upper(), self.template(url))
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = EndpointMetrics(self.buckets)
+        return endpoint
+
+    @staticmethod
+    def _labels(labels: dict):
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return ','.join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+    @staticmethod
+    def _number(value):
+        return repr(float(value)) if isinstance(value, float) else str(value)
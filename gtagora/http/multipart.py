@@ -0,0 +1,173 @@
+import hashlib
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from gtagora.hash_index import get_hash_index
+
+
+class MultipartChunkEncoder:
+    """A multipart/form-data body with form fields and one byte range of a file.
+
+    The file data is not loaded into memory. It is read from the file in small blocks while the body is sent, so that
+    uploading a chunk only needs a few kilobytes regardless of the chunk size. requests sends the body as a stream
+    because it provides read() and its length is known.
+
+    Arguments:
+        fields {dict} -- The form fields which are sent before the file
+        file_field {str} -- The name of the file field
+        filename {str} -- The filename of the file field
+        path {Path} -- The file to read the data from
+        offset {int} -- The position of the first byte in the file
+        length {int} -- The number of bytes to send
+
+    Keyword Arguments:
+        boundary {str} -- The multipart boundary. A random one is used if None (default: {None})
+        file_hash {StreamHash} -- Gets the file data which is read from the file (default: {None})
+    """
+
+    BLOCK_SIZE = 1024 * 1024  # 1MB
+
+    def __init__(self, fields: dict, file_field: str, filename: str, path: Path, offset: int, length: int,
+                 boundary: str = None, file_hash: 'StreamHash' = None):
+        self.fields = fields
+        self.path = Path(path)
+        self.offset = offset
+        self.length = length
+        self.boundary = boundary if boundary else uuid.uuid4().hex
+
+        head = b''.join(self._field_part(name, value) for name, value in fields.items())
+        head += self._part_header(f'name="{file_field}"; filename="{self._quote(filename)}"',
+                                  'Content-Type: application/octet-stream\r\n')
+        self._head = head
+        self._tail = f'\r\n--{self.boundary}--\r\n'.encode()
+        self._position = 0
+        self._file = None
+        self._file_hash = file_hash
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    @property
+    def headers(self):
+        return {'Content-Type': self.content_type, 'Content-Length': str(len(self))}
+
+    def __len__(self):
+        return len(self._head) + self.length + len(self._tail)
+
+    def read(self, size=-1):
+        remaining = len(self) - self._position
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+
+        data = []
+        while size > 0:
+            block = self._read_block(size)
+            self._position += len(block)
+            size -= len(block)
+            data.append(block)
+
+        if self._position >= len(self):
+            self.close()
+        return b''.join(data)
+
+    def _read_block(self, size):
+        head_size = len(self._head)
+        if self._position < head_size:
+            return self._head[self._position:self._position + size]
+
+        file_position = self._position - head_size
+        if file_position < self.length:
+            if self._file is None:
+                self._file = self.path.open('rb')
+            self._file.seek(self.offset + file_position)
+            block = self._file.read(min(size, self.length - file_position))
+            if not block:
+                raise IOError(f'{self.path} is shorter than expected')
+            if self._file_hash is not None:
+                self._file_hash.update(self.offset + file_position, block)
+            return block
+
+        tail_position = file_position - self.length
+        return self._tail[tail_position:tail_position + size]
+
+    def rewind(self):
+        """Starts the body from the beginning, e.g. to send it again after a failed request"""
+        self._position = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _field_part(self, name, value):
+        return self._part_header(f'name="{self._quote(name)}"') + str(value).encode() + b'\r\n'
+
+    def _part_header(self, disposition, extra_headers=''):
+        return f'--{self.boundary}\r\nContent-Disposition: form-data; {disposition}\r\n{extra_headers}\r\n'.encode()
+
+    @staticmethod
+    def _quote(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\r', '%0D').replace('\n', '%0A')
+
+
+class StreamHash:
+    """The hash of a whole file computed from the blocks which are read while its chunks are uploaded.
+
+    The blocks have to arrive in the order of the file. Blocks which were already hashed (e.g. a chunk which is sent
+    again) are ignored. A block after a gap (e.g. from chunks uploaded in parallel) can't be hashed, the digest is
+    then unknown.
+
+    Arguments:
+        path {Path} -- The file
+
+    Keyword Arguments:
+        algorithm {str} -- The hash algorithm (default: {'sha1'})
+    """
+
+    def __init__(self, path: Path, algorithm='sha1'):
+        self.path = Path(path)
+        self.algorithm = algorithm
+        self.position = 0
+        self.complete = True
+        self._hash = hashlib.new(algorithm)
+        self._stat = os.stat(self.path)
+        self._lock = threading.Lock()
+
+    def update(self, offset: int, data: bytes):
+        with self._lock:
+            if offset > self.position:
+                self.complete = False
+            if not self.complete or offset + len(data) <= self.position:
+                return
+            self._hash.update(memoryview(data)[self.position - offset:])
+            self.position = offset + len(data)
+
+    def hexdigest(self):
+        """Returns the digest if the whole file was hashed, otherwise None. The digest is added to the hash index."""
+        if not self.complete or self.position != self._stat.st_size:
+            return None
+        digest = self._hash.hexdigest()
+        index = get_hash_index()
+        if index is not None:
+            index.put(self.path, self.algorithm, digest, stat=self._stat)
+        return digest
+
+
+def sha256_range(path: Path, offset: int, length: int, buffer_size=MultipartChunkEncoder.BLOCK_SIZE):
+    """Returns the SHA-256 of length bytes of a file starting at offset. The data is read with one reusable buffer."""
+    sha256 = hashlib.sha256()
+    buffer = bytearray(max(min(buffer_size, length), 1))
+    view = memoryview(buffer)
+    remaining = length
+    with Path(path).open('rb') as file:
+        file.seek(offset)
+        while remaining > 0:
+            size = file.readinto(view[:min(len(buffer), remaining)])
+            if not size:
+                raise IOError(f'{path} is shorter than expected')
+            sha256.update(view[:size])
+            remaining -= size
+    return sha256.hexdigest()
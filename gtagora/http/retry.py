@@ -0,0 +1,139 @@
+import datetime
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+
+class RetryBudget:
+    """Limits the retries of a client to a fraction of its requests.
+
+    Every request deposits ratio tokens into a bucket and every retry takes one token out of it. When the server is
+    unhealthy and most requests fail, the bucket runs empty and the failures are returned instead of being retried,
+    so that many workers don't multiply the load on a server which is already struggling.
+
+    Keyword Arguments:
+        ratio {float} -- The number of retries allowed per request (default: {RATIO})
+        capacity {float} -- The size of the bucket, i.e. the retries allowed in a burst (default: {CAPACITY})
+    """
+
+    RATIO = 0.2
+    CAPACITY = 10
+
+    def __init__(self, ratio: float = None, capacity: float = None):
+        self.ratio = ratio if ratio is not None else self.RATIO
+        self.capacity = capacity if capacity is not None else self.CAPACITY
+        self.tokens = self.capacity
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class RetryPolicy:
+    """Decides whether a failed request is sent again and how long to wait before.
+
+    Requests are retried after transport errors (connection reset, timeout, ...) and after the status codes in
+    RETRY_STATUS_CODES. Methods which are not idempotent (POST, PATCH) are only retried when the server cannot have
+    processed the request: when the connection could not be established or the server answered 429. A request can be
+    marked as idempotent to retry it like a GET (e.g. the upload of a chunk).
+
+    The delay is a random value between 0 and an exponentially growing maximum ("full jitter"), unless the server
+    sends a Retry-After header.
+
+    Keyword Arguments:
+        max_retries {int} -- The maximum number of retries of a request (default: {MAX_RETRIES})
+        backoff_base {float} -- The maximum delay of the first retry in seconds (default: {BACKOFF_BASE})
+        backoff_max {float} -- The maximum delay of any retry in seconds (default: {BACKOFF_MAX})
+        budget {RetryBudget} -- Limits the retries to a fraction of the requests. No limit if None (default: {None})
+    """
+
+    MAX_RETRIES = 3
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 30
+    # a Retry-After longer than this is not waited for
+    RETRY_AFTER_MAX = 120
+    RETRY_STATUS_CODES = (429, 502, 503, 504)
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+    def __init__(self, max_retries: int = None, backoff_base: float = None, backoff_max: float = None,
+                 budget: RetryBudget = None):
+        self.max_retries = max_retries if max_retries is not None else self.MAX_RETRIES
+        self.backoff_base = backoff_base if backoff_base is not None else self.BACKOFF_BASE
+        self.backoff_max = backoff_max if backoff_max is not None else self.BACKOFF_MAX
+        self.budget = budget
+
+    def on_request(self):
+        """Called once for every request (not for its retries)"""
+        if self.budget:
+            self.budget.deposit()
+
+    def should_retry(self, method: str, retry: int, status_code: int = None, error: Exception = None,
+                     connect_error=False, idempotent: bool = None, max_retries: int = None):
+        """Returns True if the request should be sent again
+
+        Arguments:
+            method {str} -- The HTTP method
+            retry {int} -- The number of retries which have already been made
+
+        Keyword Arguments:
+            status_code {int} -- The status code of the response, None if there was no response (default: {None})
+            error {Exception} -- The transport error if there was no response (default: {None})
+            connect_error {bool} -- The connection to the server could not be established (default: {False})
+            idempotent {bool} -- Overrides whether the method is idempotent (default: {None})
+            max_retries {int} -- Overrides the maximum number of retries (default: {None})
+        """
+        max_retries = max_retries if max_retries is not None else self.max_retries
+        if retry >= max_retries:
+            return False
+
+        if idempotent is None:
+            idempotent = method.upper() in self.IDEMPOTENT_METHODS
+
+        if error is not None:
+            retryable = idempotent or connect_error
+        elif status_code in self.RETRY_STATUS_CODES:
+            retryable = idempotent or status_code == 429
+        else:
+            retryable = False
+
+        if retryable and self.budget:
+            return self.budget.withdraw()
+        return retryable
+
+    def delay(self, retry: int, retry_after: str = None):
+        """Returns the time in seconds to wait before the next retry
+
+        Arguments:
+            retry {int} -- The number of retries which have already been made
+
+        Keyword Arguments:
+            retry_after {str} -- The Retry-After header of the response (default: {None})
+        """
+        delay = self._parse_retry_after(retry_after)
+        if delay is not None:
+            return min(delay, self.RETRY_AFTER_MAX)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retry))
+
+    @staticmethod
+    def _parse_retry_after(retry_after):
+        if not retry_after:
+            return None
+        try:
+            return max(float(retry_after), 0)
+        except ValueError:
+            pass
+        try:
+            date = parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=datetime.timezone.utc)
+        return max((date - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0)
@@ -1,6 +1,8 @@
 import pprint
 import re
 import unicodedata
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from gtagora.exception import AgoraException
 
@@ -11,12 +13,29 @@ def get_client(http_client):
     return http_client if http_client else Agora.default_client
 
 
+def get_sync_client(async_client):
+    """Returns the synchronous client which is used by the models returned from the async methods."""
+    from gtagora.http.async_client import AsyncClient
+
+    if not isinstance(async_client, AsyncClient):
+        raise AgoraException('The async methods need an AsyncClient as http_client')
+    return async_client.client
+
+
 class BaseModel:
 
     BASE_URL = ''
     BASE_URL_V2 = ''
 
     V2_DEFAULT = False
+    # the number of objects requested at once by the iter_* methods
+    PAGE_SIZE = 500
+    # the number of pages the iter_* methods request concurrently ahead of the consumer
+    PREFETCH_PAGES = 4
+    # the number of objects get_many requests concurrently
+    GET_MANY_WORKERS = 8
+    # objects whose state changes on the server (e.g. polled jobs) are not kept in the identity map
+    IDENTITY_MAP = True
 
     def __init__(self, http_client=None):
         self.http_client = get_client(http_client)
@@ -41,6 +60,46 @@ class BaseModel:
         instance = cls(http_client=http_client)
         return instance._get_object(id)
 
+    @classmethod
+    def get_many(cls, ids, max_workers: int = None, http_client=None):
+        """Gets many objects by their id. The objects are requested concurrently.
+
+        An id which appears more than once is only requested once. The errors do not stop the other requests but are
+        returned by id.
+
+        Arguments:
+            ids {Iterable} -- The ids of the objects
+
+        Keyword Arguments:
+            max_workers {int} -- The number of concurrent requests (default: {GET_MANY_WORKERS})
+            http_client {Client} -- The client (default: {Agora.default_client})
+
+        Returns:
+            tuple -- (objects, errors). objects is a list in the order of the ids with None for the ids which could
+                     not be requested. errors is a dict of id -> AgoraException
+        """
+        ids = list(ids)
+        unique_ids = list(dict.fromkeys(ids))
+        max_workers = int(max_workers if max_workers else cls.GET_MANY_WORKERS)
+        http_client = get_client(http_client)
+
+        def get(id):
+            try:
+                return cls.get(id, http_client=http_client), None
+            except Exception as e:
+                if isinstance(e, AgoraException):
+                    return None, e
+                return None, AgoraException(f'Could not get the {cls.__name__} {id}: {e}')
+
+        if not unique_ids:
+            return [], {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_ids))) as executor:
+            results = dict(zip(unique_ids, executor.map(get, unique_ids)))
+
+        objects = [results[id][0] for id in ids]
+        errors = {id: error for id, (_, error) in results.items() if error is not None}
+        return objects, errors
+
     @classmethod
     def get_list(cls, filters=None, http_client=None):
         if filters and not isinstance(filters, dict):
@@ -54,6 +113,48 @@ class BaseModel:
         url = cls.get_base_url()
         return instance._get_object_list(url, filters, cls)
 
+    @classmethod
+    def iter_list(cls, filters=None, page_size: int = None, prefetch_pages: int = None, http_client=None):
+        """Like get_list, but the objects are requested page by page while they are consumed
+
+        Keyword Arguments:
+            filters {dict} -- The filters (default: {None})
+            page_size {int} -- The number of objects per request (default: {PAGE_SIZE})
+            prefetch_pages {int} -- The number of pages requested concurrently ahead of the consumer, 0 requests a
+                                    page only when the previous one has been consumed (default: {PREFETCH_PAGES})
+            http_client {Client} -- The client (default: {Agora.default_client})
+
+        Returns:
+            Iterator -- The objects
+        """
+        if filters and not isinstance(filters, dict):
+            raise AgoraException('The filter must be a dict')
+
+        instance = cls(http_client=http_client)
+        return instance._iter_object_list(cls.get_base_url(), filters, cls, page_size=page_size,
+                                          prefetch_pages=prefetch_pages)
+
+    @classmethod
+    async def aget(cls, id=None, http_client=None):
+        """Async variant of get. The http_client must be an AsyncClient."""
+        instance = cls(http_client=get_sync_client(http_client))
+        response = await http_client.get(instance._get_object_url(id))
+        return instance._object_from_response(response)
+
+    @classmethod
+    async def aget_list(cls, filters=None, http_client=None):
+        """Async variant of get_list. The http_client must be an AsyncClient."""
+        if filters and not isinstance(filters, dict):
+            raise AgoraException('The filter must be a dict')
+
+        instance = cls(http_client=get_sync_client(http_client))
+        filters = filters if filters else {}
+        if 'limit' not in filters:
+            filters['limit'] = '10000000000'
+
+        response = await http_client.get(cls.get_base_url(), params=filters)
+        return instance._object_list_from_response(response, cls)
+
     @classmethod
     def get_list_from_data(cls, data):
         object_list = []
@@ -79,6 +180,7 @@ class BaseModel:
         response = self.http_client.delete(url)
 
         if response.status_code == 204:
+            self._invalidate()
             return True
         raise AgoraException('Could not delete FolderItem')
 
@@ -100,7 +202,8 @@ class BaseModel:
 
     def to_dict(self):
         excluded_keys = ['http_client']
-        return dict( (key, value) for (key, value) in self.__dict__.items() if key not in excluded_keys and not key.startswith('__'))
+        return dict((key, value) for (key, value) in self.__dict__.items()
+                    if key not in excluded_keys and not key.startswith('_'))
 
     def content_type(self):
         from gtagora.models.dataset import Dataset
@@ -125,12 +228,52 @@ class BaseModel:
             setattr(self, key, value)
 
     def _get_object(self, id):
+        identity_map = self._identity_map()
+        if identity_map is not None and id:
+            instance = identity_map.get(self.__class__, id)
+            if instance is not None:
+                return instance
+        return self._fetch_object(id)
+
+    def _fetch_object(self, id):
+        """Requests the object even if it is in the identity map and replaces the kept instance"""
+        response = self.http_client.get(self._get_object_url(id))
+        instance = self._object_from_response(response)
+        identity_map = self._identity_map()
+        if identity_map is not None and id:
+            identity_map.put(instance, self.__class__)
+        return instance
+
+    def _get_prefetched(self, name, filters=None):
+        """Returns the prefetched related objects or None if they were not prefetched. Filtered requests are never
+        answered from the prefetched objects."""
+        prefetched = getattr(self, '_prefetched', None)
+        if filters or not prefetched or name not in prefetched:
+            return None
+        return list(prefetched[name])
+
+    def _set_prefetched(self, name, objects):
+        if getattr(self, '_prefetched', None) is None:
+            self._prefetched = {}
+        self._prefetched[name] = objects
+
+    def _identity_map(self):
+        if not self.IDENTITY_MAP:
+            return None
+        return getattr(self.http_client, 'identity_map', None)
+
+    def _invalidate(self):
+        """Removes this object from the identity map after it has been changed"""
+        identity_map = self._identity_map()
+        if identity_map is not None and getattr(self, 'id', None) is not None:
+            identity_map.invalidate(self.__class__, self.id)
+
+    def _get_object_url(self, id):
         if id:
-            url = f'{self.base_url}{id}/'
-        else:
-            url = f'{self.base_url}'
+            return f'{self.base_url}{id}/'
+        return f'{self.base_url}'
 
-        response = self.http_client.get(url)
+    def _object_from_response(self, response):
         if response.status_code == 200:
             data = response.json()
             return self.__class__.from_response(data, http_client=self.http_client)
@@ -139,7 +282,92 @@ class BaseModel:
 
     def _get_object_list(self, url, params, object_class):
         response = self.http_client.get(url, params=params)
+        return self._object_list_from_response(response, object_class)
+
+    def _iter_object_list(self, url, params, object_class, page_size: int = None, prefetch_pages: int = None):
+        """Yields the objects of a list endpoint page by page, see _iter_data"""
+        for data in self._iter_data(url, params, object_class.__name__, page_size=page_size,
+                                    prefetch_pages=prefetch_pages):
+            yield object_class.from_response(data, http_client=self.http_client)
+
+    def _iter_data(self, url, params, name, page_size: int = None, prefetch_pages: int = None):
+        """Yields the json objects of a list endpoint. The list is requested in pages of page_size objects with limit
+        and offset. A limit and offset in the params are respected.
+
+        Once the first page tells the total count, up to prefetch_pages of the following pages are requested
+        concurrently while the objects are consumed. They are yielded in order. With prefetch_pages=0 a page is only
+        requested when the previous one has been consumed. A server which returns fewer objects than requested (e.g.
+        because of a maximum limit) sets the page size of the following pages."""
+        params = dict(params) if params else {}
+        page_size = int(page_size if page_size else self.PAGE_SIZE)
+        prefetch_pages = int(prefetch_pages if prefetch_pages is not None else self.PREFETCH_PAGES)
+        limit = int(params.pop('limit')) if 'limit' in params else None
+        offset = int(params.pop('offset', 0))
+        end = offset + limit if limit is not None else None
+
+        while end is None or offset < end:
+            size = page_size if end is None else min(page_size, end - offset)
+            data = self._get_page(url, params, offset, size, name)
+            if isinstance(data, list):
+                # the endpoint is not paginated and returns the whole list at once
+                yield from data
+                return
+
+            results = data.get('results', [])
+            yield from results
+
+            offset += len(results)
+            if not results or not data.get('next', True) or offset >= data.get('count', offset + 1):
+                return
+            # the server caps the limit, the offsets of the following pages must use its page size
+            page_size = min(page_size, len(results))
+            if prefetch_pages > 0 and 'count' in data:
+                end = min(end, data['count']) if end is not None else data['count']
+                yield from self._prefetch_pages(url, params, offset, end, page_size, prefetch_pages, name)
+                return
+
+    def _prefetch_pages(self, url, params, offset, end, page_size, prefetch_pages, name):
+        offsets = iter(range(offset, end, page_size))
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=prefetch_pages)
+
+        def submit_next():
+            page_offset = next(offsets, None)
+            if page_offset is not None:
+                size = min(page_size, end - page_offset)
+                pending.append((page_offset, size, executor.submit(self._get_page, url, params, page_offset, size,
+                                                                   name)))
 
+        try:
+            for _ in range(prefetch_pages):
+                submit_next()
+            while pending:
+                page_offset, size, future = pending.popleft()
+                data = future.result()
+                results = data.get('results', []) if isinstance(data, dict) else data
+                yield from results
+                if len(results) < size:
+                    # a short page leaves a gap before the next prefetched page (the server lowered its maximum
+                    # limit or the list shrank), the rest is requested one page after the other
+                    if results:
+                        next_offset = page_offset + len(results)
+                        params = {**params, 'offset': next_offset, 'limit': end - next_offset}
+                        yield from self._iter_data(url, params, name, page_size=len(results), prefetch_pages=0)
+                    return
+                submit_next()
+        finally:
+            # the consumer may stop early, the pages which were not yet requested are dropped
+            for _, _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _get_page(self, url, params, offset, size, name):
+        response = self.http_client.get(url, params={**params, 'limit': size, 'offset': offset})
+        if response.status_code != 200:
+            raise AgoraException(f'Could not get the {name} list')
+        return response.json()
+
+    def _object_list_from_response(self, response, object_class):
         if response.status_code == 200:
             data = response.json()
             object_list = []
@@ -152,11 +380,11 @@ class BaseModel:
                     print('Warning: Could not get all series')
 
                 for r in results:
-                    object_list.append(object_class.from_response(r))
+                    object_list.append(object_class.from_response(r, http_client=self.http_client))
             elif isinstance(data, list):
-                object_list = [object_class.from_response(d) for d in data]
+                object_list = [object_class.from_response(d, http_client=self.http_client) for d in data]
             else:
-                return object_class.from_response(data)
+                return object_class.from_response(data, http_client=self.http_client)
 
             return object_list
 
@@ -168,9 +396,16 @@ class BaseModel:
 
 class DownloadDatasetMixin:
 
-    def download(self, filename):
+    def download(self, filename, max_workers: int = None):
+        from gtagora.models.download_manager import DownloadManager
+
         datasets = self.get_datasets()
-        return [dataset.download(filename) for dataset in datasets]
+        manager = DownloadManager(self.http_client, max_workers=max_workers)
+        for dataset in datasets:
+            manager.add_dataset(dataset, filename)
+        tasks = manager.run().tasks
+        # one list of paths per dataset like dataset.download
+        return [[task.path for task in tasks if task.dataset is dataset] for dataset in datasets]
 
 
 class LinkToFolderMixin:
@@ -213,6 +448,13 @@ class LinkToFolderMixin:
 
         return folders
 
+    def iter_folders(self, page_size: int = None, prefetch_pages: int = None):
+        """Like get_folders, but the folders are requested page by page while they are consumed"""
+        from gtagora.models.folder import Folder
+
+        url = f'{self.base_url}{self.id}/folders/'
+        return self._iter_object_list(url, None, Folder, page_size=page_size, prefetch_pages=prefetch_pages)
+
     def is_in_folder(self, object: BaseModel, folder):
         from gtagora.models.folder import Folder
 
@@ -244,7 +486,7 @@ class SearchMixin:
             raise AgoraException('The search term must be a string')
 
         url = f'{instance.base_url}search/?q=' + search_string + '&limit=10000000000'
-        response = http_client.get(url)
+        response = instance.http_client.get(url)
         if response.status_code == 200:
             list = instance.get_list_from_data(response.json())
             return list
@@ -253,6 +495,18 @@ class SearchMixin:
 
         return []
 
+    @classmethod
+    def iter_search(cls, search_string, page_size: int = None, prefetch_pages: int = None, http_client=None):
+        """Like search, but the results are requested page by page while they are consumed"""
+        instance = cls(http_client=http_client)
+
+        if not isinstance(search_string, str):
+            raise AgoraException('The search term must be a string')
+
+        url = f'{instance.base_url}search/'
+        return instance._iter_object_list(url, {'q': search_string}, cls, page_size=page_size,
+                                          prefetch_pages=prefetch_pages)
+
 
 class TagMixin:
     def tag(self, tag):
@@ -269,6 +523,7 @@ class TagMixin:
         post_data = {'tag_definition': tag_id, 'tagged_object_content_type': self.content_type(), 'tagged_object_id': self.id}
         response = self.http_client.post(url, post_data)
         if response.status_code == 201:
+            self._invalidate()
             instances = TagInstance.get_list_from_data(response.json())
             if instances:
                 return instances[0]
@@ -312,6 +567,7 @@ class TagMixin:
             url = TagInstance.get_base_url() + f'{tag_instance.id}/'
             response = self.http_client.delete(url)
             if response.status_code == 204:
+                self._invalidate()
                 return True
             else:
                 raise AgoraException(f'Could not remove the tag: {response.text}')
@@ -341,6 +597,9 @@ class RatingMixin:
             post_data = {'value': value, 'rated_object_content_type': self.content_type(), 'rated_object_id': self.id}
             response = self.http_client.post(url, post_data)
 
+        if response.status_code < 400:
+            self._invalidate()
+
         if response.status_code == 204:
             return None
 
@@ -366,32 +625,79 @@ class RatingMixin:
 
 
 class RelationMixin:
-    def relations(self):
+    # the number of related objects requested concurrently
+    RELATION_WORKERS = 8
+
+    def relations(self, fetch=True, max_workers: int = None):
+        """Returns the objects which are related to this object
+
+        The related objects can be exams, series, datasets, ... and are requested concurrently.
+
+        Keyword Arguments:
+            fetch {bool} -- Request the related objects. If False, instances with only the id and the other
+                            fields of the relation are returned without any further request (default: {True})
+            max_workers {int} -- The number of concurrent requests (default: {RELATION_WORKERS})
+
+        Returns:
+            List[BaseModel] -- The related objects
+        """
         url = f'{self.BASE_URL}{self.id}/datarelations/'
         response = self.http_client.get(url)
-        if response.status_code == 200:
-            if not response.json() or not isinstance(response.json(), list) or len(response.json()) == 0:
-                return []
-            relations = []
-            for relation in response.json():
-                object = None
-                if relation.get('from_object', {}).get('object_id') == self.id:
-                    object = relation.get('to_object')
-                elif relation.get('to_object', {}).get('object_id') == self.id:
-                    object = relation.get('from_object')
-                if object:
-                    id = object.get('object_id', None)
-                    if not id:
-                        continue
-                    instance = self.get(id, http_client=self.http_client)
-                    if instance:
-                        relations.append(instance)
-                else:
-                    continue
-            return relations
-        else:
+        if response.status_code != 200:
             raise AgoraException(f'Cannot get the relations: {response.text}')
 
+        data = response.json()
+        if not data or not isinstance(data, list):
+            return []
+
+        references = []
+        for relation in data:
+            object = None
+            if relation.get('from_object', {}).get('object_id') == self.id:
+                object = relation.get('to_object')
+            elif relation.get('to_object', {}).get('object_id') == self.id:
+                object = relation.get('from_object')
+            if object and object.get('object_id', None):
+                model_class = self._relation_class(object.get('content_type'))
+                references.append((model_class, object['object_id'], object))
+
+        if not fetch:
+            # content_type and object_id describe the relation and would shadow content_type() of the model
+            return [model_class.from_response({**{key: value for key, value in object.items()
+                                                  if key not in ('content_type', 'object_id')}, 'id': id},
+                                              http_client=self.http_client)
+                    for model_class, id, object in references]
+
+        unique = list(dict.fromkeys((model_class, id) for model_class, id, _ in references))
+        if not unique:
+            return []
+
+        max_workers = int(max_workers if max_workers else self.RELATION_WORKERS)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as executor:
+            instances = dict(zip(unique, executor.map(
+                lambda key: key[0].get(key[1], http_client=self.http_client), unique)))
+
+        return [instances[(model_class, id)] for model_class, id, _ in references if instances[(model_class, id)]]
+
+    def _relation_class(self, content_type):
+        """Returns the model class of a related object. The class of this object is assumed if the relation has no
+        known content type."""
+        from gtagora.models.dataset import Dataset
+        from gtagora.models.exam import Exam
+        from gtagora.models.folder import Folder
+        from gtagora.models.patient import Patient
+        from gtagora.models.series import Series
+
+        model_classes = {
+            'exam': Exam,
+            'serie': Series,
+            'series': Series,
+            'dataset': Dataset,
+            'folder': Folder,
+            'patient': Patient,
+        }
+        return model_classes.get(str(content_type).lower(), self.__class__)
+
 
 class UIDGetMixin:
     @classmethod
@@ -419,21 +725,34 @@ class ParametersMixin:
     endpoint for the object type (e.g. ``/api/v2/exam/``).
     """
 
-    def get_parametersets(self):
-        """Return all ParameterSets associated with this object."""
+    def get_parametersets(self, refresh=False):
+        """Return all ParameterSets associated with this object.
+
+        The ParameterSets are requested concurrently and kept on this object, so that later calls (and the
+        set/update of parameters) do not request them again.
+
+        Args:
+            refresh: Request the ParameterSets again instead of returning the kept ones.
+        """
         from gtagora.models.parameter_set import ParameterSet
 
+        parametersets = getattr(self, '_parametersets', None)
+        if parametersets is not None and not refresh:
+            return list(parametersets)
+
         url = f'{self.BASE_URL_V2}{self.id}/parametersets/'
         response = self.http_client.get(url)
         if response.status_code != 200:
             raise AgoraException(
                 f'Could not get parametersets. HTTP status = {response.status_code}: {response.text}'
             )
-        parametersets = []
-        for parset in response.json():
-            if 'id' in parset:
-                parametersets.append(ParameterSet.get(parset['id'], http_client=self.http_client))
-        return parametersets
+        ids = [parset['id'] for parset in response.json() if 'id' in parset]
+        parametersets, errors = ParameterSet.get_many(ids, http_client=self.http_client)
+        if errors:
+            raise next(iter(errors.values()))
+
+        self._parametersets = parametersets
+        return list(parametersets)
 
     def set_parameters(self, parameters, name: str = 'User Parameters'):
         """Create or update a user-defined ParameterSet by name (upsert — replaces all parameters).
@@ -462,14 +781,15 @@ class ParametersMixin:
 
         existing = self._find_user_parameterset(name)
         if existing is not None:
-            return ParameterSet.update(self.http_client, existing.id, name, params)
-        return ParameterSet.create(self.http_client, parent_url, name, params)
+            return self._remember_parameterset(ParameterSet.update(self.http_client, existing.id, name, params))
+        return self._remember_parameterset(ParameterSet.create(self.http_client, parent_url, name, params))
 
     def update_parameters(self, parameters, name: str = 'User Parameters'):
         """Add or update individual parameters in a ParameterSet, preserving existing ones.
 
-        Fetches the existing parameter list for the named ParameterSet (creating it if
-        it doesn't exist yet), merges the provided values in, and saves the result.
+        Fetches the current parameter list of the named ParameterSet right before the
+        merge (creating the set if it doesn't exist yet), merges the provided values in,
+        and saves the result.
         Parameters not mentioned in ``parameters`` are left unchanged.
 
         Args:
@@ -489,10 +809,12 @@ class ParametersMixin:
 
         existing = self._find_user_parameterset(name)
         if existing is None:
-            return ParameterSet.create(self.http_client, parent_url, name, new_params)
+            return self._remember_parameterset(ParameterSet.create(self.http_client, parent_url, name, new_params))
 
-        merged = self._merge_parameters(existing.get_parameters(), new_params)
-        return ParameterSet.update(self.http_client, existing.id, name, merged)
+        # the kept ParameterSet can be outdated, the changes made by others since it was loaded must not be lost
+        current = ParameterSet(self.http_client)._fetch_object(existing.id)
+        merged = self._merge_parameters(current.get_parameters(), new_params)
+        return self._remember_parameterset(ParameterSet.update(self.http_client, existing.id, name, merged))
 
     def add_parameters(self, parameters, name: str = 'User Parameters'):
         """Create a new user-defined ParameterSet (always creates, never updates).
@@ -510,7 +832,7 @@ class ParametersMixin:
 
         params = self._normalise_parameters(parameters)
         parent_url = f'{self.BASE_URL_V2}{self.id}/parametersets/'
-        return ParameterSet.create(self.http_client, parent_url, name, params)
+        return self._remember_parameterset(ParameterSet.create(self.http_client, parent_url, name, params))
 
     # ------------------------------------------------------------------
     # Internal helpers
@@ -558,6 +880,17 @@ class ParametersMixin:
         merged.extend(new_by_name.values())
         return merged
 
+    def _remember_parameterset(self, parameterset):
+        """Replace or add a created/updated ParameterSet in the kept ParameterSets."""
+        parametersets = getattr(self, '_parametersets', None)
+        if parametersets is not None:
+            ids = [ps.id for ps in parametersets]
+            if parameterset.id in ids:
+                parametersets[ids.index(parameterset.id)] = parameterset
+            else:
+                parametersets.append(parameterset)
+        return parameterset
+
     def _find_user_parameterset(self, name: str):
         """Return the first writable ParameterSet with the given name, or None."""
         try:
@@ -0,0 +1,248 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+_MISSING = object()
+
+
+class IdentityMap:
+    """A cache of model instances keyed by their class and id.
+
+    BaseModel.get returns the cached instance of an object instead of requesting it again until the instance is older
+    than the TTL. The least recently used instances are removed when there are more than max_size. The writes of the
+    models (rename, move, tag, delete, ...) remove the changed object from the map.
+
+    Keyword Arguments:
+        max_size {int} -- The maximum number of cached instances (default: {MAX_SIZE})
+        ttl {float} -- The time in seconds an instance is returned from the cache (default: {TTL})
+    """
+
+    MAX_SIZE = 10000
+    TTL = 300
+
+    def __init__(self, max_size: int = None, ttl: float = None):
+        self.max_size = max_size if max_size else self.MAX_SIZE
+        self.ttl = ttl if ttl is not None else self.TTL
+        self.hits = 0
+        self.misses = 0
+        self._instances = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_class, id):
+        return model_class, str(id)
+
+    def get(self, model_class, id):
+        """Returns the cached instance or None if it is not cached or expired"""
+        key = self.key(model_class, id)
+        with self._lock:
+            entry = self._instances.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._instances[key]
+                self.misses += 1
+                return None
+            self._instances.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, instance, model_class=None):
+        """Caches an instance. The class of the instance is used as key if no model_class is given."""
+        id = getattr(instance, 'id', None)
+        if id is None:
+            return
+        key = self.key(model_class if model_class else type(instance), id)
+        with self._lock:
+            self._instances[key] = (time.monotonic() + self.ttl, instance)
+            self._instances.move_to_end(key)
+            while len(self._instances) > self.max_size:
+                self._instances.popitem(last=False)
+
+    def invalidate(self, model_class, id):
+        """Removes an object from the cache. The instances cached for subclasses or base classes are removed too."""
+        id = str(id)
+        with self._lock:
+            for key in [k for k in self._instances if k[1] == id and
+                        (issubclass(k[0], model_class) or issubclass(model_class, k[0]))]:
+                del self._instances[key]
+
+    def clear(self):
+        with self._lock:
+            self._instances.clear()
+
+    def __len__(self):
+        return len(self._instances)
+
+
+class FolderPathCache:
+    """A cache which resolves folder paths without requests
+
+    It remembers the subfolders of a folder by name, the parent and name of a folder and the folder instances. It is
+    filled from the folder listings, the folder trees, the breadcrumbs and the created folders (the parents only from
+    the breadcrumbs and the created folders), so that
+    Folder.get_folder and Folder.get_or_create resolve a known path without any request. The breadcrumb of a folder
+    whose ancestors are all known up to a root folder is built from memory too, which answers is_subfolder_of, path,
+    parent and is_in_folder without requests. The folder ids are unique across the projects, so one cache serves all
+    projects.
+
+    Keyword Arguments:
+        max_size {int} -- The maximum number of cached folders (default: {MAX_SIZE})
+        ttl {float} -- The time in seconds an entry is used (default: {TTL})
+    """
+
+    MAX_SIZE = 100000
+    TTL = 600
+
+    def __init__(self, max_size: int = None, ttl: float = None):
+        self.max_size = max_size if max_size else self.MAX_SIZE
+        self.ttl = ttl if ttl is not None else self.TTL
+        self.hits = 0
+        self.misses = 0
+        # (parent id, name) -> folder id
+        self._children = OrderedDict()
+        # folder id -> parent id, None for the root folders
+        self._parents = OrderedDict()
+        # folder id -> name
+        self._names = OrderedDict()
+        # folder id -> Folder
+        self._folders = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, parent_id, name: str):
+        """Returns the subfolder with the name or None if it is not cached"""
+        with self._lock:
+            folder_id = self._get(self._children, (str(parent_id), name))
+            folder = self._get(self._folders, str(folder_id)) if folder_id is not None else None
+            if folder is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return folder
+
+    def parent(self, folder_id):
+        """Returns the parent folder, None if it is not cached"""
+        with self._lock:
+            parent_id = self._get(self._parents, str(folder_id))
+            return self._get(self._folders, str(parent_id)) if parent_id is not None else None
+
+    def parent_id(self, folder_id):
+        """Returns the id of the parent folder, None if it is not cached"""
+        with self._lock:
+            return self._get(self._parents, str(folder_id))
+
+    def ancestors(self, folder_id):
+        """Returns the (folder id, name) tuples from the root folder to the folder or None if the path to the root
+        folder is not completely cached"""
+        with self._lock:
+            path = []
+            while len(path) <= len(self._names):
+                name = self._get(self._names, str(folder_id), _MISSING)
+                parent_id = self._get(self._parents, str(folder_id), _MISSING)
+                if name is _MISSING or parent_id is _MISSING:
+                    return None
+                path.append((folder_id, name))
+                if parent_id is None:
+                    return path[::-1]
+                folder_id = parent_id
+            # the parents form a cycle
+            return None
+
+    def put(self, parent_id, folder):
+        """Caches a folder which was created in the folder with the id parent_id. Only the instance is cached if
+        parent_id is None"""
+        with self._lock:
+            self._put_folder(parent_id, folder)
+
+    def put_listing(self, parent_id, folders):
+        """Caches the subfolders of a folder listing. A name is resolved to the first folder with the name.
+
+        A folder can be linked into several folders, so a listing doesn't tell the parent of its subfolders. The
+        parents are only taken from the breadcrumbs and the created folders."""
+        with self._lock:
+            for folder in reversed(list(folders)):
+                self._put_folder(parent_id, folder, is_parent=False)
+
+    def put_path(self, path):
+        """Caches the names and parents of a path given as (folder id, name) tuples from the root folder on"""
+        with self._lock:
+            if not path:
+                return
+            # the first folder of a path is a root folder
+            self._put(self._parents, str(path[0][0]), None)
+            if path[0][1] is not None:
+                self._put(self._names, str(path[0][0]), path[0][1])
+            for (parent_id, _), (folder_id, name) in zip(path, path[1:]):
+                if name is not None:
+                    self._put(self._children, (str(parent_id), name), folder_id)
+                    self._put(self._names, str(folder_id), name)
+                self._put(self._parents, str(folder_id), parent_id)
+
+    def invalidate(self, folder_id):
+        """Removes a folder and all the folders cached beneath it, e.g. after it has been deleted"""
+        with self._lock:
+            self._remove([str(folder_id)])
+
+    def invalidate_subfolders(self, folder_id):
+        """Removes the subfolders of a folder and all the folders cached beneath them, e.g. after items of the folder
+        have been deleted. The folder itself is kept."""
+        with self._lock:
+            self._remove(self._child_ids(str(folder_id)))
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+            self._parents.clear()
+            self._names.clear()
+            self._folders.clear()
+
+    def __len__(self):
+        return len(self._folders)
+
+    def _put_folder(self, parent_id, folder, is_parent=True):
+        name = getattr(folder, 'name', None)
+        if name is not None:
+            self._put(self._names, str(folder.id), name)
+        if parent_id is not None:
+            if name is not None:
+                self._put(self._children, (str(parent_id), name), folder.id)
+            if is_parent:
+                self._put(self._parents, str(folder.id), parent_id)
+        self._put(self._folders, str(folder.id), folder)
+
+    def _child_ids(self, folder_id):
+        child_ids = {str(entry[1]) for (parent_id, _), entry in self._children.items() if parent_id == folder_id}
+        child_ids.update(id for id, entry in self._parents.items() if str(entry[1]) == folder_id)
+        return child_ids
+
+    def _remove(self, folder_ids):
+        removed = set()
+        pending = list(folder_ids)
+        while pending:
+            folder_id = pending.pop()
+            if folder_id not in removed:
+                removed.add(folder_id)
+                pending.extend(self._child_ids(folder_id))
+
+        for folder_id in removed:
+            self._folders.pop(folder_id, None)
+            self._parents.pop(folder_id, None)
+            self._names.pop(folder_id, None)
+        for key in [key for key, entry in self._children.items() if key[0] in removed or str(entry[1]) in removed]:
+            del self._children[key]
+
+    def _get(self, store, key, default=None):
+        entry = store.get(key)
+        if entry is None:
+            return default
+        if entry[0] < time.monotonic():
+            del store[key]
+            return default
+        store.move_to_end(key)
+        return entry[1]
+
+    def _put(self, store, key, value):
+        store[key] = (time.monotonic() + self.ttl, value)
+        store.move_to_end(key)
+        while len(store) > self.max_size:
+            store.popitem(last=False)
@@ -1,7 +1,9 @@
+from gtagora.hash_index import get_hash_index
 from gtagora.models.base import BaseModel
 from gtagora.utils import sha1
 from gtagora.exception import DownloadError
 
+import asyncio
 import logging
 from pathlib import Path
 
@@ -24,12 +26,26 @@ class Datafile(BaseModel):
 
         if not self.check_for_existing_file(final_path):
             url = f'{self.BASE_URL}{self.id}/download/'
-            self.http_client.download(url, final_path.as_posix())
+            self.http_client.download(url, final_path.as_posix(), size=getattr(self, 'size', None))
+            self.remember_hash(final_path)
 
         # downloaded_file = deepcopy(self)
         # downloaded_file.download_path = filename
         return final_path
 
+    async def adownload(self, path: Path, http_client):
+        """Async variant of download. The http_client must be an AsyncClient."""
+        final_path = path / self.original_filename
+        final_path.parent.mkdir(parents=True, exist_ok=True)
+
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self.check_for_existing_file, final_path):
+            url = f'{self.BASE_URL}{self.id}/download/'
+            await http_client.download(url, final_path.as_posix())
+            await loop.run_in_executor(None, self.remember_hash, final_path)
+
+        return final_path
+
     def check_for_existing_file(self, desired_path: Path):
         if desired_path.exists():
             if desired_path.is_file():
@@ -39,5 +55,21 @@ class Datafile(BaseModel):
                 raise DownloadError(f"File already exists but it's not a file. {desired_path}")
         return False
 
+    def remember_hash(self, path: Path):
+        """Adds the SHA-1 of a file which was just downloaded to the hash index (if it is enabled), so that the next
+        check_for_existing_file doesn't read it again. The SHA-1 is computed from the written file while it is still
+        in the page cache. The SHA-1 of the server is not stored, a corrupted file must not pass the later checks.
+
+        Returns:
+            bool -- False if the SHA-1 of the file differs from the SHA-1 of the server
+        """
+        if get_hash_index() is None or not path.is_file():
+            return True
+        local_sha1 = sha1(path)
+        if getattr(self, 'sha1', None) and local_sha1 != self.sha1:
+            logger.warning(f'The SHA-1 of the downloaded file {path} differs from the SHA-1 of the server')
+            return False
+        return True
+
     def __str__(self):
         return f'{self.original_filename} {self.size}'
@@ -58,12 +58,31 @@ class Dataset(LinkToFolderMixin, TagMixin, RatingMixin, ParametersMixin, BaseMod
             else:
                 setattr(self, key, value)
 
+    @classmethod
+    def from_tree(cls, data: dict, http_client=None):
+        """Creates a dataset from a tree payload. The datafiles are requested later if the payload has none"""
+        dataset = cls.from_response(data, http_client=http_client)
+        if 'datafiles' not in data:
+            dataset._lazy_datafiles = True
+        return dataset
+
     def get_datafiles(self):
+        if getattr(self, '_lazy_datafiles', False):
+            self._load_datafiles()
         if hasattr(self, 'datafiles'):
             return self.datafiles
         else:
             return []
 
+    def _load_datafiles(self):
+        # the dataset comes from a lightweight listing without datafiles
+        response = self.http_client.get(f'{self.BASE_URL}{self.id}/')
+        if response.status_code != 200:
+            raise AgoraException(f'Could not get the datafiles of the dataset {self.id}: '
+                                 f'status = {response.status_code}')
+        self._set_values({'datafiles': response.json().get('datafiles', [])})
+        self._lazy_datafiles = False
+
     def download(self, filename=None):
         datafiles = self.get_datafiles()
         downloaded_files = []
@@ -184,6 +203,7 @@ class Dataset(LinkToFolderMixin, TagMixin, RatingMixin, ParametersMixin, BaseMod
         response = self.http_client.post(url, json={}, timeout=60)
         if response.status_code != 200:
             raise AgoraException(f'Could not move the dataset: status = {response.status_code}, message = {response.text}')
+        self._invalidate()
         return Dataset.from_response(response.json(), self.http_client)
 
     def __str__(self):
@@ -0,0 +1,265 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import requests
+
+from gtagora.exception import DownloadError
+from gtagora.models.base import get_client
+from gtagora.utils import remove_illegal_chars
+
+logger = logging.getLogger("gtAgora")
+
+
+class DownloadTask:
+    """One datafile of a download plan and its state"""
+
+    PENDING = 'pending'
+    DOWNLOADED = 'downloaded'
+    SKIPPED = 'skipped'
+    FAILED = 'failed'
+
+    def __init__(self, datafile, directory: Path, dataset=None):
+        self.datafile = datafile
+        self.dataset = dataset
+        self.directory = Path(directory)
+        self.path = self.directory / datafile.original_filename
+        self.size = getattr(datafile, 'size', None) or 0
+        self.state = self.PENDING
+        self.attempts = 0
+        self.error = None
+
+    def __str__(self):
+        return f'{self.path} ({self.state})'
+
+
+class DownloadProgress:
+    """The progress of a download plan. It is passed to the progress callback and returned by DownloadManager.run"""
+
+    def __init__(self, tasks: List[DownloadTask]):
+        self.tasks = tasks
+        self.total_files = len(tasks)
+        self.total_bytes = sum(task.size for task in tasks)
+        self.start_time = time.monotonic()
+        self.end_time = None
+
+    @property
+    def downloaded(self):
+        return [task for task in self.tasks if task.state == DownloadTask.DOWNLOADED]
+
+    @property
+    def skipped(self):
+        return [task for task in self.tasks if task.state == DownloadTask.SKIPPED]
+
+    @property
+    def failed(self):
+        return [task for task in self.tasks if task.state == DownloadTask.FAILED]
+
+    @property
+    def completed_files(self):
+        return len([task for task in self.tasks if task.state != DownloadTask.PENDING])
+
+    @property
+    def completed_bytes(self):
+        return sum(task.size for task in self.tasks if task.state != DownloadTask.PENDING)
+
+    @property
+    def downloaded_bytes(self):
+        return sum(task.size for task in self.downloaded)
+
+    @property
+    def duration(self):
+        return (self.end_time if self.end_time else time.monotonic()) - self.start_time
+
+    @property
+    def throughput(self):
+        """The downloaded bytes per second"""
+        return self.downloaded_bytes / self.duration if self.duration > 0 else 0.0
+
+    def summary(self):
+        lines = [f'Downloaded {len(self.downloaded)} files ({self.downloaded_bytes} bytes, '
+                 f'{self.throughput / 1024 / 1024:.1f} MB/s), skipped {len(self.skipped)} existing files, '
+                 f'{len(self.failed)} files failed']
+        lines.extend(f'  {task.path}: {task.error}' for task in self.failed)
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return f'{self.completed_files}/{self.total_files} files, {self.completed_bytes}/{self.total_bytes} bytes'
+
+
+class DownloadManager:
+    """Downloads the datafiles of folders, exams, series and datasets concurrently.
+
+    The objects are added first. Their datafiles are collected into a plan (the exams are loaded from their tree in
+    one request each) and run() downloads the plan on a pool of workers. A failed file is retried and does not stop
+    the other files. Only transient errors (interrupted connections, timeouts, 503, ...) are retried, a file which the
+    server refuses or which can't be written fails at once. Existing files with the same size and SHA-1 are skipped;
+    the checks run on the workers as well.
+
+    Keyword Arguments:
+        http_client {Client} -- The client (default: {Agora.default_client})
+        max_workers {int} -- The number of files downloaded at the same time (default: {MAX_WORKERS})
+        max_retries {int} -- The number of retries of a failed file (default: {MAX_RETRIES})
+        progress_callback {Callable[[DownloadProgress], None]} -- Called after every completed file (default: {None})
+        verify_sha1 {bool} -- Compare the SHA-1 of an existing file with the same size before it is skipped,
+                              otherwise the size is enough (default: {True})
+    """
+
+    MAX_WORKERS = 4
+    MAX_RETRIES = 3
+    # errors of a download which can succeed when it is tried again. DownloadErrors are retried if they are transient
+    TRANSIENT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                        requests.exceptions.ChunkedEncodingError, ConnectionError, TimeoutError)
+
+    def __init__(self, http_client=None, max_workers: int = None, max_retries: int = None,
+                 progress_callback: Optional[Callable[[DownloadProgress], None]] = None, verify_sha1=True):
+        self.http_client = get_client(http_client)
+        self.max_workers = max_workers if max_workers else self.MAX_WORKERS
+        self.max_retries = max_retries if max_retries is not None else self.MAX_RETRIES
+        self.progress_callback = progress_callback
+        self.verify_sha1 = verify_sha1
+        self._datasets = []
+        self._lock = threading.Lock()
+
+    def add_dataset(self, dataset, directory: Path):
+        """Downloads the datafiles of the dataset into the directory"""
+        self._datasets.append((dataset, Path(directory)))
+        return self
+
+    def add_series(self, series, directory: Path):
+        """Downloads the datafiles of all datasets of the series into the directory"""
+        for dataset in series.get_datasets():
+            self.add_dataset(dataset, directory)
+        return self
+
+    def add_exam(self, exam, directory: Path):
+        """Downloads the exam into "<directory>/<exam name>/<series name>" like Exam.download"""
+        if exam._get_prefetched('series') is None:
+            exam.prefetch()
+
+        exam_directory = Path(directory) / remove_illegal_chars(exam.name)
+        for series in exam.get_series():
+            self.add_series(series, exam_directory / remove_illegal_chars(series.name))
+        for dataset in exam.get_files():
+            self.add_dataset(dataset, Path(directory) / exam.name)
+        return self
+
+    def add_folder(self, folder, directory: Path, recursive=False, object_classes: tuple = None):
+        """Downloads the exams, series and datasets of the folder into the directory like Folder.download. The
+        subfolders are downloaded into directories with their names if recursive is True."""
+        from gtagora.models.dataset import Dataset
+        from gtagora.models.exam import Exam
+        from gtagora.models.series import Series
+
+        object_classes = object_classes if object_classes else (Exam, Series, Dataset)
+        if recursive:
+            walk = folder.walk()
+        else:
+            walk = [(folder, [], folder._get_objects(object_classes))]
+
+        paths = {folder.id: Path(directory)}
+        exams = []
+        for current, subfolders, objects in walk:
+            path = paths[current.id]
+            for subfolder in subfolders:
+                paths.setdefault(subfolder.id, path / remove_illegal_chars(subfolder.name))
+            for obj in objects:
+                if not isinstance(obj, object_classes):
+                    continue
+                if isinstance(obj, Exam):
+                    exams.append((obj, path))
+                elif isinstance(obj, Series):
+                    self.add_series(obj, path)
+                elif isinstance(obj, Dataset):
+                    self.add_dataset(obj, path)
+
+        Exam.prefetch_many([exam for exam, _ in exams if exam._get_prefetched('series') is None],
+                           max_workers=self.max_workers)
+        for exam, path in exams:
+            self.add_exam(exam, path)
+        return self
+
+    def plan(self) -> List[DownloadTask]:
+        """Returns the datafiles which will be downloaded. The datafiles of the datasets are collected concurrently"""
+        if not self._datasets:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self._datasets))) as executor:
+            datafiles = list(executor.map(lambda entry: entry[0].get_datafiles(), self._datasets))
+
+        tasks = []
+        targets = set()
+        for (dataset, directory), dataset_datafiles in zip(self._datasets, datafiles):
+            for datafile in dataset_datafiles:
+                task = DownloadTask(datafile, directory, dataset=dataset)
+                # a dataset can be added twice, e.g. through a folder and through its exam
+                if task.path not in targets:
+                    targets.add(task.path)
+                    tasks.append(task)
+        return tasks
+
+    def run(self, raise_errors=True) -> DownloadProgress:
+        """Downloads all added objects
+
+        Keyword Arguments:
+            raise_errors {bool} -- Raise a DownloadError if a file could not be downloaded (default: {True})
+
+        Raises:
+            DownloadError: At least one file failed after all retries. The message contains the summary
+
+        Returns:
+            DownloadProgress -- The downloaded, skipped and failed files
+        """
+        progress = DownloadProgress(self.plan())
+        self._datasets = []
+        if progress.tasks:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(progress.tasks))) as executor:
+                list(executor.map(lambda task: self._run_task(task, progress), progress.tasks))
+        progress.end_time = time.monotonic()
+
+        if progress.failed:
+            logger.warning(progress.summary())
+            if raise_errors:
+                raise DownloadError(progress.summary())
+        return progress
+
+    def _run_task(self, task: DownloadTask, progress: DownloadProgress):
+        while True:
+            task.attempts += 1
+            try:
+                task.path.parent.mkdir(parents=True, exist_ok=True)
+                if self._is_downloaded(task):
+                    task.state = DownloadTask.SKIPPED
+                else:
+                    url = f'{task.datafile.BASE_URL}{task.datafile.id}/download/'
+                    self.http_client.download(url, task.path.as_posix(), size=getattr(task.datafile, 'size', None))
+                    task.datafile.remember_hash(task.path)
+                    task.state = DownloadTask.DOWNLOADED
+                break
+            except Exception as e:
+                task.error = e
+                if task.attempts > self.max_retries or not self._is_transient(e):
+                    task.state = DownloadTask.FAILED
+                    break
+                logger.info(f'Retrying the download of {task.path}: {e}')
+                time.sleep(self.http_client.retry_policy.delay(task.attempts - 1))
+
+        if self.progress_callback:
+            with self._lock:
+                self.progress_callback(progress)
+
+    def _is_transient(self, error: Exception):
+        if isinstance(error, DownloadError):
+            return error.transient
+        return isinstance(error, self.TRANSIENT_ERRORS)
+
+    def _is_downloaded(self, task: DownloadTask):
+        if not task.path.exists():
+            return False
+        if self.verify_sha1:
+            return task.datafile.check_for_existing_file(task.path)
+        if not task.path.is_file():
+            raise DownloadError(f"File already exists but it's not a file. {task.path}")
+        return task.size == task.path.stat().st_size
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 
 from gtagora.exception import AgoraException
@@ -5,10 +6,10 @@ from gtagora.http.client import ProgressCallback
 from gtagora.models.base import BaseModel, LinkToFolderMixin, DownloadDatasetMixin, TagMixin, RatingMixin, \
     RelationMixin, UIDGetMixin, ParametersMixin
 from gtagora.models.dataset import Dataset
+from gtagora.models.download_manager import DownloadManager
 from gtagora.models.import_package import import_data
 from gtagora.models.series import Series
 from gtagora.models.timeline import TimelineItem
-from gtagora.utils import remove_illegal_chars
 
 from pathlib import Path
 
@@ -17,6 +18,9 @@ class Exam(LinkToFolderMixin, DownloadDatasetMixin, TagMixin, RatingMixin, Relat
     BASE_URL = '/api/v1/exam/'
     BASE_URL_V2 = '/api/v2/exam/'
 
+    # the relations which can be prefetched from the exam tree
+    PREFETCH_RELATIONS = ('series', 'datasets')
+
     def set_name(self, name):
         url = self.BASE_URL + str(self.id) + '/'
         data = {"name": name}
@@ -25,6 +29,7 @@ class Exam(LinkToFolderMixin, DownloadDatasetMixin, TagMixin, RatingMixin, Relat
         if response.status_code == 200:
             data = response.json()
             self._set_values(data)
+            self._invalidate()
             return self
         else:
             raise AgoraException('Could not set the exam name {0}', response.status_code)
@@ -33,18 +38,46 @@ class Exam(LinkToFolderMixin, DownloadDatasetMixin, TagMixin, RatingMixin, Relat
         if filters and not isinstance(filters, dict):
             raise AgoraException('The filter must be a dict')
 
+        prefetched = self._get_prefetched('series', filters)
+        if prefetched is not None:
+            return prefetched
+
         url = f'{self.BASE_URL}{self.id}/series/?limit=10000000000'
         return self._get_object_list(url, filters, Series)
 
+    def iter_series(self, filters=None, page_size: int = None, prefetch_pages: int = None):
+        """Like get_series, but the series are requested page by page while they are consumed"""
+        if filters and not isinstance(filters, dict):
+            raise AgoraException('The filter must be a dict')
+
+        url = f'{self.BASE_URL}{self.id}/series/'
+        return self._iter_object_list(url, filters, Series, page_size=page_size, prefetch_pages=prefetch_pages)
+
     def get_datasets(self, filters=None):
         if filters and not isinstance(filters, dict):
             raise AgoraException('The filter must be a dict')
 
+        prefetched = self._get_prefetched('datasets', filters)
+        if prefetched is not None:
+            return prefetched
+
         # the api/v1/files returns all datafiles in the exams (including series)
         url = f'{self.BASE_URL}{self.id}/files/?limit=10000000000'
         return self._get_object_list(url, filters, Dataset)
 
+    def iter_datasets(self, filters=None, page_size: int = None, prefetch_pages: int = None):
+        """Like get_datasets, but the datasets are requested page by page while they are consumed"""
+        if filters and not isinstance(filters, dict):
+            raise AgoraException('The filter must be a dict')
+
+        url = f'{self.BASE_URL}{self.id}/files/'
+        return self._iter_object_list(url, filters, Dataset, page_size=page_size, prefetch_pages=prefetch_pages)
+
     def get_files(self):
+        prefetched = self._get_prefetched('files')
+        if prefetched is not None:
+            return prefetched
+
         # the api/v2/datasets only returns the datasets which directly belongs to the exam
         url = f'{self.BASE_URL_V2}{self.id}/datasets/?limit=10000000000'
         return self._get_object_list(url, None, Dataset)
@@ -55,16 +88,9 @@ class Exam(LinkToFolderMixin, DownloadDatasetMixin, TagMixin, RatingMixin, Relat
                 raise FileNotFoundError(path.as_posix())
         return import_data(self.http_client, paths=paths, exam_id=self.id, wait=False, verbose=verbose, progress_callback=progress_callback)
 
-    def download(self, target_path: Path):
-        for series in self.get_series():
-            for dataset in series.get_datasets():
-                final_path = target_path / remove_illegal_chars(self.name) / remove_illegal_chars(series.name)
-                final_path.mkdir(parents=True, exist_ok=True)
-                dataset.download(final_path)
-        for dataset in self.get_files():
-            final_path = target_path / self.name
-            final_path.mkdir(parents=True, exist_ok=True)
-            dataset.download(final_path)
+    def download(self, target_path: Path, max_workers: int = None):
+        # the series and datasets are loaded from the exam tree and the files are downloaded concurrently
+        DownloadManager(self.http_client, max_workers=max_workers).add_exam(self, target_path).run()
 
     def upload_dataset(self, input_files, dataset_type, target_files=None):
         # This function creates a dataset of a given type all files given as input will be added to one dataset.
@@ -109,6 +135,7 @@ class Exam(LinkToFolderMixin, DownloadDatasetMixin, TagMixin, RatingMixin, Relat
         if response.status_code != 200:
             raise AgoraException(f'Could not move the exam: status = {response.status_code}')
 
+        self._invalidate()
         return self._get_new_exam_from_timeline(response)
 
     def lock(self):
@@ -119,6 +146,7 @@ class Exam(LinkToFolderMixin, DownloadDatasetMixin, TagMixin, RatingMixin, Relat
             raise AgoraException(f'Could not lock the exam: status = {response.status_code}')
 
         self.locked = True
+        self._invalidate()
         return self
 
     def unlock(self):
@@ -129,8 +157,48 @@ class Exam(LinkToFolderMixin, DownloadDatasetMixin, TagMixin, RatingMixin, Relat
             raise AgoraException(f'Could not unlock the exam: status = {response.status_code}')
 
         self.locked = True
+        self._invalidate()
         return self
 
+    def prefetch(self, tree: dict = None):
+        """Loads the series and datasets of the exam with a single request to the exam tree. The later get_series,
+        get_datasets and get_files calls without filters are answered from memory.
+
+        Keyword Arguments:
+            tree {dict} -- The unparsed tree of the exam if it is already known, e.g. from the project tree
+                           (default: {None})
+
+        Returns:
+            Exam -- The exam
+        """
+        data = tree if tree is not None else self.get_tree(parse=False)
+        series = [Series._get_tree_from_data(s, http_client=self.http_client) for s in data.get('series', [])]
+        files = [Dataset.from_tree(d, http_client=self.http_client) for d in data.get('datasets', [])]
+        self._set_prefetched('series', series)
+        self._set_prefetched('files', files)
+        self._set_prefetched('datasets', files + [d for s in series for d in s.get_datasets()])
+        return self
+
+    @classmethod
+    def prefetch_many(cls, exams: List['Exam'], max_workers: int = None):
+        """Prefetches the trees of many exams concurrently, see prefetch"""
+        exams = list(exams)
+        if exams:
+            max_workers = int(max_workers if max_workers else cls.GET_MANY_WORKERS)
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(exams))) as executor:
+                list(executor.map(lambda exam: exam.prefetch(), exams))
+        return exams
+
+    @classmethod
+    def _needs_prefetch(cls, prefetch):
+        if not prefetch:
+            return False
+        unknown = [name for name in prefetch if name not in cls.PREFETCH_RELATIONS]
+        if unknown:
+            raise AgoraException(f'Cannot prefetch {", ".join(unknown)}. Possible values are: '
+                                 f'{", ".join(cls.PREFETCH_RELATIONS)}')
+        return True
+
     def get_tree(self, parse=True):
         url = f'{self.BASE_URL_V2}{self.id}/tree/'
         response = self.http_client.get(url)
@@ -145,9 +213,12 @@ class Exam(LinkToFolderMixin, DownloadDatasetMixin, TagMixin, RatingMixin, Relat
     def _get_tree_from_data(data: dict, http_client=None):
         exam_tree = Exam.from_response(data, http_client=http_client)
         new_series = [Series._get_tree_from_data(s, http_client=http_client) for s in exam_tree.series]
-        new_datasets = [Dataset.from_response(ds_json) for ds_json in exam_tree.datasets]
+        new_datasets = [Dataset.from_tree(ds_json, http_client=http_client) for ds_json in exam_tree.datasets]
         exam_tree.series = new_series
         exam_tree.datasets = new_datasets
+        exam_tree._set_prefetched('series', new_series)
+        exam_tree._set_prefetched('files', new_datasets)
+        exam_tree._set_prefetched('datasets', new_datasets + [d for s in new_series for d in s.datasets])
         return exam_tree
 
     def __str__(self):
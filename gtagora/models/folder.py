@@ -3,16 +3,16 @@ from gtagora.http.client import ProgressCallback
 from gtagora.models.base import LinkToFolderMixin, BaseModel, TagMixin, RatingMixin, ParametersMixin
 from gtagora.models.breadcrumb import Breadcrumb
 from gtagora.models.dataset import Dataset
-from gtagora.models.datafile import Datafile
+from gtagora.models.download_manager import DownloadManager
 from gtagora.models.exam import Exam
 from gtagora.models.folder_item import FolderItem
 from gtagora.models.import_package import import_data
 from gtagora.models.series import Series
-from gtagora.utils import remove_illegal_chars
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
-from functools import partial
+from typing import Dict, List, Optional
 
 
 class Folder(LinkToFolderMixin, TagMixin, RatingMixin, ParametersMixin, BaseModel):
@@ -21,21 +21,71 @@ class Folder(LinkToFolderMixin, TagMixin, RatingMixin, ParametersMixin, BaseMode
 
     V2_DEFAULT = True
 
-    def get_items(self):
-        items = []
-
-        # we get the folder items with the v1 url because then the datafiles are included in the datasets
-        url = self.BASE_URL + str(self.id) + '/items/?limit=10000000000'
-        response = self.http_client.get(url)
-
-        for item in response.json():
-            if 'content_object' in item and 'content_type' in item:
-                items.append(FolderItem.from_response(item, http_client=self.http_client))
-
+    # the number of folders whose items are requested concurrently by walk
+    WALK_WORKERS = 8
+    TREE_ITEM_CLASSES = {'exam': Exam, 'serie': Series, 'series': Series, 'dataset': Dataset}
+
+    def get_items(self, lightweight=False):
+        """Returns the items of the folder
+
+        Keyword Arguments:
+            lightweight {bool} -- Use the v2 listing which does not include the datafiles of the datasets. The
+                                  datafiles are requested when get_datafiles or download of a dataset is called.
+                                  Much faster for folders with large datasets if only the names are needed
+                                  (default: {False})
+
+        Returns:
+            List[FolderItem] -- The items
+        """
+        # by default we get the folder items with the v1 url because then the datafiles are included in the datasets
+        response = self.http_client.get(self._items_url(lightweight))
+        return self._items_from_data(response.json(), lightweight)
+
+    async def aget_items(self, http_client):
+        """Async variant of get_items. The http_client must be an AsyncClient."""
+        response = await http_client.get(self._items_url())
+        return self._items_from_data(response.json())
+
+    def iter_items(self, page_size: int = None, prefetch_pages: int = None):
+        """Like get_items(lightweight=True), but the items are requested page by page from the v2 listing while they
+        are consumed. The datafiles of the datasets are requested when get_datafiles or download is called."""
+        url = self.BASE_URL_V2 + str(self.id) + '/items/'
+        for item in self._iter_data(url, None, FolderItem.__name__, page_size=page_size,
+                                    prefetch_pages=prefetch_pages):
+            folder_item = self._item_from_data(item, lightweight=True)
+            if folder_item is not None:
+                yield folder_item
+
+    def _items_url(self, lightweight=False):
+        base_url = self.BASE_URL_V2 if lightweight else self.BASE_URL
+        return base_url + str(self.id) + '/items/?limit=10000000000'
+
+    def _items_from_data(self, data, lightweight=False):
+        if isinstance(data, dict) and 'results' in data:
+            data = data['results']
+        items = [folder_item for folder_item in (self._item_from_data(item, lightweight) for item in data)
+                 if folder_item is not None]
+
+        cache = self._folder_path_cache()
+        if cache is not None:
+            cache.put(None, self)
+            cache.put_listing(self.id, [item.object for item in items
+                                        if isinstance(getattr(item, 'object', None), Folder)])
         return items
 
+    def _item_from_data(self, item, lightweight=False):
+        if 'content_object' not in item or 'content_type' not in item:
+            return None
+        if lightweight and item['content_type'] == 'dataset':
+            item = dict(item, content_object={key: value for key, value in item['content_object'].items()
+                                              if key != 'datafiles'})
+        folder_item = FolderItem.from_response(item, http_client=self.http_client)
+        if lightweight and isinstance(getattr(folder_item, 'object', None), Dataset):
+            folder_item.object._lazy_datafiles = True
+        return folder_item
+
     def is_folder(self, name):
-        items = self.get_items()
+        items = self.get_items(lightweight=True)
         for item in items:
             if isinstance(item.object, Folder) and item.object.name == name:
                 return True
@@ -61,88 +111,187 @@ class Folder(LinkToFolderMixin, TagMixin, RatingMixin, ParametersMixin, BaseMode
         if isinstance(path, str):
             path = Path(path)
 
-        breadcrumb = None
-        cur_breadcrumb_index = None
         cur_folder = self
+        levels_up = 0
         for part in path.parts:
-            if part:
-                if part == '..':
-                    if not breadcrumb:
-                        breadcrumb = cur_folder.get_breadcrumb()
-                        cur_breadcrumb_index = len(breadcrumb)-1
-                    cur_breadcrumb_index -= 1
-                    cur_breadcrumb_index = max(cur_breadcrumb_index, 0)
-                elif part == '.':
-                    continue
-                else:
-                    if cur_breadcrumb_index:
-                        cur_folder = self._get_object(breadcrumb[cur_breadcrumb_index].object_id)
-                        breadcrumb = None
-                        cur_breadcrumb_index = None
-                    cur_folder = cur_folder._get_by_name(part, Folder)
-                    if not cur_folder:
-                        return cur_folder
-
-        if cur_breadcrumb_index:
-            cur_folder = self._get_object(breadcrumb[cur_breadcrumb_index].object_id)
+            if not part or part == '.':
+                continue
+            if part == '..':
+                # consecutive ".." are resolved at once
+                levels_up += 1
+                continue
+            if levels_up:
+                cur_folder = cur_folder._get_ancestor(levels_up)
+                levels_up = 0
+            cur_folder = cur_folder._get_subfolder(part)
+            if not cur_folder:
+                return cur_folder
+
+        if levels_up:
+            cur_folder = cur_folder._get_ancestor(levels_up)
         return cur_folder
 
-    def get_folders(self, recursive=False):
-        folders = []
-        items = self.get_items()
-        for item in items:
-            if isinstance(item.object, Folder):
-                folders.append(item.object)
-                if recursive and hasattr(item, 'object'):
-                    folders = folders + item.object.get_folders(recursive)
+    def _get_subfolder(self, name):
+        cache = self._folder_path_cache()
+        if cache is not None:
+            folder = cache.get(self.id, name)
+            if folder is not None:
+                return folder
+        return self._get_by_name(name, Folder)
+
+    def _get_ancestor(self, levels):
+        """Returns the folder levels above this folder. The root folder is returned if the folder is not that deep."""
+        cache = self._folder_path_cache()
+        folder = self
+        while cache is not None and levels:
+            parent = cache.parent(folder.id)
+            if parent is None:
+                break
+            folder = parent
+            levels -= 1
+        if not levels:
+            return folder
+
+        breadcrumb = folder.get_breadcrumb()
+        index = max(len(breadcrumb) - 1 - levels, 0)
+        if index >= len(breadcrumb) - 1:
+            return folder
+        ancestor = self._get_object(breadcrumb[index].object_id)
+        if cache is not None:
+            cache.put(None, ancestor)
+        return ancestor
+
+    def _folder_path_cache(self):
+        return getattr(self.http_client, 'folder_path_cache', None)
+
+    def _invalidate(self):
+        super()._invalidate()
+        cache = self._folder_path_cache()
+        if cache is not None:
+            cache.invalidate(self.id)
+
+    def walk(self, max_workers: int = None, use_tree=False, lightweight=False):
+        """Walks through the folder and all its subfolders like os.walk
+
+        The folders are visited breadth-first. The items of the folders are requested concurrently, but every folder
+        is yielded in order as soon as its items have arrived. Like with os.walk, removing folders from the yielded
+        subfolders list stops the walk from descending into them.
+
+        Keyword Arguments:
+            max_workers {int} -- The number of folders whose items are requested concurrently (default: {WALK_WORKERS})
+            use_tree {bool} -- Request the whole folder tree at once instead of the items of every folder
+                               (default: {False})
+            lightweight {bool} -- List the items without the datafiles of the datasets, see get_items (default: {False})
+
+        Returns:
+            Iterator -- (folder, subfolders, objects) tuples. objects are the exams, series and datasets in the folder
+        """
+        if use_tree:
+            yield from self._walk_tree(self.get_tree(parse=False))
+            return
+
+        max_workers = int(max_workers if max_workers else self.WALK_WORKERS)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = deque([(self, executor.submit(self.get_items, lightweight))])
+        seen = {self.id}
+        try:
+            while pending:
+                folder, future = pending.popleft()
+                subfolders, objects = self._split_objects(item.object for item in future.result()
+                                                          if hasattr(item, 'object'))
+                yield folder, subfolders, objects
+
+                for subfolder in subfolders:
+                    # a folder can be linked into several folders, it is only visited once
+                    if subfolder.id not in seen:
+                        seen.add(subfolder.id)
+                        pending.append((subfolder, executor.submit(subfolder.get_items, lightweight)))
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _walk_tree(self, data):
+        root = data.get('content_object', data)
+        pending = deque([(self, root.get('items', []))])
+        seen = {self.id}
+        while pending:
+            folder, items = pending.popleft()
+            objects = []
+            child_items = {}
+            for item in items:
+                content_object = item.get('content_object')
+                if not content_object:
+                    continue
+                if item.get('content_type') == 'folder':
+                    content_object = dict(content_object)
+                    child_items[content_object.get('id')] = content_object.pop('items', [])
+                    objects.append(Folder.from_response(content_object, http_client=self.http_client))
+                elif item.get('content_type') in self.TREE_ITEM_CLASSES:
+                    model_class = self.TREE_ITEM_CLASSES[item.get('content_type')]
+                    objects.append(model_class.from_response(content_object, http_client=self.http_client))
+
+            subfolders, objects = self._split_objects(objects)
+            cache = self._folder_path_cache()
+            if cache is not None:
+                cache.put_listing(folder.id, subfolders)
+            yield folder, subfolders, objects
+
+            for subfolder in subfolders:
+                if subfolder.id not in seen:
+                    seen.add(subfolder.id)
+                    pending.append((subfolder, child_items.get(subfolder.id, [])))
+
+    @staticmethod
+    def _split_objects(objects):
+        subfolders = []
+        other_objects = []
+        for obj in objects:
+            (subfolders if isinstance(obj, Folder) else other_objects).append(obj)
+        return subfolders, other_objects
 
-        return folders
+    def get_folders(self, recursive=False):
+        if recursive:
+            return [subfolder for _, subfolders, _ in self.walk(lightweight=True) for subfolder in subfolders]
+        return self._get_objects(Folder, lightweight=True)
 
     def get_exams(self, recursive=False):
-        exams = []
-        items = self.get_items()
-        for item in items:
-            if isinstance(item.object, Exam):
-                exams.append(item.object)
-            if recursive and isinstance(item, Folder):
-                exams = exams + item.get_exams(recursive)
-
-        return exams
+        return self._get_objects(Exam, recursive)
 
     def get_exam(self, name):
         return self._get_by_name(name, Exam)
 
     def get_series(self, recursive=False):
-        series = []
-        items = self.get_items()
-        for item in items:
-            if isinstance(item.object, Series):
-                series.append(item.object)
-            if recursive and isinstance(item, Folder):
-                series = series + item.get_series(recursive)
-
-        return series
+        return self._get_objects(Series, recursive)
 
     def get_serie(self, name):
         return self._get_by_name(name, Series)
 
     def get_datasets(self, recursive=False):
-        datasets = []
-        items = self.get_items()
-        for item in items:
-            if isinstance(item.object, Dataset):
-                datasets.append(item.object)
-            if recursive and isinstance(item, Folder):
-                datasets.extend(item.get_datasets(recursive))
-
-        return datasets
+        return self._get_objects(Dataset, recursive)
 
     def get_dataset(self, name):
         return self._get_by_name(name, Dataset)
 
+    def _get_objects(self, object_class, recursive=False, lightweight=False):
+        if recursive:
+            return [obj for _, _, objects in self.walk(lightweight=lightweight) for obj in objects
+                    if isinstance(obj, object_class)]
+        return [item.object for item in self.get_items(lightweight=lightweight)
+                if isinstance(getattr(item, 'object', None), object_class)]
+
     def get_breadcrumb(self):
+        cache = self._folder_path_cache()
+        ancestors = cache.ancestors(self.id) if cache is not None else None
+        if ancestors is not None:
+            return [Breadcrumb.from_response({'object_id': id, 'name': name}, http_client=self.http_client)
+                    for id, name in ancestors]
+
         url = f'{self.BASE_URL}{self.id}/breadcrumb/?limit=10000000000'
-        return self._get_object_list(url, None, Breadcrumb)
+        breadcrumb = self._get_object_list(url, None, Breadcrumb)
+        if cache is not None:
+            cache.put_path([(b.object_id, getattr(b, 'name', None)) for b in breadcrumb])
+        return breadcrumb
 
     def get_tree(self, parse=True):
         url = f'{self.BASE_URL_V2}{self.id}/tree/'
@@ -187,37 +336,24 @@ class Folder(LinkToFolderMixin, TagMixin, RatingMixin, ParametersMixin, BaseMode
             first = False
         return p
 
-    def download(self, target_path: Path, recursive=False) -> List[Datafile]:
-
-        # Get all Exams in the current folder and download them
-        downloaded_files = self.download_exams(target_path, recursive=recursive)
-        downloaded_files.extend(self.download_series(target_path, recursive=recursive))
-        downloaded_files.extend(self.download_datasets(target_path, recursive=recursive))
+    def download(self, target_path: Path, recursive=False, max_workers: int = None) -> List[Path]:
+        # Download the exams, series and datasets of the folder (and of all subfolders when recursive is true)
+        return self._download_objects((Exam, Series, Dataset), target_path, recursive, max_workers)
 
-        return downloaded_files
+    def download_exams(self, target_path: Path, recursive=False, max_workers: int = None):
+        return self._download_objects((Exam,), target_path, recursive, max_workers)
 
-    def download_exams(self, target_path: Path, recursive=False):
-        exams = self.get_exams()
-        return self._download_objects(exams, target_path, Folder.download_exams, recursive)
+    def download_series(self, target_path: Path, recursive=False, max_workers: int = None):
+        return self._download_objects((Series,), target_path, recursive, max_workers)
 
-    def download_series(self, target_path: Path, recursive=False):
-        exams = self.get_series()
-        return self._download_objects(exams, target_path, Folder.download_series, recursive)
-
-    def download_datasets(self, target_path: Path, recursive=False):
-        exams = self.get_datasets()
-        return self._download_objects(exams, target_path, Folder.download_datasets, recursive)
-
-    def _download_objects(self, objects, target_path: Path, download_fct, recursive=False):
-        downloaded_files = [obj.download(target_path) for obj in objects]
-
-        # Download all exams in subfolders as well when the recursive option is true
-        if recursive:
-            for folder in self.get_folders():
-                downloaded_files.extend(partial(download_fct, folder)(
-                    target_path / remove_illegal_chars(folder.name), recursive))
+    def download_datasets(self, target_path: Path, recursive=False, max_workers: int = None):
+        return self._download_objects((Dataset,), target_path, recursive, max_workers)
 
-        return downloaded_files
+    def _download_objects(self, object_classes, target_path: Path, recursive=False, max_workers: int = None):
+        # the objects of a subfolder are downloaded into a directory with the name of the subfolder
+        manager = DownloadManager(self.http_client, max_workers=max_workers)
+        manager.add_folder(self, target_path, recursive=recursive, object_classes=object_classes)
+        return [task.path for task in manager.run().tasks]
 
     def upload(self, paths: List[Path], wait=False, verbose=False, relations: dict =None, progress_callback: Optional[ProgressCallback] = None):
         for path in paths:
@@ -232,7 +368,11 @@ class Folder(LinkToFolderMixin, TagMixin, RatingMixin, ParametersMixin, BaseMode
         if response.status_code == 201:
             data = response.json()
             if 'content_object' in data:
-                return Folder.from_response(data['content_object'], http_client=self.http_client)
+                folder = Folder.from_response(data['content_object'], http_client=self.http_client)
+                cache = self._folder_path_cache()
+                if cache is not None:
+                    cache.put(self.id, folder)
+                return folder
 
         raise AgoraException(f'Could not create the folder {name}')
 
@@ -242,23 +382,88 @@ class Folder(LinkToFolderMixin, TagMixin, RatingMixin, ParametersMixin, BaseMode
 
         next_folder = self
         for part in path.parts:
-            next_folder_exists = False
-            for folder in next_folder.get_folders():
-                if folder.name == part:
-                    next_folder = folder
-                    next_folder_exists = True
-                    break
-            if not next_folder_exists:
-                next_folder = next_folder.create_folder(part)
+            folder = next_folder._get_subfolder(part)
+            next_folder = folder if folder else next_folder.create_folder(part)
 
         return next_folder
 
+    def get_or_create_many(self, paths: List[Path], max_workers: int = None) -> Dict[Path, 'Folder']:
+        """Creates many paths in this folder like "mkdir -p"
+
+        The paths are merged into a tree which is processed level by level: the subfolders of every existing folder
+        are listed once and the missing folders of a level are created concurrently.
+
+        Arguments:
+            paths {List[Path]} -- The paths relative to this folder
+
+        Keyword Arguments:
+            max_workers {int} -- The number of concurrent requests (default: {WALK_WORKERS})
+
+        Returns:
+            Dict[Path, Folder] -- The folder of every path
+        """
+        max_workers = int(max_workers if max_workers else self.WALK_WORKERS)
+        paths = [Path(path) for path in paths]
+
+        # the prefix tree of the paths: name -> subtree
+        tree = {}
+        for path in paths:
+            if '..' in path.parts:
+                raise AgoraException(f'The path {path} must not contain ".."')
+            subtree = tree
+            for part in path.relative_to(path.anchor).parts:
+                subtree = subtree.setdefault(part, {})
+
+        folders = {Path(): self}
+        # (folder, subtree, path of the folder, the folder was just created and is empty)
+        level = [(self, tree, Path(), False)]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while level:
+                listed = [folder for folder, subtree, _, created in level if subtree and not created]
+                existing = dict(zip([folder.id for folder in listed], executor.map(self._subfolders_by_name, listed)))
+
+                missing = []
+                next_level = []
+                for folder, subtree, folder_path, created in level:
+                    subfolders = existing.get(folder.id, {}) if not created else {}
+                    for name, child_tree in subtree.items():
+                        if name in subfolders:
+                            folders[folder_path / name] = subfolders[name]
+                            next_level.append((subfolders[name], child_tree, folder_path / name, False))
+                        else:
+                            missing.append((folder, name, child_tree, folder_path / name))
+
+                created_folders = executor.map(lambda m: m[0].create_folder(m[1]), missing)
+                for (_, _, child_tree, child_path), folder in zip(missing, created_folders):
+                    folders[child_path] = folder
+                    next_level.append((folder, child_tree, child_path, True))
+                level = next_level
+
+        return {path: folders[path.relative_to(path.anchor)] for path in paths}
+
+    @staticmethod
+    def _subfolders_by_name(folder):
+        subfolders = {}
+        for subfolder in folder.get_folders():
+            subfolders.setdefault(subfolder.name, subfolder)
+        return subfolders
+
     def delete_item(self, ids):
-        for id in ids:
-            url = f'/api/v1/folderitem/delete_ids/'
-            response = self.http_client.post(url, json={"ids": ids}, timeout=60)
+        url = f'/api/v1/folderitem/delete_ids/'
+        response = self.http_client.post(url, json={"ids": ids}, timeout=60)
+        if response.status_code < 400:
+            # the ids are folder item ids, so the deleted subfolders are not known
+            cache = self._folder_path_cache()
+            if cache is not None:
+                cache.invalidate_subfolders(self.id)
 
     def parent(self):
+        cache = self._folder_path_cache()
+        if cache is not None:
+            parent = cache.parent(self.id)
+            if parent is not None:
+                return parent
+
         breadcrumb = self.get_breadcrumb()
         if len(breadcrumb) > 1:
             id = breadcrumb[-2].object_id
@@ -267,7 +472,7 @@ class Folder(LinkToFolderMixin, TagMixin, RatingMixin, ParametersMixin, BaseMode
             return None
 
     def _get_by_name(self, name, instance):
-        items = self.get_items()
+        items = self.get_items(lightweight=True)
         for item in items:
             if isinstance(item.object, instance) and item.object.name == name:
                 return item.object
@@ -16,4 +16,6 @@ class Host(BaseModel):
         response = self.http_client.post(url, json={}, timeout=60)
 
         if response.status_code != 200:
-            raise AgoraException(f'Cannot copy the task: status = {response.status_code}')
\ No newline at end of file
+            raise AgoraException(f'Cannot copy the task: status = {response.status_code}')
+
+        self._invalidate()
\ No newline at end of file
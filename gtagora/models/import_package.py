@@ -1,21 +1,27 @@
+import asyncio
 import datetime
 import math
 import os
 import tempfile
+import threading
 import time
 import uuid
+from functools import partial
 from pathlib import Path
 from typing import List, Optional
 
 from gtagora.exception import AgoraException
+from gtagora.http.async_client import gather_or_cancel
 from gtagora.http.client import ProgressCallback
 from gtagora.models.base import BaseModel
+from gtagora.models.upload_scheduler import UploadScheduler
 from gtagora.utils import ZipUploadFiles, sha1, UploadFile, UploadState
 
 
 class ImportPackage(BaseModel):
     mTaskInfoTimeout = 120
     BASE_URL = '/api/v1/import/'
+    IDENTITY_MAP = False
 
     def __init__(self, http_client=None):
         super().__init__(http_client=http_client)
@@ -36,7 +42,8 @@ class ImportPackage(BaseModel):
 
     def upload(self, input_files: List[Path], target_folder_id: int = None, target_project_id: int = None, exam_id=None, series_id= None,
                json_import_file=None, wait=True, timeout: int = None, verbose=False, relations: dict = None,
-               progress_file: Path = None, progress_callback: Optional[ProgressCallback] = None):
+               progress_file: Path = None, progress_callback: Optional[ProgressCallback] = None, workers: int = None,
+               max_bytes_in_flight: int = None):
 
         if progress_file is not None and not isinstance(progress_file, Path):
             raise AgoraException(f'progress must be a Path object')
@@ -49,7 +56,8 @@ class ImportPackage(BaseModel):
                                   relations=relations)
 
         state.save(progress_file)
-        return self.upload_from_state(state, progress_file=progress_file, progress_callback_user=progress_callback)
+        return self.upload_from_state(state, progress_file=progress_file, progress_callback_user=progress_callback,
+                                      workers=workers, max_bytes_in_flight=max_bytes_in_flight)
 
     def create_state(self, input_files: List[Path], target_folder_id: int = None, target_project_id: int = None, exam_id=None, series_id=None,
                      json_import_file=None, wait=True, timeout: int = None, verbose=False, relations: dict = None):
@@ -64,32 +72,50 @@ class ImportPackage(BaseModel):
         state.verbose = verbose
         return state
 
-    def upload_from_state(self, state: UploadState, progress_file: Path = None, progress_callback_user: Optional[ProgressCallback] = None):
-        def progress_callback(file: UploadFile):
-            if progress_callback_user:
-                progress_callback_user(file)
-            if state and state.files:
-                # update state
-                index = next((i for i, item in enumerate(state.files) if item.file == file.file), None)
-                if index:
-                    state.files[index] = file
-
-                if progress_file is not None:
-                    state.save(progress_file)
+    def upload_from_state(self, state: UploadState, progress_file: Path = None,
+                          progress_callback_user: Optional[ProgressCallback] = None, workers: int = None,
+                          max_bytes_in_flight: int = None):
+        # the uploads run on several threads. All changes to the state, the progress file and the progress output
+        # happen under this lock
+        state_lock = threading.RLock()
+        zip_uploads = dict()
 
-                if state.verbose:
-                    total_size = sum([f.size for f in state.files])
-                    size_uploaded = sum([f.size for f in state.files if f.uploaded])
-                    if not file.uploaded:
-                        size_uploaded += file.size_uploaded
-                    elif not index:
-                        # the file is a zip file and it is uploaded. However the files in the state have nt yet received
-                        # the uploaded flag.
+        def progress_callback(file: UploadFile):
+            with state_lock:
+                if progress_callback_user:
+                    progress_callback_user(file)
+                if state and state.files:
+                    # update state
+                    index = next((i for i, item in enumerate(state.files) if item.file == file.file), None)
+                    if index is not None:
+                        state.files[index] = file
+                    elif not file.uploaded:
+                        zip_uploads[file.file] = file.size_uploaded
+                    else:
+                        # the file is a zip file and it is uploaded. However the files in the state have not yet
+                        # received the uploaded flag.
                         return
 
-                    files_uploaded = len([f for f in state.files if f.uploaded])
-                    appendix = f'({self.pretty_print_progress(size_uploaded, total_size)}, file {files_uploaded} of {len(state.files)})'
-                    self.print_progress(progress=size_uploaded/total_size, appendix=appendix)
+                    if progress_file is not None:
+                        state.save(progress_file)
+
+                    if state.verbose:
+                        self._print_upload_progress(state, sum(zip_uploads.values()))
+
+        def upload_zip_package(package):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                zip_upload = ZipUploadFiles(package)
+                files = zip_upload.create_zip(Path(temp_dir), single_file=True,
+                                              zip_filename=f'upload_{str(uuid.uuid4())}.agora_upload')
+                self.http_client.upload(url, files, progress_callback=progress_callback)
+                with state_lock:
+                    for file in files:
+                        zip_uploads.pop(file.file, None)
+                    self._set_uploaded(state, package)
+                    state.save(progress_file)
+
+        def upload_file(file):
+            self.http_client.upload(url, [file], progress_callback=progress_callback)
 
         base_url = '/api/v1/import/' + str(self.id) + '/'
         url = base_url + 'upload/'
@@ -99,21 +125,18 @@ class ImportPackage(BaseModel):
             print(f'import package: {self.id}')
             print("uploading...")
 
-        if len(zip_packages) > 0:
-            for package in zip_packages:
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    zip_upload = ZipUploadFiles(package)
-                    files = zip_upload.create_zip(Path(temp_dir), single_file=True, zip_filename=f'upload_{str(uuid.uuid4())}.agora_upload')
-                    response = self.http_client.upload(url, files, progress_callback=progress_callback)
-                    self._set_uploaded(state, package)
-                    state.save(progress_file)
+        scheduler = UploadScheduler(workers=workers, max_bytes=max_bytes_in_flight)
+        for package in zip_packages:
+            scheduler.add(sum([f.size for f in package]), upload_zip_package, package)
 
-        # create a list of the files which are uploaded unzipped. The entries of the new list are a reference to the
-        # original list so that the state is changed as well
-        files_to_upload_indices = [i for i, f in enumerate(state.files) if not f.zip and not f.uploaded]
-        files_to_upload = [state.files[i] for i in files_to_upload_indices]
-        if files_to_upload and len(files_to_upload) > 0:
-            response = self.http_client.upload(url, files_to_upload, progress_callback=progress_callback)
+        # the entries of state.files are passed to the upload, so that their upload state is changed in place. The
+        # chunks of a single file are streamed from the file, so the file neither holds memory nor temporary files
+        # and is only limited by the number of workers.
+        for file in state.files:
+            if not file.zip and not file.uploaded:
+                scheduler.add(0, upload_file, file)
+
+        scheduler.run()
 
         if state.verbose:
             total_size = sum([f.size for f in state.files])
@@ -148,8 +171,28 @@ class ImportPackage(BaseModel):
 
                 raise AgoraException(f'connection timed out while waiting for the import to finish')
 
+    def _print_upload_progress(self, state: UploadState, zip_size_uploaded=0):
+        total_size = sum([f.size for f in state.files])
+        size_uploaded = sum([f.size if f.uploaded else f.size_uploaded for f in state.files]) + zip_size_uploaded
+        files_uploaded = len([f for f in state.files if f.uploaded])
+        appendix = f'({self.pretty_print_progress(size_uploaded, total_size)}, ' \
+                   f'file {files_uploaded} of {len(state.files)})'
+        self.print_progress(progress=size_uploaded / total_size if total_size else 1, appendix=appendix)
+
     def complete(self, json_import_file=None, target_folder_id=None, target_project_id=None, exam_id=None, series_id=None, relations: dict = None):
         url = self.BASE_URL + str(self.id) + '/complete/'
+        post_data = self._complete_data(json_import_file, target_folder_id=target_folder_id,
+                                        target_project_id=target_project_id, exam_id=exam_id, series_id=series_id,
+                                        relations=relations)
+
+        response = self.http_client.post(url, json=post_data)
+        if response.status_code == 204:
+            return True
+        raise AgoraException(f'fail to get progress from ImportPackage {self.id}: {response.status_code}')
+
+    @staticmethod
+    def _complete_data(json_import_file=None, target_folder_id=None, target_project_id=None, exam_id=None,
+                       series_id=None, relations: dict = None):
         post_data = {}
         if json_import_file:
             post_data.update({'import_file': json_import_file})
@@ -163,16 +206,15 @@ class ImportPackage(BaseModel):
             post_data.update({'series': series_id})
         if relations:
             post_data.update({'relations': relations})
-
-        response = self.http_client.post(url, json=post_data)
-        if response.status_code == 204:
-            return True
-        raise AgoraException(f'fail to get progress from ImportPackage {self.id}: {response.status_code}')
+        return post_data
 
     def progress(self):
         url = self.BASE_URL + str(self.id) + '/progress/'
 
         response = self.http_client.get(url)
+        return self._progress_from_response(response)
+
+    def _progress_from_response(self, response):
         if response.status_code == 200:
             data = response.json()
             if 'state' not in data:
@@ -181,6 +223,79 @@ class ImportPackage(BaseModel):
             return self.last_progress
         raise AgoraException(f'fail to get progress from ImportPackage {self.id}: {response.status_code}')
 
+    async def acreate(self, http_client):
+        """Async variant of create. The http_client must be an AsyncClient."""
+        response = await http_client.post(self.BASE_URL, json={}, timeout=60)
+        if response.status_code == 201:
+            data = response.json()
+            if 'id' in data:
+                self._set_values(data)
+                return self
+        raise AgoraException(f"Can't create an Import object: url={response.url} status_code={response.status_code}")
+
+    async def aupload(self, input_files: List[Path], http_client, target_folder_id: int = None,
+                      target_project_id: int = None, exam_id=None, series_id=None, json_import_file=None, wait=True,
+                      timeout: int = None, relations: dict = None, progress_callback: Optional[ProgressCallback] = None,
+                      workers: int = None):
+        """Async variant of upload. The http_client must be an AsyncClient and the import package must have been
+        created before (see acreate).
+
+        The zip packages and single files are uploaded concurrently, at most "workers" at the same time.
+
+        Returns:
+            UploadState -- The state of the upload
+        """
+        loop = asyncio.get_running_loop()
+        state = await loop.run_in_executor(None, partial(
+            self.create_state, input_files, target_folder_id=target_folder_id, target_project_id=target_project_id,
+            exam_id=exam_id, series_id=series_id, json_import_file=json_import_file, wait=wait, timeout=timeout,
+            relations=relations))
+
+        url = self.BASE_URL + str(self.id) + '/upload/'
+        semaphore = asyncio.Semaphore(workers if workers else UploadScheduler.WORKERS)
+
+        async def upload_zip_package(package):
+            async with semaphore:
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    zip_upload = ZipUploadFiles(package)
+                    files = await loop.run_in_executor(None, partial(
+                        zip_upload.create_zip, Path(temp_dir), single_file=True,
+                        zip_filename=f'upload_{str(uuid.uuid4())}.agora_upload'))
+                    await http_client.upload(url, files, progress_callback=progress_callback)
+                self._set_uploaded(state, package)
+
+        async def upload_file(file):
+            async with semaphore:
+                await http_client.upload(url, [file], progress_callback=progress_callback)
+
+        uploads = [upload_zip_package(package) for package in self._create_zip_packages(state)]
+        uploads.extend([upload_file(file) for file in state.files if not file.zip and not file.uploaded])
+        await gather_or_cancel(*uploads)
+
+        complete_url = self.BASE_URL + str(self.id) + '/complete/'
+        response = await http_client.post(complete_url, json=self._complete_data(
+            state.json_import_file, target_folder_id=state.target_folder_id, target_project_id=state.target_project_id,
+            exam_id=state.exam_id, series_id=state.series_id, relations=state.relations))
+        if response.status_code != 204:
+            raise AgoraException(f'fail to get progress from ImportPackage {self.id}: {response.status_code}')
+
+        if not state.wait:
+            return state
+
+        progress_url = self.BASE_URL + str(self.id) + '/progress/'
+        start_time = datetime.datetime.now()
+        while (datetime.datetime.now() - start_time).seconds < state.timeout if state.timeout else True:
+            data = self._progress_from_response(await http_client.get(progress_url))
+            if data['state'] == 5 and data['progress'] == 100:
+                await loop.run_in_executor(None, self._update_import_state, state)
+                return state
+            elif data['state'] == -1:
+                print("Import failed")
+                return state
+            await asyncio.sleep(5)
+
+        raise AgoraException('connection timed out while waiting for the import to finish')
+
     def _group_files_by_size(self, files, max_group_size):
         file_groups = []
         current_group = []
@@ -223,7 +338,8 @@ class ImportPackage(BaseModel):
                 indices = [i for i, f in enumerate(state.files) if Path(f.target) == Path(datafile['path']) and f.imported is False]
                 if indices and len(indices) > 0:
                     for index in indices:
-                        local_sha1 = sha1(Path(state.files[index].file))
+                        # the SHA-1 is computed while the file is uploaded, older upload states don't have it
+                        local_sha1 = state.files[index].sha1 or sha1(Path(state.files[index].file))
                         if local_sha1 == datafile['sha1']:
                             state.files[index].imported = True
                             break
@@ -365,7 +481,8 @@ class ImportPackage(BaseModel):
 
 def import_data(http_client, paths: List[Path], target_folder_id: int = None, target_project_id: int = None, exam_id=None, series_id= None,
                 json_import_file: Path = None, wait=True, verbose=False, relations: dict =None,
-                progress_file: Path = None, progress_callback: Optional[ProgressCallback] = None):
+                progress_file: Path = None, progress_callback: Optional[ProgressCallback] = None, workers: int = None,
+                max_bytes_in_flight: int = None):
     """
     Import a directory or a list of files with optional target file names.
 
@@ -376,6 +493,8 @@ def import_data(http_client, paths: List[Path], target_folder_id: int = None, ta
     :param files: One directory or multiple files as string or Path
     :param target_folder: The target folder
     :param wait: Wait until the upload and import process ha sbeen finished
+    :param workers: The number of files or zip packages which are uploaded at the same time
+    :param max_bytes_in_flight: The maximum number of bytes in the temporary zip files of the running uploads
     :returns: The import package. Can be used to watch the upload
     """
     import_package = ImportPackage(http_client=http_client).create()
@@ -399,5 +518,7 @@ def import_data(http_client, paths: List[Path], target_folder_id: int = None, ta
                           verbose=verbose,
                           relations=relations,
                           progress_file=progress_file,
-                          progress_callback=progress_callback)
+                          progress_callback=progress_callback,
+                          workers=workers,
+                          max_bytes_in_flight=max_bytes_in_flight)
     return state
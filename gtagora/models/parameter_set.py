@@ -51,23 +51,18 @@ class ParameterSet(BaseModel):
         data = {'name': name, 'parameters': parameters}
         response = http_client.patch(url, json=data)
         if response.status_code == 200:
+            identity_map = getattr(http_client, 'identity_map', None)
+            if identity_map is not None:
+                identity_map.invalidate(cls, parameterset_id)
             return cls.get(parameterset_id, http_client=http_client)
         raise AgoraException(
             f'Could not update ParameterSet. HTTP status = {response.status_code}: {response.text}'
         )
 
-    def _get_object(self, id):
+    def _get_object_url(self, id):
         if id:
-            url = f'{self.BASE_URL}{id}/?flat=True'
-        else:
-            url = f'{self.BASE_URL}'
-
-        response = self.http_client.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            return self.__class__.from_response(data, http_client=self.http_client)
-
-        raise AgoraException('Could not get the {0}. HTTP status = {1}'.format(self.__class__.__name__, response.status_code))
+            return f'{self.BASE_URL}{id}/?flat=True'
+        return f'{self.BASE_URL}'
 
     def get_parameters(self):
         return Parameter.get_list_from_data(self.parameters) if hasattr(self, 'parameters') else []
@@ -1,3 +1,5 @@
+from typing import List
+
 from gtagora.exception import AgoraException
 from gtagora.models.base import BaseModel, DownloadDatasetMixin, TagMixin, RatingMixin, ParametersMixin
 from gtagora.models.exam import Exam
@@ -8,19 +10,41 @@ class Patient(ParametersMixin, BaseModel, TagMixin, RatingMixin, DownloadDataset
     BASE_URL = '/api/v1/patient/'
     BASE_URL_V2 = '/api/v2/patient/'
 
-    def get_exams(self, filters=None):
+    def get_exams(self, filters=None, prefetch: List[str] = None):
+        """Returns the exams of the patient
+
+        Keyword Arguments:
+            filters {dict} -- The filters (default: {None})
+            prefetch {List[str]} -- Load the "series" and/or "datasets" of the exams from their trees, which are
+                                    requested concurrently (default: {None})
+
+        Returns:
+            List[Exam] -- The exams
+        """
         if filters and not isinstance(filters, dict):
             raise AgoraException('The filter must be a dict')
 
         url = f'{self.BASE_URL}{self.id}/exams/?limit=10000000000'
-        return self._get_object_list(url, filters, Exam)
+        exams = self._get_object_list(url, filters, Exam)
+        if Exam._needs_prefetch(prefetch):
+            Exam.prefetch_many(exams)
+        return exams
+
+    def iter_exams(self, filters=None, page_size: int = None, prefetch_pages: int = None):
+        """Like get_exams, but the exams are requested page by page while they are consumed"""
+        if filters and not isinstance(filters, dict):
+            raise AgoraException('The filter must be a dict')
+
+        url = f'{self.BASE_URL}{self.id}/exams/'
+        return self._iter_object_list(url, filters, Exam, page_size=page_size, prefetch_pages=prefetch_pages)
 
     def get_series(self, filters=None):
         if filters and not isinstance(filters, dict):
             raise AgoraException('The filter must be a dict')
 
         series = []
-        exams = self.get_exams()
+        # without filters the series are taken from the exam trees instead of requesting them exam by exam
+        exams = self.get_exams(prefetch=None if filters else ['series'])
         for exam in exams:
             series += exam.get_series(filters)
 
@@ -1,4 +1,5 @@
 import json
+from typing import List
 
 from gtagora.exception import AgoraException
 from gtagora.models.base import BaseModel
@@ -33,16 +34,42 @@ class Project(BaseModel):
         if response.status_code == 200:
             data = response.json()
             self._set_values(data)
+            self._invalidate()
             return self
         else:
             raise AgoraException('Could not set the project name {0}', response.status_code)
 
-    def get_exams(self, filters=None):
+    def get_exams(self, filters=None, prefetch: List[str] = None):
+        """Returns the exams of the project
+
+        Keyword Arguments:
+            filters {dict} -- The filters (default: {None})
+            prefetch {List[str]} -- Load the "series" and/or "datasets" of all exams with one request to the project
+                                    tree. Their get_series, get_datasets and get_files are then answered from memory
+                                    (default: {None})
+
+        Returns:
+            List[Exam] -- The exams
+        """
         if filters and not isinstance(filters, dict):
             raise AgoraException('The filter must be a dict')
 
         url = f'{self.BASE_URL}{self.id}/exam/?limit=10000000000'
-        return self._get_object_list(url, filters, Exam)
+        exams = self._get_object_list(url, filters, Exam)
+        if Exam._needs_prefetch(prefetch):
+            trees = {tree.get('id'): tree for tree in self.get_study_tree(parse=False)}
+            for exam in exams:
+                if exam.id in trees:
+                    exam.prefetch(trees[exam.id])
+        return exams
+
+    def iter_exams(self, filters=None, page_size: int = None, prefetch_pages: int = None):
+        """Like get_exams, but the exams are requested page by page while they are consumed"""
+        if filters and not isinstance(filters, dict):
+            raise AgoraException('The filter must be a dict')
+
+        url = f'{self.BASE_URL}{self.id}/exam/'
+        return self._iter_object_list(url, filters, Exam, page_size=page_size, prefetch_pages=prefetch_pages)
 
     def get_tasks(self):
         url = f'{self.BASE_URL}{self.id}/task/?limit=10000000000'
@@ -18,9 +18,21 @@ class Series(LinkToFolderMixin, DownloadDatasetMixin, TagMixin, RatingMixin, Rel
         if filters and not isinstance(filters, dict):
             raise AgoraException('The filter must be a dict')
 
+        prefetched = self._get_prefetched('datasets', filters)
+        if prefetched is not None:
+            return prefetched
+
         url = f'{self.BASE_URL}{self.id}/datasets/?limit=10000000000'
         return self._get_object_list(url, filters, Dataset)
 
+    def iter_datasets(self, filters=None, page_size: int = None, prefetch_pages: int = None):
+        """Like get_datasets, but the datasets are requested page by page while they are consumed"""
+        if filters and not isinstance(filters, dict):
+            raise AgoraException('The filter must be a dict')
+
+        url = f'{self.BASE_URL}{self.id}/datasets/'
+        return self._iter_object_list(url, filters, Dataset, page_size=page_size, prefetch_pages=prefetch_pages)
+
     def upload(self, paths: List[Path], verbose=False, progress_callback: Optional[ProgressCallback] = None):
         for path in paths:
             if not path.exists():
@@ -97,6 +109,7 @@ class Series(LinkToFolderMixin, DownloadDatasetMixin, TagMixin, RatingMixin, Rel
     @staticmethod
     def _get_tree_from_data(data: dict, http_client=None):
         series_tree = Series.from_response(data, http_client=http_client)
-        new_datasets = [Dataset.from_response(ds_json) for ds_json in series_tree.datasets]
+        new_datasets = [Dataset.from_tree(ds_json, http_client=http_client) for ds_json in series_tree.datasets]
         series_tree.datasets = new_datasets
+        series_tree._set_prefetched('datasets', new_datasets)
         return series_tree
@@ -79,6 +79,7 @@ class Task(BaseModel):
             response = self.http_client.put(url, json=data, timeout=60)
             if response.status_code != 200:
                 raise AgoraException('Cannot create a task: ' + response.text)
+            self._invalidate()
 
     def delete(self):
         if not hasattr(self, 'id') or not self.id:
@@ -88,6 +89,7 @@ class Task(BaseModel):
             response = self.http_client.delete(url, timeout=60)
             if response.status_code != 204:
                 raise AgoraException('Cannot delete the task: ' + response.text)
+            self._invalidate()
 
     def toDict(self):
         fields = ['container_name', 'container_options', 'execute_template', 'host', 'host_id', 'id', 'inputs', 'members', 'mount_volumes', 'name', 'outputs', 'parse_output_for_error', 'success_exit_code', 'task_target', 'use_docker']
@@ -145,6 +147,8 @@ class Task(BaseModel):
         if response.status_code != 200:
             raise AgoraException(f'Cannot copy the task: status = {response.status_code}')
 
+        self._invalidate()
+
     def _get_run_cmd(self):
         cmd = 'task.run('
         alternate_cmd = 'task.run('
@@ -1,3 +1,4 @@
+import asyncio
 import datetime
 import time
 
@@ -8,6 +9,7 @@ from gtagora.models.base import BaseModel
 class TimelineItem(BaseModel):
     BASE_URL = '/api/v2/timeline/'
     TIMEOUT = 60
+    IDENTITY_MAP = False
 
     def join(self):
         return self.poll()
@@ -31,3 +33,22 @@ class TimelineItem(BaseModel):
             else:
                 return None
 
+    async def apoll(self, http_client, interval=2):
+        """Async variant of poll. The http_client must be an AsyncClient."""
+        start_time = datetime.datetime.now()
+        while (datetime.datetime.now() - start_time).seconds < self.TIMEOUT:
+            timeline = await self.aget(self.id, http_client=http_client)
+
+            state = timeline.data.get('state')
+            if state:
+                if state == 0 or state == 1:
+                    await asyncio.sleep(interval)
+                    continue
+                elif state == 2:
+                    return timeline
+                elif state == 3:
+                    raise AgoraException(timeline.error)
+                elif state == 4 or state == 5:
+                    return None
+            else:
+                return None
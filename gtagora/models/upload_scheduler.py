@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from typing import Callable
+
+
+class ByteBudget:
+    """Limits the number of bytes which are held by running jobs at the same time.
+
+    A job which is larger than the whole budget is still run, but only when no other job holds any bytes.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int):
+        size = min(max(size, 0), self.max_bytes)
+        with self._condition:
+            self._condition.wait_for(lambda: self.used + size <= self.max_bytes)
+            self.used += size
+        return size
+
+    def release(self, size: int):
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+
+class UploadScheduler:
+    """Runs upload jobs (single files or zip packages) concurrently.
+
+    Jobs are started in the order they were added on a pool of workers. Every job reserves its size from a shared
+    byte budget before it starts, so that the number of bytes which are written to temporary zip files at the same
+    time stays bounded. Jobs which don't hold any bytes (e.g. streamed single files) reserve a size of 0. The first
+    failing job cancels all jobs which haven't started yet and its exception is raised by run().
+    """
+
+    WORKERS = 4
+    MAX_BYTES = 1024 * 1024 * 1024  # 1GB
+
+    def __init__(self, workers: int = None, max_bytes: int = None):
+        self.workers = workers if workers else self.WORKERS
+        self.budget = ByteBudget(max_bytes if max_bytes else self.MAX_BYTES)
+        self._jobs = []
+        self._failed = threading.Event()
+
+    def add(self, size: int, fct: Callable, *args, **kwargs):
+        self._jobs.append((size, fct, args, kwargs))
+
+    def run(self):
+        jobs, self._jobs = self._jobs, []
+        if not jobs:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(jobs))) as executor:
+            futures = [executor.submit(self._run_job, *job) for job in jobs]
+            try:
+                done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                for future in futures:
+                    if future in done and future.exception() is not None:
+                        raise future.exception()
+                return [future.result() for future in futures]
+            except BaseException:
+                self._failed.set()
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _run_job(self, size, fct, args, kwargs):
+        if self._failed.is_set():
+            return None
+        reserved = self.budget.acquire(size)
+        try:
+            if self._failed.is_set():
+                return None
+            return fct(*args, **kwargs)
+        finally:
+            self.budget.release(reserved)
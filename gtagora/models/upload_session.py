@@ -37,5 +37,6 @@ class UploadSession:
         else:
             raise AgoraException('Either a path list or an existing progress_file must be given as argument')
 
-    def start(self):
-        return self.import_package.upload_from_state(self.state, self.progress_file)
\ No newline at end of file
+    def start(self, workers: int = None, max_bytes_in_flight: int = None):
+        return self.import_package.upload_from_state(self.state, self.progress_file, workers=workers,
+                                                     max_bytes_in_flight=max_bytes_in_flight)
\ No newline at end of file
@@ -9,6 +9,7 @@ from typing import List, Union
 from urllib.parse import urlparse
 
 from gtagora.exception import AgoraException
+from gtagora.hash_index import get_hash_index
 
 
 class EnhancedJSONEncoder(json.JSONEncoder):
@@ -30,8 +31,12 @@ class UploadFile:
     nr_chunks: Union[int, None] = None
     chunks_completed: Union[int, None] = None
     identifier: Union[str, None] = None
+    chunk_size: Union[int, None] = None
     uploaded: bool = False
     imported: bool = False
+    sha1: Union[str, None] = None
+    # a zip package which is created for the upload and removed afterwards
+    temporary: bool = False
 
     def json(self):
         return json.dumps(self, cls=EnhancedJSONEncoder)
@@ -101,6 +106,8 @@ class ZipUploadFiles:
         self._zip_is_required = False
 
     def create_zip(self, path: Path, single_file=False, zip_filename=None):
+        """Zips the small files (all files if single_file is True) into temporary zip packages in path. The SHA-1 of
+        every zipped file is computed while it is written and stored in its sha1."""
         files_to_zip = self._create_file_list(single_file=single_file)
 
         if self._zip_is_required is False:
@@ -114,12 +121,12 @@ class ZipUploadFiles:
             zip_filename = zip_filename if zip_filename is not None else f'upload_{index}.agora_upload'
             zip_path = path / zip_filename
             zip_id = len(zip_files)
-            zip_files.append(UploadFile(id=zip_id, file=zip_path, target=zip_filename))
+            zip_files.append(UploadFile(id=zip_id, file=zip_path, target=zip_filename, temporary=True))
 
             with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_STORED) as z:
                 for file, do_zip in files_to_zip[index:]:
                     if do_zip:
-                        z.write(file.file, file.target)
+                        file.sha1 = self._write_file(z, file)
                     else:
                         zip_files.append(UploadFile(id=len(zip_files), file=file.file, target=file.target, size=file.file.stat().st_size))
                     index += 1
@@ -134,6 +141,27 @@ class ZipUploadFiles:
 
         return zip_files
 
+    @staticmethod
+    def _write_file(z: zipfile.ZipFile, file: UploadFile):
+        # the file is hashed while it is zipped, so that the import can be verified without reading it again
+        stat = file.file.stat()
+        info = zipfile.ZipInfo.from_file(file.file, file.target)
+        info.compress_type = z.compression
+        hash = hashlib.sha1()
+        with file.file.open('rb') as source, z.open(info, 'w') as target:
+            while True:
+                data = source.read(1024 * 1024)
+                if not data:
+                    break
+                hash.update(data)
+                target.write(data)
+
+        digest = hash.hexdigest()
+        index = get_hash_index()
+        if index is not None:
+            index.put(file.file, 'sha1', digest, stat=stat)
+        return digest
+
     def _create_file_list(self, single_file=False):
 
         def create_entry(file: UploadFile, single_file=False):
@@ -159,22 +187,23 @@ def remove_illegal_chars(path: str):
 
 
 def sha1(path: Path):
+    return _hash_file(path, 'sha1')
 
-    sha1 = hashlib.sha1()
-    BUF_SIZE = 1024*1024
 
-    with path.open('rb') as f:
-        while True:
-            data = f.read(BUF_SIZE)
-            if not data:
-                break
-            sha1.update(data)
+def sha256(path: Path):
+    return _hash_file(path, 'sha256')
 
-    return sha1.hexdigest()
 
+def _hash_file(path: Path, algorithm: str):
+    # the stat is taken before the file is read, so that a change while hashing is not stored in the hash index
+    index = get_hash_index()
+    stat = path.stat() if index is not None else None
+    if index is not None:
+        digest = index.get(path, algorithm, stat=stat)
+        if digest:
+            return digest
 
-def sha256(path: Path):
-    sha256 = hashlib.sha256()
+    hash = hashlib.new(algorithm)
     BUF_SIZE = 1024 * 1024
 
     with path.open('rb') as f:
@@ -182,9 +211,12 @@ def sha256(path: Path):
             data = f.read(BUF_SIZE)
             if not data:
                 break
-            sha256.update(data)
+            hash.update(data)
 
-    return sha256.hexdigest()
+    digest = hash.hexdigest()
+    if index is not None:
+        index.put(path, algorithm, digest, stat=stat)
+    return digest
 
 
 def validate_url(url):
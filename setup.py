@@ -18,6 +18,9 @@ setuptools.setup(
         "packaging>=20.0",
         "numpy",
     ],
+    extras_require={
+        "async": ["aiohttp>=3.7"],
+    },
     python_requires=">=3.6.0",
     classifiers=[
         "Programming Language :: Python :: 3",
@@ -16,6 +16,7 @@ class FakeResponse:
         self.status_code = status_code
         self.data = data
         self.text = ''
+        self.headers = {}
 
     @property
     def content(self):
@@ -74,3 +75,58 @@ class FakeClient(Client):
     def delete(self, url, timeout=None, **kwargs):
         self._log('DELETE', url)
         return self._get_response(url, 'DELETE')
+
+
+class LocalServer:
+    """A small threaded HTTP/1.1 server on localhost used as a stand-in for Agora.
+
+    The handler is called as handler(request_handler) and must return (status, headers, body). Every request is
+    recorded with its method, path, headers and the client port so that tests can check connection reuse.
+    """
+
+    def __init__(self, handler):
+        import http.server
+        import threading
+
+        server = self
+
+        class RequestHandler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self.body = self.rfile.read(length) if length else b''
+                with server.lock:
+                    server.requests.append({'method': self.command, 'path': self.path, 'headers': dict(self.headers),
+                                            'port': self.client_address[1], 'body': self.body})
+                status, headers, body = handler(self)
+                if isinstance(body, (dict, list)):
+                    body = _json.dumps(body).encode()
+                    headers = {'Content-Type': 'application/json', **headers}
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        self.lock = threading.Lock()
+        self.requests = []
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RequestHandler)
+        self.httpd.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self._thread = threading.Thread(target=self.httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
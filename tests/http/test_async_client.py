@@ -0,0 +1,171 @@
+import asyncio
+import re
+from pathlib import Path
+
+import pytest
+
+from gtagora.exception import AgoraException
+from gtagora.http.connection import ApiKeyConnection
+from gtagora.models.datafile import Datafile
+from gtagora.models.folder import Folder
+from gtagora.models.folder_item import FolderItem
+from gtagora.models.import_package import ImportPackage
+from gtagora.models.timeline import TimelineItem
+from gtagora.utils import UploadFile
+from tests.helper import LocalServer, load_fixture
+
+aiohttp = pytest.importorskip('aiohttp')
+
+from gtagora.http.async_client import AsyncClient  # noqa: E402
+
+CONTENT = bytes(range(256)) * 8
+
+
+def agora_handler(request):
+    path = request.path.split('?')[0]
+    if path == '/api/v2/folder/5/':
+        return 200, {}, load_fixture('folder/folder.json')
+    if path == '/api/v1/folder/5/items/':
+        return 200, {}, load_fixture('folder/folder_items.json')
+    if path == '/api/v1/datafile/1/download/':
+        match = re.match(r'bytes=(\d+)-', request.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            return 206, {'Content-Range': f'bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}'}, CONTENT[start:]
+        return 200, {}, CONTENT
+    if path == '/api/v1/version/':
+        return 200, {}, {'server': 'test'}
+    if path == '/api/v1/import/1/upload/':
+        return 200, {}, {}
+    if path == '/api/v1/import/':
+        return 201, {}, {'id': 1}
+    if path == '/api/v1/import/1/complete/':
+        return 204, {}, b''
+    if path == '/api/v2/timeline/3/':
+        return 200, {}, {'id': 3, 'data': {'state': 2}}
+    return 404, {}, {}
+
+
+def run(coroutine_function):
+    async def main():
+        with LocalServer(agora_handler) as server:
+            async with AsyncClient(ApiKeyConnection(server.url, api_key='key')) as client:
+                result = await coroutine_function(client)
+        return server, result
+
+    return asyncio.run(main())
+
+
+class TestAsyncClient:
+
+    def test_get_sends_authentication(self):
+        server, response = run(lambda client: client.get('/api/v1/version/'))
+
+        assert response.status_code == 200
+        assert response.json() == {'server': 'test'}
+        assert server.requests[0]['headers']['Authorization'] == 'X-Agora-Api-Key key'
+
+    def test_connections_are_reused(self):
+        async def requests(client):
+            for _ in range(3):
+                await client.get('/api/v1/version/')
+
+        server, _ = run(requests)
+
+        assert len({r['port'] for r in server.requests}) == 1
+
+    def test_aget_and_aget_items(self):
+        async def get_items(client):
+            folder = await Folder.aget(5, http_client=client)
+            return folder, await folder.aget_items(client)
+
+        server, (folder, items) = run(get_items)
+
+        assert folder.name == 'Results'
+        assert folder.http_client is not None
+        assert len(items) == 2
+        assert all(isinstance(i, FolderItem) for i in items)
+
+    def test_aget_requires_async_client(self, http_client):
+        with pytest.raises(AgoraException):
+            asyncio.run(Folder.aget(5, http_client=http_client))
+
+    def test_adownload_resumes(self, tmpdir):
+        Path(tmpdir, 'file.dat.part').write_bytes(CONTENT[:100])
+        datafile = Datafile.from_response({'id': 1, 'original_filename': 'file.dat', 'size': len(CONTENT), 'sha1': ''})
+
+        server, path = run(lambda client: datafile.adownload(Path(tmpdir), client))
+
+        assert path.read_bytes() == CONTENT
+        assert server.requests[0]['headers']['Range'] == 'bytes=100-'
+        assert not Path(tmpdir, 'file.dat.part').exists()
+
+    def test_upload_parallel_chunks(self, tmpdir):
+        file = Path(tmpdir) / 'raw.dat'
+        file.write_bytes(b'0123456789' * 7 + b'0123')
+        upload_file = UploadFile(id=0, file=file, target='raw.dat')
+
+        async def upload(client):
+            client.client.UPLOAD_CHUCK_SIZE = 10
+            return await client.upload('/api/v1/import/1/upload/', [upload_file], parallel_chunks=3)
+
+        server, result = run(upload)
+
+        chunks = [r['body'] for r in server.requests if r['method'] == 'POST']
+        numbers = sorted(int(re.search(rb'name="flowChunkNumber"\r\n(?:[^\r\n]*\r\n)*?\r\n(\d+)', c).group(1))
+                         for c in chunks)
+        assert result is True
+        assert numbers == list(range(1, 9))
+        assert upload_file.uploaded
+        assert upload_file.chunks_completed == 8
+
+    def test_failed_chunks_cancel_the_upload(self, tmpdir):
+        file = Path(tmpdir) / 'raw.dat'
+        file.write_bytes(b'0123456789' * 8)
+        upload_file = UploadFile(id=0, file=file, target='raw.dat')
+        posted = []
+
+        async def upload_chunk(url, upload_file, chunk, filesize, verify_hash=False, max_retries=5, file_hash=None):
+            posted.append(chunk)
+            await asyncio.sleep(0)
+            if chunk == 1:
+                raise AgoraException(f'chunk {chunk} failed')
+            await asyncio.sleep(0.05)
+            return 10
+
+        async def upload(client):
+            client.client.UPLOAD_CHUCK_SIZE = 10
+            client._upload_chunk = upload_chunk
+            with pytest.raises(AgoraException):
+                await client.upload('/api/v1/import/1/upload/', [upload_file], parallel_chunks=2)
+            await asyncio.sleep(0.2)
+
+        run(upload)
+
+        assert posted == [1, 2]
+        assert upload_file.chunks_completed == 0
+        assert not upload_file.uploaded
+
+    def test_apoll(self):
+        timeline = TimelineItem.from_response({'id': 3, 'data': {'state': 1}})
+
+        _, result = run(lambda client: timeline.apoll(client, interval=0))
+
+        assert result.data['state'] == 2
+
+    def test_import_package_aupload(self, tmpdir):
+        files = []
+        for i in range(5):
+            file = Path(tmpdir) / f'file{i}.dat'
+            file.write_bytes(bytes([i]) * (100 + i))
+            files.append(file)
+
+        async def upload(client):
+            import_package = await ImportPackage(http_client=client.client).acreate(client)
+            return await import_package.aupload(files, client, target_folder_id=5, wait=False)
+
+        server, state = run(upload)
+
+        assert all(f.uploaded for f in state.files)
+        assert server.requests[-1]['path'] == '/api/v1/import/1/complete/'
+        assert b'"folder": 5' in server.requests[-1]['body']
@@ -0,0 +1,125 @@
+from pathlib import Path
+
+import pytest
+
+from gtagora.http.cache import ResponseCache
+from gtagora.http.client import Client
+from gtagora.http.connection import ApiKeyConnection
+from tests.helper import LocalServer
+
+TREE_URL = '/api/v2/folder/5/tree/'
+
+
+def etag_handler(request):
+    if request.command != 'GET':
+        return 204, {}, b''
+    if request.headers.get('If-None-Match') == '"v1"':
+        return 304, {'ETag': '"v1"'}, b''
+    return 200, {'ETag': '"v1"'}, {'path': request.path}
+
+
+def plain_handler(request):
+    return 200, {}, {'path': request.path}
+
+
+def create_client(server, cache, api_key='key'):
+    client = Client(ApiKeyConnection(server.url, api_key=api_key))
+    client.response_cache = cache
+    return client
+
+
+@pytest.fixture()
+def cache(tmpdir):
+    cache = ResponseCache(Path(tmpdir) / 'cache.sqlite')
+    yield cache
+    cache.close()
+
+
+class TestResponseCache:
+
+    def test_revalidates_with_etag(self, cache):
+        with LocalServer(etag_handler) as server:
+            client = create_client(server, cache)
+            first = client.get(TREE_URL)
+            second = client.get(TREE_URL)
+
+        assert first.json() == second.json() == {'path': TREE_URL}
+        assert second.from_cache
+        assert server.requests[1]['headers']['If-None-Match'] == '"v1"'
+        assert cache.revalidated == 1
+
+    def test_cache_is_kept_between_runs(self, cache, tmpdir):
+        with LocalServer(etag_handler) as server:
+            create_client(server, cache).get(TREE_URL)
+            other_cache = ResponseCache(Path(tmpdir) / 'cache.sqlite')
+            response = create_client(server, other_cache).get(TREE_URL)
+            other_cache.close()
+
+        assert response.json() == {'path': TREE_URL}
+        assert server.requests[1]['headers']['If-None-Match'] == '"v1"'
+
+    def test_fresh_responses_are_not_requested(self, tmpdir):
+        cache = ResponseCache(Path(tmpdir) / 'cache.sqlite', ttl_rules=[(r'/tree/$', 3600)])
+        with LocalServer(plain_handler) as server:
+            client = create_client(server, cache)
+            client.get(TREE_URL)
+            response = client.get(TREE_URL)
+            client.get('/api/v2/folder/5/')
+            client.get('/api/v2/folder/5/')
+
+        assert response.json() == {'path': TREE_URL}
+        assert [r['path'] for r in server.requests] == [TREE_URL, '/api/v2/folder/5/', '/api/v2/folder/5/']
+        assert cache.hits == 1
+
+    def test_users_do_not_share_responses(self, cache):
+        with LocalServer(etag_handler) as server:
+            create_client(server, cache, api_key='a').get(TREE_URL)
+            create_client(server, cache, api_key='b').get(TREE_URL)
+
+        assert 'If-None-Match' not in server.requests[1]['headers']
+
+    def test_params_are_part_of_the_key(self, cache):
+        with LocalServer(etag_handler) as server:
+            client = create_client(server, cache)
+            client.get('/api/v1/exam/', params={'limit': 1})
+            response = client.get('/api/v1/exam/', params={'limit': 2})
+
+        assert response.json() == {'path': '/api/v1/exam/?limit=2'}
+        assert 'If-None-Match' not in server.requests[1]['headers']
+
+    def test_writes_invalidate_the_url(self, cache):
+        with LocalServer(etag_handler) as server:
+            client = create_client(server, cache)
+            client.get(TREE_URL)
+            client.delete('/api/v2/folder/5/')
+            client.get(TREE_URL)
+
+        assert 'If-None-Match' not in server.requests[2]['headers']
+
+    def test_writes_to_actions_invalidate_the_resource(self, tmpdir):
+        cache = ResponseCache(Path(tmpdir) / 'cache.sqlite', ttl_rules=[('/api/', 60)])
+        urls = ['/api/v1/folder/5/', '/api/v2/folder/5/items/', '/api/v1/serie/3/', '/api/v2/series/3/datasets/']
+        with LocalServer(plain_handler) as server:
+            client = create_client(server, cache)
+            for url in urls + ['/api/v1/folder/6/']:
+                client.get(url)
+            client.post('/api/v1/folder/5/new/', json={'name': 'new'})
+            client.post('/api/v2/series/3/move_to/folder/6/')
+            for url in urls + ['/api/v1/folder/6/']:
+                client.get(url)
+
+        assert [r['path'] for r in server.requests[7:]] == urls
+        cache.close()
+
+    def test_least_recently_used_responses_are_evicted(self, tmpdir):
+        cache = ResponseCache(Path(tmpdir) / 'cache.sqlite', max_size=100)
+        with LocalServer(etag_handler) as server:
+            client = create_client(server, cache)
+            for i in range(5):
+                client.get(f'/api/v1/dataset/{i}/')
+
+        assert 0 < cache.size() <= 100
+        key = cache.key(server.url + '/api/v1/dataset/0/', client._auth_identity())
+        assert cache.get(key) is None
+        key = cache.key(server.url + '/api/v1/dataset/4/', client._auth_identity())
+        assert cache.get(key) is not None
@@ -0,0 +1,109 @@
+from pathlib import Path
+
+import pytest
+
+from gtagora.http.chunk_size import AdaptiveChunkSize
+from gtagora.utils import UploadFile, UploadState
+from tests.helper import FakeResponse
+
+UPLOAD_URL = '/api/v1/import/1/upload/'
+
+
+@pytest.fixture()
+def policy(monkeypatch):
+    monkeypatch.setattr(AdaptiveChunkSize, 'ALIGNMENT', 1)
+    return AdaptiveChunkSize(initial_chunk_size=100, min_chunk_size=10, max_chunk_size=1000, target_duration=10)
+
+
+@pytest.fixture()
+def upload_client(http_client, policy):
+    http_client.set_response('/api/v1/version/', FakeResponse(200, {'server': 'test'}))
+    http_client.set_response(UPLOAD_URL, FakeResponse(200, {}))
+    http_client.upload_chunk_policy = policy
+    return http_client
+
+
+def make_upload_file(tmpdir, name='raw.dat', size=95):
+    file = Path(tmpdir) / name
+    file.write_bytes(b'x' * size)
+    return UploadFile(id=0, file=file, target=name)
+
+
+class TestAdaptiveChunkSize:
+
+    def test_grows_with_throughput(self, policy):
+        policy.record(100, 0.5)
+
+        # 200 bytes/s for 10 seconds
+        assert policy.next_chunk_size() == 1000
+
+    def test_is_clamped(self, policy):
+        policy.record(100, 100)
+
+        assert policy.next_chunk_size() == 10
+
+    def test_failures_shrink_the_chunks(self, policy):
+        policy.record(100, 1)
+        size = policy.next_chunk_size()
+
+        policy.record(size, 60, failed=True)
+
+        assert policy.next_chunk_size() == size // 2
+        assert policy.error_rate > 0
+
+    def test_timeout_scales_with_expected_duration(self, policy):
+        assert policy.timeout(100, 60) == 60
+
+        policy.record(100, 10)
+
+        assert policy.timeout(100, 5) == pytest.approx(30)
+        assert policy.timeout(100, 60) == 60
+
+
+class TestAdaptiveUpload:
+
+    def test_chunk_size_is_chosen_per_file(self, upload_client, policy, tmpdir):
+        first = make_upload_file(tmpdir, 'first.dat')
+        second = make_upload_file(tmpdir, 'second.dat')
+        policy.record(10, 1)
+
+        upload_client.upload(UPLOAD_URL, [first, second])
+
+        assert first.chunk_size == 100
+        assert second.chunk_size == policy.next_chunk_size()
+        posts = [r['data'].fields for r in upload_client.requests if r['method'] == 'POST']
+        assert {p['flowChunkSize'] for p in posts if p['flowFilename'] == 'first.dat'} == {'100'}
+        assert first.uploaded and second.uploaded
+
+    def test_resume_keeps_the_stored_chunk_size(self, upload_client, tmpdir):
+        upload_file = make_upload_file(tmpdir)
+        upload_file.identifier = 'resume-id'
+        upload_file.chunk_size = 30
+        upload_file.chunks_completed = 2
+
+        upload_client.upload(UPLOAD_URL, [upload_file])
+
+        posts = [r['data'].fields for r in upload_client.requests if r['method'] == 'POST']
+        assert [p['flowChunkNumber'] for p in posts] == ['3', '4']
+        assert {p['flowChunkSize'] for p in posts} == {'30'}
+        assert upload_file.chunk_size == 30
+
+    def test_resume_without_stored_chunk_size_uses_the_fixed_size(self, upload_client, tmpdir):
+        upload_client.UPLOAD_CHUCK_SIZE = 40
+        upload_file = make_upload_file(tmpdir)
+        upload_file.identifier = 'resume-id'
+        upload_file.chunks_completed = 1
+
+        upload_client.upload(UPLOAD_URL, [upload_file])
+
+        assert upload_file.chunk_size == 40
+        assert upload_file.nr_chunks == 3
+
+    def test_chunk_size_is_saved_in_the_state(self, upload_client, tmpdir):
+        upload_file = make_upload_file(tmpdir)
+        upload_client.upload(UPLOAD_URL, [upload_file])
+        state_file = Path(tmpdir) / 'state.json'
+
+        UploadState(import_package=1, files=[upload_file]).save(state_file)
+
+        assert UploadState.from_file(state_file).files[0].chunk_size == 100
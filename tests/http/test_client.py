@@ -0,0 +1,83 @@
+from gtagora.http.client import Client
+from gtagora.http.connection import ApiKeyConnection, TokenConnection
+from tests.helper import LocalServer
+
+
+def version_handler(request):
+    return 200, {}, {'server': 'test', 'version': '7.14.0'}
+
+
+class TestClientSession:
+
+    def test_connections_are_reused(self):
+        with LocalServer(version_handler) as server:
+            client = Client(ApiKeyConnection(server.url, api_key='key'))
+            for _ in range(5):
+                response = client.get('/api/v1/version/')
+                assert response.status_code == 200
+            client.close()
+
+        assert len(server.requests) == 5
+        assert len({r['port'] for r in server.requests}) == 1
+        assert all(r['headers']['Authorization'] == 'X-Agora-Api-Key key' for r in server.requests)
+
+    def test_keep_alive_disabled(self):
+        with LocalServer(version_handler) as server:
+            client = Client(ApiKeyConnection(server.url, api_key='key'), keep_alive=False)
+            client.get('/api/v1/version/')
+            client.get('/api/v1/version/')
+            client.close()
+
+        assert server.requests[0]['headers']['Connection'] == 'close'
+        assert len({r['port'] for r in server.requests}) == 2
+
+    def test_pool_configuration(self):
+        client = Client(ApiKeyConnection('http://localhost', api_key='key'), pool_connections=3, pool_maxsize=7,
+                        pool_block=True)
+
+        adapter = client.session.get_adapter('http://localhost/')
+        assert adapter._pool_connections == 3
+        assert adapter._pool_maxsize == 7
+        assert adapter._pool_block is True
+        assert client.session is client.session
+
+    def test_session_is_shared_between_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        with LocalServer(version_handler) as server:
+            client = Client(ApiKeyConnection(server.url, api_key='key'), pool_maxsize=4)
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                status_codes = list(executor.map(lambda i: client.get('/api/v1/version/').status_code, range(40)))
+            client.close()
+
+        assert status_codes == [200] * 40
+        assert len({r['port'] for r in server.requests}) <= 4
+
+    def test_cookies_are_not_stored(self):
+        def handler(request):
+            return 200, {'Set-Cookie': 'sessionid=abc; Path=/'}, {'key': 'token'}
+
+        with LocalServer(handler) as server:
+            client = Client(TokenConnection(server.url))
+            client.post('/api/v1/rest-auth/login/', data={'username': 'u', 'password': 'p'})
+            client.get('/api/v1/version/')
+            client.close()
+
+        assert 'Cookie' not in server.requests[1]['headers']
+
+
+class TestConnectionAuth:
+
+    def test_auth_is_cached(self):
+        connection = ApiKeyConnection('http://localhost', api_key='key')
+        assert connection.get_auth() is connection.get_auth()
+
+    def test_token_auth_follows_token(self):
+        connection = TokenConnection('http://localhost')
+        connection.token = 'first'
+        first = connection.get_auth()
+        connection.token = 'second'
+        second = connection.get_auth()
+
+        assert first is not second
+        assert second.token == 'second'
@@ -0,0 +1,128 @@
+import json
+import re
+from pathlib import Path
+
+import pytest
+
+from gtagora.exception import DownloadError
+from gtagora.http.client import Client
+from gtagora.http.connection import ApiKeyConnection
+from tests.helper import LocalServer
+
+DOWNLOAD_URL = '/api/v1/datafile/1/download/'
+CONTENT = bytes(range(256)) * 40
+
+
+def range_handler(request):
+    match = re.match(r'bytes=(\d+)-(\d*)', request.headers.get('Range', ''))
+    if not match:
+        return 200, {}, CONTENT
+    start = int(match.group(1))
+    end = int(match.group(2)) if match.group(2) else len(CONTENT) - 1
+    if start >= len(CONTENT):
+        return 416, {'Content-Range': f'bytes */{len(CONTENT)}'}, b''
+    return 206, {'Content-Range': f'bytes {start}-{end}/{len(CONTENT)}'}, CONTENT[start:end + 1]
+
+
+def no_range_handler(request):
+    return 200, {}, CONTENT
+
+
+@pytest.fixture()
+def segment_client():
+    def create(server):
+        client = Client(ApiKeyConnection(server.url, api_key='key'))
+        client.DOWNLOAD_SEGMENT_MIN_SIZE = 1024
+        client.DOWNLOAD_CHUNK_SIZE = 512
+        return client
+    return create
+
+
+def ranges(server):
+    return sorted(r['headers'].get('Range') for r in server.requests if r['headers'].get('Range'))
+
+
+class TestDownload:
+
+    def test_single_stream(self, tmpdir, segment_client):
+        target = Path(tmpdir) / 'file.dat'
+        with LocalServer(range_handler) as server:
+            result = segment_client(server).download(DOWNLOAD_URL, target.as_posix())
+
+        assert result == target
+        assert target.read_bytes() == CONTENT
+        assert ranges(server) == []
+        assert not Path(tmpdir, 'file.dat.part').exists()
+
+    def test_segmented(self, tmpdir, segment_client):
+        target = Path(tmpdir) / 'file.dat'
+        with LocalServer(range_handler) as server:
+            segment_client(server).download(DOWNLOAD_URL, target.as_posix(), size=len(CONTENT), segments=4)
+
+        assert target.read_bytes() == CONTENT
+        assert ranges(server) == ['bytes=0-2559', 'bytes=2560-5119', 'bytes=5120-7679', 'bytes=7680-10239']
+        assert not Path(tmpdir, 'file.dat.part').exists()
+        assert not Path(tmpdir, 'file.dat.part.json').exists()
+
+    def test_segmented_falls_back_without_range_support(self, tmpdir, segment_client):
+        target = Path(tmpdir) / 'file.dat'
+        with LocalServer(no_range_handler) as server:
+            segment_client(server).download(DOWNLOAD_URL, target.as_posix(), size=len(CONTENT), segments=4)
+
+        assert target.read_bytes() == CONTENT
+        assert len(server.requests) == 2
+
+    def test_resume_single_stream(self, tmpdir, segment_client):
+        target = Path(tmpdir) / 'file.dat'
+        Path(tmpdir, 'file.dat.part').write_bytes(CONTENT[:1000])
+        with LocalServer(range_handler) as server:
+            segment_client(server).download(DOWNLOAD_URL, target.as_posix())
+
+        assert target.read_bytes() == CONTENT
+        assert ranges(server) == ['bytes=1000-']
+
+    def test_resume_complete_partial_file(self, tmpdir, segment_client):
+        target = Path(tmpdir) / 'file.dat'
+        Path(tmpdir, 'file.dat.part').write_bytes(CONTENT)
+        with LocalServer(range_handler) as server:
+            segment_client(server).download(DOWNLOAD_URL, target.as_posix())
+
+        assert target.read_bytes() == CONTENT
+        assert len(server.requests) == 1
+
+    def test_resume_segmented(self, tmpdir, segment_client):
+        target = Path(tmpdir) / 'file.dat'
+        partial = bytearray(len(CONTENT))
+        partial[0:2000] = CONTENT[0:2000]
+        partial[5120:7680] = CONTENT[5120:7680]
+        Path(tmpdir, 'file.dat.part').write_bytes(bytes(partial))
+        plan = [[0, 2560, 2000], [2560, 5120, 2560], [5120, 7680, 7680], [7680, 10240, 7680]]
+        Path(tmpdir, 'file.dat.part.json').write_text(json.dumps({'size': len(CONTENT), 'segments': plan}))
+
+        with LocalServer(range_handler) as server:
+            segment_client(server).download(DOWNLOAD_URL, target.as_posix(), size=len(CONTENT), segments=4)
+
+        assert target.read_bytes() == CONTENT
+        assert ranges(server) == ['bytes=2000-2559', 'bytes=2560-5119', 'bytes=7680-10239']
+
+    def test_interrupted_segment_keeps_partial_file(self, tmpdir, segment_client):
+        target = Path(tmpdir) / 'file.dat'
+
+        def failing_handler(request):
+            if request.headers.get('Range') == 'bytes=2560-5119':
+                return 500, {}, b''
+            return range_handler(request)
+
+        with LocalServer(failing_handler) as server:
+            with pytest.raises(DownloadError):
+                segment_client(server).download(DOWNLOAD_URL, target.as_posix(), size=len(CONTENT), segments=4)
+
+        assert not target.exists()
+        plan = json.loads(Path(tmpdir, 'file.dat.part.json').read_text())
+        assert plan['segments'][1] == [2560, 5120, 2560]
+        assert plan['segments'][0] == [0, 2560, 2560]
+
+    def test_failure_raises(self, tmpdir, segment_client):
+        with LocalServer(lambda request: (404, {}, b'')) as server:
+            with pytest.raises(DownloadError):
+                segment_client(server).download(DOWNLOAD_URL, (Path(tmpdir) / 'file.dat').as_posix())
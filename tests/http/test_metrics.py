@@ -0,0 +1,77 @@
+import time
+
+from gtagora.http.client import Client
+from gtagora.http.connection import ApiKeyConnection
+from gtagora.http.metrics import MetricsRegistry
+from gtagora.http.retry import RetryPolicy
+from tests.helper import LocalServer
+
+
+def handler(request):
+    if request.path.startswith('/api/v1/fail/'):
+        return 503, {}, b''
+    return 200, {}, b'0123456789'
+
+
+class TestMetricsRegistry:
+
+    def test_template(self):
+        assert MetricsRegistry.template('/api/v1/folder/12/items/?limit=5') == '/api/v1/folder/{id}/items/'
+        assert MetricsRegistry.template('http://agora/api/v2/timeline/3/') == '/api/v2/timeline/{id}/'
+        uuid_url = '/api/v1/import/8c3a2e3c-3f5c-4a55-9d5e-0e0f7a1b2c3d/'
+        assert MetricsRegistry.template(uuid_url) == '/api/v1/import/{id}/'
+        assert MetricsRegistry.template('/api/v1/user/current/') == '/api/v1/user/current/'
+
+    def test_snapshot(self):
+        metrics = MetricsRegistry(buckets=(0.1, 1))
+        metrics.record('get', '/api/v1/folder/1/', 0.05, status_code=200, bytes_received=10)
+        metrics.record('GET', '/api/v1/folder/2/', 0.5, status_code=404)
+        metrics.record('GET', '/api/v1/folder/2/', 5, error=True, retry=True)
+
+        snapshot = metrics.snapshot()['GET /api/v1/folder/{id}/']
+
+        assert snapshot['requests'] == 3
+        assert snapshot['status_codes'] == {200: 1, 404: 1}
+        assert snapshot['errors'] == 1
+        assert snapshot['retries'] == 1
+        assert snapshot['bytes_received'] == 10
+        assert snapshot['latency']['buckets'] == [(0.1, 1), (1, 2), (float('inf'), 3)]
+        assert snapshot['latency']['sum'] == 5.55
+
+    def test_prometheus(self):
+        metrics = MetricsRegistry(buckets=(0.1,))
+        metrics.record('GET', '/api/v1/folder/1/items/', 0.05, status_code=200, bytes_received=10)
+
+        text = metrics.to_prometheus()
+
+        labels = 'method="GET",endpoint="/api/v1/folder/{id}/items/"'
+        assert '# TYPE gtagora_http_requests_total counter' in text
+        assert f'gtagora_http_requests_total{{{labels},status="200"}} 1' in text
+        assert f'gtagora_http_received_bytes_total{{{labels}}} 10' in text
+        assert '# TYPE gtagora_http_request_duration_seconds histogram' in text
+        assert f'gtagora_http_request_duration_seconds_bucket{{{labels},le="0.1"}} 1' in text
+        assert f'gtagora_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+        assert f'gtagora_http_request_duration_seconds_count{{{labels}}} 1' in text
+        assert text.endswith('\n')
+
+
+class TestClientMetrics:
+
+    def test_requests_are_recorded(self, monkeypatch):
+        monkeypatch.setattr(time, 'sleep', lambda delay: None)
+        with LocalServer(handler) as server:
+            client = Client(ApiKeyConnection(server.url, api_key='key'), retry_policy=RetryPolicy(max_retries=2))
+            client.get('/api/v1/folder/1/items/')
+            client.get('/api/v1/folder/2/items/')
+            client.post('/api/v1/folder/2/new/', json={'name': 'abc'})
+            client.get('/api/v1/fail/')
+
+        snapshot = client.metrics.snapshot()
+        items = snapshot['GET /api/v1/folder/{id}/items/']
+        assert items['requests'] == 2
+        assert items['status_codes'] == {200: 2}
+        assert items['bytes_received'] == 20
+        assert items['latency']['count'] == 2
+        assert snapshot['POST /api/v1/folder/{id}/new/']['bytes_sent'] == len(b'{"name": "abc"}')
+        assert snapshot['GET /api/v1/fail/']['requests'] == 3
+        assert snapshot['GET /api/v1/fail/']['retries'] == 2
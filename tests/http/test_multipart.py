@@ -0,0 +1,103 @@
+import hashlib
+from email.parser import BytesParser
+from email.policy import HTTP
+from pathlib import Path
+
+import pytest
+
+from gtagora.http.client import Client
+from gtagora.http.connection import ApiKeyConnection
+from gtagora.http.multipart import MultipartChunkEncoder, StreamHash, sha256_range
+from gtagora.utils import UploadFile
+from tests.helper import LocalServer
+
+CONTENT = bytes(range(256)) * 40
+
+
+def parse_multipart(content_type, body):
+    message = BytesParser(policy=HTTP).parsebytes(f'Content-Type: {content_type}\r\n\r\n'.encode() + body)
+    return {part.get_param('name', header='content-disposition'): part for part in message.iter_parts()}
+
+
+@pytest.fixture()
+def data_file(tmpdir):
+    file = Path(tmpdir) / 'raw.dat'
+    file.write_bytes(CONTENT)
+    return file
+
+
+class TestMultipartChunkEncoder:
+
+    def test_body(self, data_file):
+        encoder = MultipartChunkEncoder({'flowChunkNumber': '2', 'description': ''}, 'file', 'raw.dat', data_file,
+                                        1000, 500)
+
+        body = encoder.read()
+
+        assert len(body) == len(encoder)
+        parts = parse_multipart(encoder.content_type, body)
+        assert parts['flowChunkNumber'].get_content() == '2'
+        assert parts['description'].get_content() == ''
+        assert parts['file'].get_filename() == 'raw.dat'
+        assert parts['file'].get_payload(decode=True) == CONTENT[1000:1500]
+
+    def test_small_reads_and_rewind(self, data_file):
+        encoder = MultipartChunkEncoder({'a': '1'}, 'file', 'raw.dat', data_file, 100, 3000, boundary='b')
+        body = encoder.read()
+
+        encoder.rewind()
+        blocks = []
+        while True:
+            block = encoder.read(7)
+            if not block:
+                break
+            assert len(block) <= 7
+            blocks.append(block)
+
+        assert b''.join(blocks) == body
+
+    def test_sha256_range(self, data_file):
+        assert sha256_range(data_file, 100, 3000, buffer_size=64) == hashlib.sha256(CONTENT[100:3100]).hexdigest()
+
+    def test_stream_hash_of_sent_chunks(self, data_file):
+        file_hash = StreamHash(data_file)
+        for offset in range(0, len(CONTENT), 4000):
+            encoder = MultipartChunkEncoder({}, 'file', 'raw.dat', data_file, offset, min(4000, len(CONTENT) - offset),
+                                            file_hash=file_hash)
+            encoder.read(1000)
+            # a chunk which is sent again is not hashed twice
+            encoder.rewind()
+            encoder.read()
+
+        assert file_hash.hexdigest() == hashlib.sha1(CONTENT).hexdigest()
+
+    def test_stream_hash_with_gap(self, data_file):
+        file_hash = StreamHash(data_file)
+        file_hash.update(0, CONTENT[:100])
+        file_hash.update(200, CONTENT[200:])
+
+        assert file_hash.hexdigest() is None
+
+    def test_upload_streams_chunks(self, data_file):
+        def handler(request):
+            return 200, {}, {'server': 'test'}
+
+        upload_file = UploadFile(id=0, file=data_file, target='raw.dat')
+        with LocalServer(handler) as server:
+            client = Client(ApiKeyConnection(server.url, api_key='key'))
+            client.UPLOAD_CHUCK_SIZE = 4000
+            client.upload('/api/v1/import/1/upload/', [upload_file], verify_hash=True)
+
+        chunks = [r for r in server.requests if r['method'] == 'POST']
+        assert len(chunks) == 3
+        data = b''
+        for chunk in chunks:
+            assert 'Transfer-Encoding' not in chunk['headers']
+            parts = parse_multipart(chunk['headers']['Content-Type'], chunk['body'])
+            payload = parts['file'].get_payload(decode=True)
+            assert parts['flowCurrentChunkSize'].get_content() == str(len(payload))
+            assert parts['flowFileContentHash'].get_content() == hashlib.sha256(payload).hexdigest()
+            data += payload
+        assert data == CONTENT
+        assert upload_file.uploaded
+        assert upload_file.sha1 == hashlib.sha1(CONTENT).hexdigest()
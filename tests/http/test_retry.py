@@ -0,0 +1,163 @@
+import socket
+import time
+from email.utils import formatdate
+from pathlib import Path
+
+import pytest
+import requests
+
+from gtagora.exception import AgoraException
+from gtagora.http.client import Client
+from gtagora.http.connection import ApiKeyConnection
+from gtagora.http.retry import RetryBudget, RetryPolicy
+from gtagora.utils import UploadFile
+from tests.helper import FakeResponse, LocalServer
+
+
+def failing_handler(statuses, headers=None):
+    statuses = list(statuses)
+
+    def handler(request):
+        status = statuses.pop(0) if statuses else 200
+        return status, headers if status != 200 and headers else {}, {'status': status}
+    return handler
+
+
+def create_client(server, **kwargs):
+    return Client(ApiKeyConnection(server.url, api_key='key'),
+                  retry_policy=RetryPolicy(backoff_base=0, **kwargs))
+
+
+class TestRetryPolicy:
+
+    def test_idempotent_methods_are_retried(self):
+        policy = RetryPolicy()
+
+        assert policy.should_retry('GET', 0, status_code=503)
+        assert policy.should_retry('DELETE', 0, error=ConnectionResetError())
+        assert not policy.should_retry('GET', 0, status_code=500)
+        assert not policy.should_retry('GET', 0, status_code=404)
+        assert not policy.should_retry('GET', 3, status_code=503)
+
+    def test_post_is_only_retried_if_it_was_not_processed(self):
+        policy = RetryPolicy()
+
+        assert not policy.should_retry('POST', 0, status_code=503)
+        assert not policy.should_retry('POST', 0, error=ConnectionResetError())
+        assert policy.should_retry('POST', 0, status_code=429)
+        assert policy.should_retry('POST', 0, error=ConnectionRefusedError(), connect_error=True)
+        assert policy.should_retry('POST', 0, status_code=503, idempotent=True)
+
+    def test_budget_limits_retries(self):
+        policy = RetryPolicy(budget=RetryBudget(ratio=0.5, capacity=2))
+
+        assert policy.should_retry('GET', 0, status_code=503)
+        assert policy.should_retry('GET', 0, status_code=503)
+        assert not policy.should_retry('GET', 0, status_code=503)
+
+        policy.on_request()
+        policy.on_request()
+        assert policy.should_retry('GET', 0, status_code=503)
+
+    def test_delay_has_jitter_and_is_capped(self):
+        policy = RetryPolicy(backoff_base=1, backoff_max=4)
+
+        delays = [policy.delay(retry) for retry in range(10) for _ in range(20)]
+
+        assert all(0 <= d <= 4 for d in delays)
+        assert len(set(delays)) > 1
+
+    def test_retry_after(self):
+        policy = RetryPolicy()
+
+        assert policy.delay(0, '7') == 7
+        assert policy.delay(0, '100000') == RetryPolicy.RETRY_AFTER_MAX
+        assert 8 <= policy.delay(0, formatdate(time.time() + 10, usegmt=True)) <= 10
+        assert 0 <= policy.delay(0, 'invalid') <= RetryPolicy.BACKOFF_BASE
+
+
+class TestClientRetry:
+
+    def test_get_is_retried(self):
+        with LocalServer(failing_handler([503, 502])) as server:
+            response = create_client(server).get('/api/v1/version/')
+
+        assert response.status_code == 200
+        assert len(server.requests) == 3
+
+    def test_retries_are_limited(self):
+        with LocalServer(failing_handler([503] * 10)) as server:
+            response = create_client(server, max_retries=2).get('/api/v1/version/')
+
+        assert response.status_code == 503
+        assert len(server.requests) == 3
+
+    def test_post_is_not_retried(self):
+        with LocalServer(failing_handler([502])) as server:
+            response = create_client(server).post('/api/v1/import/', json={})
+
+        assert response.status_code == 502
+        assert len(server.requests) == 1
+
+    def test_post_marked_idempotent_is_retried(self):
+        with LocalServer(failing_handler([502])) as server:
+            response = create_client(server).post('/api/v1/import/', json={'a': 1}, idempotent=True)
+
+        assert response.status_code == 200
+        assert [r['body'] for r in server.requests] == [b'{"a": 1}', b'{"a": 1}']
+
+    def test_retry_after_is_respected(self, monkeypatch):
+        delays = []
+        monkeypatch.setattr(time, 'sleep', delays.append)
+        with LocalServer(failing_handler([429], {'Retry-After': '3'})) as server:
+            response = create_client(server).post('/api/v1/import/', json={})
+
+        assert response.status_code == 200
+        assert delays == [3]
+
+    def test_connection_refused_is_a_connect_error(self):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        client = Client(ApiKeyConnection(f'http://127.0.0.1:{port}', api_key='key'),
+                        retry_policy=RetryPolicy(max_retries=0))
+
+        with pytest.raises(requests.exceptions.ConnectionError) as e:
+            client.post('/api/v1/import/', json={})
+
+        assert Client._is_connect_error(e.value)
+
+
+class TestUploadRetry:
+
+    def test_chunk_is_retried_on_server_error(self, http_client, tmpdir, monkeypatch):
+        monkeypatch.setattr(time, 'sleep', lambda delay: None)
+        file = Path(tmpdir) / 'raw.dat'
+        file.write_bytes(b'0123456789')
+        upload_file = UploadFile(id=0, file=file, target='raw.dat')
+        http_client.set_response('/api/v1/version/', FakeResponse(200, {'server': 'test'}))
+        responses = [FakeResponse(503, {}), FakeResponse(200, {})]
+        post = http_client.post
+
+        def flaky_post(url, **kwargs):
+            post(url, **kwargs)
+            return responses.pop(0)
+
+        http_client.post = flaky_post
+        http_client.upload('/api/v1/import/1/upload/', [upload_file])
+
+        assert upload_file.uploaded
+        assert len([r for r in http_client.requests if r['method'] == 'POST']) == 2
+
+    def test_chunk_gives_up_after_max_retries(self, http_client, tmpdir, monkeypatch):
+        monkeypatch.setattr(time, 'sleep', lambda delay: None)
+        file = Path(tmpdir) / 'raw.dat'
+        file.write_bytes(b'0123456789')
+        upload_file = UploadFile(id=0, file=file, target='raw.dat')
+        http_client.set_response('/api/v1/version/', FakeResponse(200, {'server': 'test'}))
+        http_client.set_response('/api/v1/import/1/upload/', FakeResponse(503, {}))
+
+        with pytest.raises(AgoraException):
+            http_client.upload('/api/v1/import/1/upload/', [upload_file], max_retries=3)
+
+        assert len([r for r in http_client.requests if r['method'] == 'POST']) == 3
@@ -0,0 +1,124 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from gtagora.exception import AgoraException
+from gtagora.utils import UploadFile
+from tests.helper import FakeResponse
+
+UPLOAD_URL = '/api/v1/import/1/upload/'
+
+
+@pytest.fixture()
+def upload_client(http_client):
+    http_client.UPLOAD_CHUCK_SIZE = 10
+    http_client.set_response('/api/v1/version/', FakeResponse(200, {'server': 'test'}))
+    http_client.set_response(UPLOAD_URL, FakeResponse(200, {}))
+    return http_client
+
+
+@pytest.fixture()
+def upload_file(tmpdir):
+    file = Path(tmpdir) / 'raw.dat'
+    file.write_bytes(b'0123456789' * 7 + b'0123')
+    return UploadFile(id=0, file=file, target='raw.dat')
+
+
+def chunk_posts(http_client):
+    return [r['data'].fields for r in http_client.requests if r['method'] == 'POST']
+
+
+class TestUpload:
+
+    def test_sequential(self, upload_client, upload_file):
+        upload_client.upload(UPLOAD_URL, [upload_file])
+
+        posts = chunk_posts(upload_client)
+        assert [p['flowChunkNumber'] for p in posts] == [str(i) for i in range(1, 9)]
+        assert posts[-1]['flowCurrentChunkSize'] == '4'
+        assert upload_file.nr_chunks == 8
+        assert upload_file.chunks_completed == 8
+        assert upload_file.size_uploaded == 74
+        assert upload_file.uploaded is True
+
+    def test_parallel_uploads_all_chunks(self, upload_client, upload_file):
+        upload_client.upload(UPLOAD_URL, [upload_file], parallel_chunks=3)
+
+        posts = chunk_posts(upload_client)
+        assert sorted(int(p['flowChunkNumber']) for p in posts) == list(range(1, 9))
+        assert len({p['flowIdentifier'] for p in posts}) == 1
+        assert upload_file.chunks_completed == 8
+        assert upload_file.size_uploaded == 74
+        assert upload_file.uploaded is True
+
+    def test_parallel_bounds_chunks_in_flight(self, upload_client, upload_file):
+        lock = threading.Lock()
+        in_flight = [0, 0]
+        post = upload_client.post
+
+        def slow_post(url, data=None, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return post(url, data=data, **kwargs)
+
+        upload_client.post = slow_post
+        upload_client.upload(UPLOAD_URL, [upload_file], parallel_chunks=3)
+
+        assert in_flight[1] == 3
+
+    def test_out_of_order_chunks_keep_resume_point(self, upload_client, upload_file):
+        post = upload_client.post
+
+        def slow_first_chunk(url, data=None, **kwargs):
+            if data.fields['flowChunkNumber'] == '1':
+                time.sleep(0.1)
+            return post(url, data=data, **kwargs)
+
+        resume_points = []
+        upload_client.post = slow_first_chunk
+        upload_client.upload(UPLOAD_URL, [upload_file], parallel_chunks=3,
+                             progress_callback=lambda f: resume_points.append(f.chunks_completed))
+
+        # chunk 2 and 3 finish before chunk 1, the resume point must not move before chunk 1 is done
+        assert resume_points == sorted(resume_points)
+        assert resume_points[-1] == 8
+        assert resume_points.count(0) > 1
+
+    def test_failed_chunk_stops_at_last_contiguous_chunk(self, upload_client, upload_file):
+        post = upload_client.post
+
+        def failing_chunk(url, data=None, **kwargs):
+            if data.fields['flowChunkNumber'] == '4':
+                return FakeResponse(500, {})
+            return post(url, data=data, **kwargs)
+
+        upload_client.post = failing_chunk
+        with pytest.raises(AgoraException):
+            upload_client.upload(UPLOAD_URL, [upload_file], parallel_chunks=2)
+
+        assert upload_file.chunks_completed == 3
+        assert upload_file.uploaded is False
+
+    def test_resume(self, upload_client, upload_file):
+        upload_file.identifier = 'resume-id'
+        upload_file.chunks_completed = 5
+        upload_file.size_uploaded = 70
+
+        upload_client.upload(UPLOAD_URL, [upload_file], parallel_chunks=2)
+
+        posts = chunk_posts(upload_client)
+        assert sorted(int(p['flowChunkNumber']) for p in posts) == [6, 7, 8]
+        assert {p['flowIdentifier'] for p in posts} == {'resume-id'}
+        assert upload_file.size_uploaded == 74
+
+    def test_temporary_zip_packages_are_not_hashed(self, upload_client, upload_file):
+        upload_file.temporary = True
+
+        assert upload_client._start_file_hash(upload_file) is None
+        assert upload_client._start_file_hash(UploadFile(id=1, file=upload_file.file, target='raw.dat')) is not None
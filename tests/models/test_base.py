@@ -31,4 +31,25 @@ class TestBase:
 
         assert isinstance(p, BaseModel)
         assert p.id == 1
-        assert p.name == "Daniel Smith"
\ No newline at end of file
+        assert p.name == "Daniel Smith"
+
+    def test_get_many(self, http_client):
+        from gtagora.exception import AgoraException
+        from gtagora.models.dataset import Dataset
+
+        for id in (1, 2):
+            http_client.set_response(f'/api/v1/dataset/{id}/', FakeResponse(200, {'id': id}))
+        http_client.set_next_response(FakeResponse(404, {}))
+
+        datasets, errors = Dataset.get_many([2, 1, 3, 2], max_workers=3, http_client=http_client)
+
+        assert [d.id if d else None for d in datasets] == [2, 1, None, 2]
+        assert datasets[0] is datasets[3]
+        assert all(isinstance(d, Dataset) for d in datasets if d)
+        assert list(errors) == [3]
+        assert isinstance(errors[3], AgoraException)
+        urls = sorted(r['url'] for r in http_client.requests)
+        assert urls == ['/api/v1/dataset/1/', '/api/v1/dataset/2/', '/api/v1/dataset/3/']
+
+    def test_get_many_empty(self, http_client):
+        assert BaseModel.get_many([], http_client=http_client) == ([], {})
@@ -0,0 +1,122 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+from gtagora.exception import DownloadError
+from gtagora.http.retry import RetryPolicy
+from gtagora.models.dataset import Dataset
+from gtagora.models.download_manager import DownloadManager, DownloadTask
+from gtagora.models.exam import Exam
+from gtagora.models.series import Series
+from tests.helper import FakeResponse
+
+
+def datafile(id, name, size=4):
+    return {'id': id, 'original_filename': name, 'size': size, 'sha1': ''}
+
+
+def fake_download(http_client, fail=None):
+    """Replaces the download of the client. fail maps a datafile id to the number of failing attempts"""
+    fail = dict(fail) if fail else {}
+    downloads = []
+    lock = threading.Lock()
+
+    def download(url, target_filename, size=None, segments=None):
+        id = int(url.split('/')[-3])
+        with lock:
+            downloads.append(id)
+            if fail.get(id, 0) > 0:
+                fail[id] -= 1
+                raise DownloadError(f'connection to {id} interrupted', transient=True)
+        Path(target_filename).write_bytes(b'x' * size)
+        return Path(target_filename)
+
+    http_client.download = download
+    http_client.retry_policy = RetryPolicy(backoff_base=0)
+    return downloads
+
+
+class TestDownloadManager:
+
+    def test_exam_is_planned_from_the_tree(self, http_client, tmpdir):
+        downloads = fake_download(http_client)
+        http_client.set_response('/api/v2/exam/1/tree/', FakeResponse(200, {
+            'id': 1, 'name': 'Brain', 'datasets': [{'id': 9, 'datafiles': [datafile(90, 'report.pdf')]}],
+            'series': [{'id': 5, 'name': 'T1:W', 'datasets': [{'id': 8, 'datafiles': [datafile(80, 'a.dcm'),
+                                                                                      datafile(81, 'b.dcm')]}]}]}))
+        exam = Exam.from_response({'id': 1, 'name': 'Brain'}, http_client=http_client)
+
+        progress = DownloadManager(http_client, max_workers=3).add_exam(exam, Path(tmpdir)).run()
+
+        assert sorted(downloads) == [80, 81, 90]
+        assert len(http_client.requests) == 1
+        assert (Path(tmpdir) / 'Brain' / 'T1W' / 'a.dcm').exists()
+        assert (Path(tmpdir) / 'Brain' / 'report.pdf').exists()
+        assert len(progress.downloaded) == 3
+        assert progress.downloaded_bytes == 12
+
+    def test_failed_files_are_retried(self, http_client, tmpdir):
+        downloads = fake_download(http_client, fail={1: 2})
+        dataset = Dataset.from_response({'id': 1, 'datafiles': [datafile(1, 'a'), datafile(2, 'b')]},
+                                        http_client=http_client)
+
+        progress = DownloadManager(http_client, max_retries=2).add_dataset(dataset, Path(tmpdir)).run()
+
+        assert sorted(downloads) == [1, 1, 1, 2]
+        assert len(progress.downloaded) == 2
+
+    def test_failures_are_summarized(self, http_client, tmpdir):
+        fake_download(http_client, fail={1: 5})
+        dataset = Dataset.from_response({'id': 1, 'datafiles': [datafile(1, 'a'), datafile(2, 'b')]},
+                                        http_client=http_client)
+        manager = DownloadManager(http_client, max_retries=1).add_dataset(dataset, Path(tmpdir))
+
+        with pytest.raises(DownloadError) as error:
+            manager.run()
+
+        assert 'connection to 1 interrupted' in str(error.value)
+        assert (Path(tmpdir) / 'b').exists()
+
+    def test_refused_files_are_not_retried(self, http_client, tmpdir):
+        downloads = fake_download(http_client)
+        errors = {1: DownloadError('Could not download: status = 404'), 2: PermissionError('read-only')}
+
+        def download(url, target_filename, size=None, segments=None):
+            id = int(url.split('/')[-3])
+            downloads.append(id)
+            raise errors[id]
+
+        http_client.download = download
+        dataset = Dataset.from_response({'id': 1, 'datafiles': [datafile(1, 'a'), datafile(2, 'b')]},
+                                        http_client=http_client)
+
+        progress = DownloadManager(http_client, max_retries=3).add_dataset(dataset, Path(tmpdir)).run(
+            raise_errors=False)
+
+        assert sorted(downloads) == [1, 2]
+        assert [task.attempts for task in progress.failed] == [1, 1]
+
+    def test_series_download_returns_the_paths_per_dataset(self, http_client, tmpdir):
+        fake_download(http_client)
+        series = Series._get_tree_from_data({'id': 5, 'datasets': [
+            {'id': 8, 'datafiles': [datafile(80, 'a.dcm'), datafile(81, 'b.dcm')]},
+            {'id': 9, 'datafiles': [datafile(90, 'c.dcm')]}]}, http_client=http_client)
+
+        paths = series.download(Path(tmpdir))
+
+        assert paths == [[Path(tmpdir) / 'a.dcm', Path(tmpdir) / 'b.dcm'], [Path(tmpdir) / 'c.dcm']]
+
+    def test_existing_files_are_skipped(self, http_client, tmpdir):
+        downloads = fake_download(http_client)
+        (Path(tmpdir) / 'a').write_bytes(b'1234')
+        dataset = Dataset.from_response({'id': 1, 'datafiles': [datafile(1, 'a'), datafile(2, 'b')]},
+                                        http_client=http_client)
+        reported = []
+
+        progress = DownloadManager(http_client, verify_sha1=False, progress_callback=lambda p: reported.append(
+            p.completed_files)).add_dataset(dataset, Path(tmpdir)).run(raise_errors=False)
+
+        assert downloads == [2]
+        assert [task.state for task in progress.tasks] == [DownloadTask.SKIPPED, DownloadTask.DOWNLOADED]
+        assert sorted(reported) == [1, 2]
@@ -68,3 +68,49 @@ class TestExam:
 
         with pytest.raises(AgoraException):
             Exam.get(999, http_client=http_client)
+
+    def test_relations(self, http_client):
+        http_client.set_response('/api/v1/exam/1/datarelations/', FakeResponse(200, [
+            {'from_object': {'object_id': 1, 'content_type': 'exam'},
+             'to_object': {'object_id': 5, 'content_type': 'serie'}},
+            {'from_object': {'object_id': 6, 'content_type': 'dataset'},
+             'to_object': {'object_id': 1, 'content_type': 'exam'}},
+            {'from_object': {'object_id': 1, 'content_type': 'exam'}, 'to_object': {'object_id': 2}},
+        ]))
+        http_client.set_response('/api/v1/serie/5/', FakeResponse(200, {'id': 5, 'name': 'T1'}))
+        http_client.set_response('/api/v1/dataset/6/', FakeResponse(200, {'id': 6, 'name': 'raw'}))
+        http_client.set_response('/api/v1/exam/2/', FakeResponse(200, {'id': 2, 'name': 'Follow up'}))
+        exam = Exam.from_response({'id': 1}, http_client=http_client)
+
+        related = exam.relations()
+
+        assert [(type(r).__name__, r.id, r.name) for r in related] == [
+            ('Series', 5, 'T1'), ('Dataset', 6, 'raw'), ('Exam', 2, 'Follow up')]
+
+    def test_relations_without_fetch(self, http_client):
+        http_client.set_response('/api/v1/exam/1/datarelations/', FakeResponse(200, [
+            {'from_object': {'object_id': 1, 'content_type': 'exam'},
+             'to_object': {'object_id': 5, 'content_type': 'serie'}},
+        ]))
+        exam = Exam.from_response({'id': 1}, http_client=http_client)
+
+        related = exam.relations(fetch=False)
+
+        assert isinstance(related[0], Series)
+        assert related[0].id == 5
+        assert len(http_client.requests) == 1
+
+    def test_relations_without_fetch_can_be_tagged(self, http_client):
+        http_client.set_response('/api/v1/exam/1/datarelations/', FakeResponse(200, [
+            {'from_object': {'object_id': 1, 'content_type': 'exam'},
+             'to_object': {'object_id': 5, 'content_type': 'serie', 'name': 'T1'}},
+        ]))
+        http_client.set_response('/api/v2/tag-instance/', FakeResponse(201, [{'id': 3, 'tagged_object_id': 5}]))
+        exam = Exam.from_response({'id': 1}, http_client=http_client)
+
+        series = exam.relations(fetch=False)[0]
+
+        assert series.name == 'T1'
+        assert series.content_type() == 'serie'
+        assert series.tag(7).id == 3
+        assert http_client.requests[-1]['data']['tagged_object_content_type'] == 'serie'
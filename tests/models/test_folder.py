@@ -1,6 +1,9 @@
+from pathlib import Path
+
 import pytest
 
 from gtagora.exception import AgoraException
+from gtagora.models.cache import FolderPathCache
 from gtagora.models.exam import Exam
 from gtagora.models.folder import Folder
 from gtagora.models.folder_item import FolderItem
@@ -47,3 +50,215 @@ class TestFolder:
 
         with pytest.raises(AgoraException):
             Folder.get(999, http_client=http_client)
+
+    # folder 1 contains folder 2 (with exam 10 and folder 4) and folder 3 (with dataset 20 and a link to folder 2)
+    FOLDERS = {
+        1: [('folder', {'id': 2, 'name': 'a'}), ('folder', {'id': 3, 'name': 'b'})],
+        2: [('exam', {'id': 10, 'name': 'Brain'}), ('folder', {'id': 4, 'name': 'c'})],
+        3: [('dataset', {'id': 20, 'name': 'raw'}), ('folder', {'id': 2, 'name': 'a'})],
+        4: [('serie', {'id': 30, 'name': 'T1'})],
+    }
+
+    def set_folder_items(self, http_client):
+        for id, items in self.FOLDERS.items():
+            for version in ('v1', 'v2'):
+                http_client.set_response(f'/api/{version}/folder/{id}/items/?limit=10000000000', FakeResponse(200, [
+                    {'content_type': content_type, 'content_object': content_object}
+                    for content_type, content_object in items
+                ]))
+
+    def folder_tree(self, id, visited=()):
+        items = []
+        for content_type, obj in self.FOLDERS[id]:
+            if content_type == 'folder' and obj['id'] not in visited:
+                obj = self.folder_tree(obj['id'], visited + (id, obj['id']))
+            items.append({'content_type': content_type, 'content_object': obj})
+        return {'id': id, 'items': items}
+
+    def test_walk(self, http_client):
+        self.set_folder_items(http_client)
+        folder = Folder.from_response({'id': 1}, http_client=http_client)
+
+        walked = [(f.id, [s.id for s in subfolders], [o.id for o in objects])
+                  for f, subfolders, objects in folder.walk(max_workers=3)]
+
+        assert walked == [(1, [2, 3], []), (2, [4], [10]), (3, [2], [20]), (4, [], [30])]
+
+    def test_walk_pruning(self, http_client):
+        self.set_folder_items(http_client)
+        folder = Folder.from_response({'id': 1}, http_client=http_client)
+
+        walked = []
+        for f, subfolders, objects in folder.walk(max_workers=1):
+            walked.append(f.id)
+            subfolders[:] = [s for s in subfolders if s.id != 2]
+
+        assert walked == [1, 3]
+
+    def test_walk_tree(self, http_client):
+        http_client.set_response('/api/v2/folder/1/tree/', FakeResponse(200, {'content_object': self.folder_tree(1)}))
+        folder = Folder.from_response({'id': 1}, http_client=http_client)
+
+        walked = [(f.id, [s.id for s in subfolders], [type(o).__name__ for o in objects])
+                  for f, subfolders, objects in folder.walk(use_tree=True)]
+
+        assert walked == [(1, [2, 3], []), (2, [4], ['Exam']), (3, [2], ['Dataset']), (4, [], ['Series'])]
+        assert len(http_client.requests) == 1
+
+    def test_recursive_getters(self, http_client):
+        self.set_folder_items(http_client)
+        folder = Folder.from_response({'id': 1}, http_client=http_client)
+
+        assert [f.id for f in folder.get_folders(recursive=True)] == [2, 3, 4, 2]
+        assert [e.id for e in folder.get_exams(recursive=True)] == [10]
+        assert [s.id for s in folder.get_series(recursive=True)] == [30]
+        assert [d.id for d in folder.get_datasets(recursive=True)] == [20]
+        assert folder.get_exams() == []
+        assert [f.id for f in folder.get_folders()] == [2, 3]
+
+    def set_breadcrumbs(self, http_client):
+        names = {1: 'root', 2: 'a', 3: 'b', 4: 'c'}
+        for id, path in {1: [1], 2: [1, 2], 3: [1, 3], 4: [1, 2, 4]}.items():
+            http_client.set_response(f'/api/v1/folder/{id}/breadcrumb/?limit=10000000000', FakeResponse(200, [
+                {'object_id': folder_id, 'name': names[folder_id]} for folder_id in path]))
+            http_client.set_response(f'/api/v2/folder/{id}/', FakeResponse(200, {'id': id, 'name': names[id]}))
+
+    def test_folder_path_cache(self, http_client):
+        http_client.folder_path_cache = FolderPathCache()
+        self.set_folder_items(http_client)
+        self.set_breadcrumbs(http_client)
+        folder = Folder.from_response({'id': 1}, http_client=http_client)
+
+        assert folder.get_folder('a/c').id == 4
+        assert folder.get_folder('a/c/..').id == 2
+        assert folder.get_folder('b/../a').id == 2
+        requests = len(http_client.requests)
+        assert folder.get_folder('a/c').id == 4
+        assert folder.get_or_create('a/c').id == 4
+        assert folder.get_folder('a/c/..').id == 2
+        assert folder.get_folder('b/../a').id == 2
+        assert folder.get_folder('a/c/../..').id == 1
+        assert len(http_client.requests) == requests
+
+    def test_folder_path_cache_keeps_the_parents_of_linked_folders(self, http_client):
+        http_client.folder_path_cache = FolderPathCache()
+        self.set_folder_items(http_client)
+        self.set_breadcrumbs(http_client)
+        a = Folder.from_response({'id': 2, 'name': 'a'}, http_client=http_client)
+        b = Folder.from_response({'id': 3, 'name': 'b'}, http_client=http_client)
+
+        assert a.path() == 'root/a'
+        assert b.path() == 'root/b'
+        # the folder a is linked into b as well
+        assert b.get_folder('a').id == 2
+
+        assert a.path() == 'root/a'
+        assert a.parent().id == 1
+        assert not a.is_subfolder_of(3)
+
+    def test_parent_path_without_cache(self, http_client):
+        http_client.set_response('/api/v1/folder/4/breadcrumb/?limit=10000000000', FakeResponse(200, [
+            {'object_id': 1, 'name': 'root'}, {'object_id': 2, 'name': 'a'}, {'object_id': 4, 'name': 'c'}]))
+        http_client.set_response('/api/v2/folder/1/', FakeResponse(200, {'id': 1, 'name': 'root'}))
+        folder = Folder.from_response({'id': 4}, http_client=http_client)
+
+        assert folder.get_folder('../..').id == 1
+        assert folder.get_folder('../../../..').id == 1
+        assert [r['url'] for r in http_client.requests][:2] == ['/api/v1/folder/4/breadcrumb/?limit=10000000000',
+                                                                '/api/v2/folder/1/']
+
+    def test_folder_path_cache_learns_created_folders(self, http_client):
+        http_client.folder_path_cache = FolderPathCache()
+        http_client.set_response('/api/v2/folder/1/items/?limit=10000000000', FakeResponse(200, []))
+        http_client.set_response('/api/v1/folder/1/new/',
+                                 FakeResponse(201, {'content_object': {'id': 7, 'name': 'new'}}))
+        folder = Folder.from_response({'id': 1}, http_client=http_client)
+
+        created = folder.get_or_create('new')
+        again = folder.get_or_create('new')
+
+        assert created is again
+        assert [r['method'] for r in http_client.requests] == ['GET', 'POST']
+
+    def test_folder_path_cache_forgets_deleted_folders(self, http_client):
+        http_client.folder_path_cache = FolderPathCache()
+        for id in (1, 7):
+            http_client.set_response(f'/api/v2/folder/{id}/items/?limit=10000000000', FakeResponse(200, []))
+        http_client.set_response('/api/v1/folder/1/new/', FakeResponse(201, {'content_object': {'id': 7, 'name': 'a'}}))
+        http_client.set_response('/api/v1/folder/7/new/', FakeResponse(201, {'content_object': {'id': 8, 'name': 'b'}}))
+        http_client.set_response('/api/v1/folderitem/delete_ids/', FakeResponse(200, {}))
+        folder = Folder.from_response({'id': 1}, http_client=http_client)
+        folder.get_or_create('a/b')
+
+        folder.delete_item([70])
+
+        assert http_client.folder_path_cache.get(1, 'a') is None
+        assert http_client.folder_path_cache.get(7, 'b') is None
+        assert len(http_client.folder_path_cache) == 1
+        folder.get_or_create('a')
+        assert [r['url'] for r in http_client.requests][-2:] == ['/api/v2/folder/1/items/?limit=10000000000',
+                                                                 '/api/v1/folder/1/new/']
+
+    def test_get_or_create_many(self, http_client):
+        self.set_folder_items(http_client)
+        created = []
+
+        def post(url, json=None, **kwargs):
+            parent = int(url.split('/')[-3])
+            created.append((parent, json['name']))
+            return FakeResponse(201, {'content_object': {'id': 100 + len(created), 'name': json['name']}})
+
+        http_client.post = post
+        folder = Folder.from_response({'id': 1}, http_client=http_client)
+
+        folders = folder.get_or_create_many(['a/c', 'a/new/x', Path('a/new/y'), 'b', 'other/z'], max_workers=4)
+
+        assert folders[Path('a/c')].id == 4
+        assert folders[Path('b')].id == 3
+        assert {f.name for p, f in folders.items() if str(p) in ('a/new/x', 'a/new/y', 'other/z')} == {'x', 'y', 'z'}
+        assert sorted(created[:2]) == [(1, 'other'), (2, 'new')]
+        assert sorted(name for _, name in created[2:]) == ['x', 'y', 'z']
+        assert sorted(r['url'] for r in http_client.requests) == ['/api/v2/folder/1/items/?limit=10000000000',
+                                                                  '/api/v2/folder/2/items/?limit=10000000000']
+
+    def test_get_or_create_many_parent_path(self, http_client):
+        folder = Folder.from_response({'id': 1}, http_client=http_client)
+
+        with pytest.raises(AgoraException):
+            folder.get_or_create_many(['a/../b'])
+
+    def test_breadcrumbs_are_cached(self, http_client):
+        http_client.folder_path_cache = FolderPathCache()
+        self.set_folder_items(http_client)
+        http_client.set_response('/api/v1/folder/4/breadcrumb/?limit=10000000000', FakeResponse(200, [
+            {'object_id': 1, 'name': 'root'}, {'object_id': 2, 'name': 'a'}, {'object_id': 4, 'name': 'c'}]))
+        folder = Folder.from_response({'id': 4, 'name': 'c'}, http_client=http_client)
+
+        assert folder.is_subfolder_of(2)
+        assert folder.path() == 'root/a/c'
+        assert not folder.is_subfolder_of(3)
+        assert len(http_client.requests) == 1
+
+        # the ancestors of c are known, the breadcrumb of a is answered from the cache
+        a = Folder.from_response({'id': 2, 'name': 'a'}, http_client=http_client)
+        assert [crumb.object_id for crumb in a.get_breadcrumb()] == [1, 2]
+        assert a.is_subfolder_of(1)
+        assert len(http_client.requests) == 1
+
+    def test_lightweight_listing(self, http_client):
+        http_client.set_response('/api/v2/folder/5/items/?limit=10000000000', FakeResponse(200, [
+            {'content_type': 'dataset', 'content_object': {'id': 8, 'name': 'raw', 'datafiles': [81, 82]}},
+        ]))
+        http_client.set_response('/api/v1/dataset/8/', FakeResponse(200, load_fixture('dataset/dataset.json')))
+        folder = Folder.from_response({'id': 5}, http_client=http_client)
+
+        dataset = folder.get_dataset('raw')
+        assert len(http_client.requests) == 1
+        assert not hasattr(dataset, 'datafiles')
+
+        datafiles = dataset.get_datafiles()
+        dataset.get_datafiles()
+
+        assert [d.original_filename for d in datafiles] == ['scan_001.dcm', 'scan_002.dcm']
+        assert [r['url'] for r in http_client.requests] == ['/api/v2/folder/5/items/?limit=10000000000',
+                                                            '/api/v1/dataset/8/']
@@ -0,0 +1,107 @@
+import time
+
+from gtagora.models.cache import IdentityMap
+from gtagora.models.dataset import Dataset
+from gtagora.models.exam import Exam
+from gtagora.models.folder import Folder
+from gtagora.models.task import Task
+from gtagora.models.timeline import TimelineItem
+from tests.helper import FakeResponse
+
+
+def get_requests(http_client):
+    return [r['url'] for r in http_client.requests if r['method'] == 'GET']
+
+
+class TestIdentityMap:
+
+    def test_get_is_not_cached_without_map(self, http_client):
+        http_client.set_next_response(FakeResponse(200, {'id': 1, 'name': 'Brain MRI'}))
+
+        Exam.get(1, http_client=http_client)
+        Exam.get(1, http_client=http_client)
+
+        assert len(get_requests(http_client)) == 2
+
+    def test_get_returns_the_same_instance(self, http_client):
+        http_client.identity_map = IdentityMap()
+        http_client.set_next_response(FakeResponse(200, {'id': 1, 'name': 'Brain MRI'}))
+
+        first = Exam.get(1, http_client=http_client)
+        second = Exam.get('1', http_client=http_client)
+        folder = Folder.get(1, http_client=http_client)
+
+        assert first is second
+        assert isinstance(folder, Folder)
+        assert get_requests(http_client) == ['/api/v1/exam/1/', '/api/v2/folder/1/']
+        assert http_client.identity_map.hits == 1
+
+    def test_expired_instances_are_requested_again(self, http_client, monkeypatch):
+        http_client.identity_map = IdentityMap(ttl=10)
+        http_client.set_next_response(FakeResponse(200, {'id': 1}))
+        now = time.monotonic()
+        monkeypatch.setattr(time, 'monotonic', lambda: now)
+
+        Exam.get(1, http_client=http_client)
+        monkeypatch.setattr(time, 'monotonic', lambda: now + 11)
+        Exam.get(1, http_client=http_client)
+
+        assert len(get_requests(http_client)) == 2
+        assert len(http_client.identity_map) == 1
+
+    def test_least_recently_used_instances_are_evicted(self, http_client):
+        http_client.identity_map = IdentityMap(max_size=2)
+        for id in (1, 2, 3):
+            http_client.set_response(f'/api/v1/exam/{id}/', FakeResponse(200, {'id': id}))
+
+        Exam.get(1, http_client=http_client)
+        Exam.get(2, http_client=http_client)
+        Exam.get(1, http_client=http_client)
+        Exam.get(3, http_client=http_client)
+        Exam.get(1, http_client=http_client)
+        Exam.get(2, http_client=http_client)
+
+        assert get_requests(http_client) == ['/api/v1/exam/1/', '/api/v1/exam/2/', '/api/v1/exam/3/',
+                                             '/api/v1/exam/2/']
+
+    def test_writes_invalidate(self, http_client):
+        http_client.identity_map = IdentityMap()
+        http_client.set_response('/api/v1/exam/1/', FakeResponse(200, {'id': 1, 'name': 'new'}))
+        http_client.set_response('/api/v1/dataset/4/', FakeResponse(204, {}), method='DELETE')
+        http_client.set_response('/api/v1/dataset/4/', FakeResponse(200, {'id': 4}), method='GET')
+
+        exam = Exam.get(1, http_client=http_client)
+        exam.set_name('new')
+        Exam.get(1, http_client=http_client)
+        dataset = Dataset.get(4, http_client=http_client)
+        dataset.delete()
+        Dataset.get(4, http_client=http_client)
+
+        assert get_requests(http_client) == ['/api/v1/exam/1/', '/api/v1/exam/1/', '/api/v1/dataset/4/',
+                                             '/api/v1/dataset/4/']
+
+    def test_polled_timeline_items_are_not_cached(self, http_client, monkeypatch):
+        monkeypatch.setattr(TimelineItem, 'TIMEOUT', 1)
+        http_client.identity_map = IdentityMap()
+        http_client.set_next_response(FakeResponse(200, {'id': 3, 'data': {'state': 1}}))
+        item = TimelineItem.get(3, http_client=http_client)
+        http_client.set_next_response(FakeResponse(200, {'id': 3, 'data': {'state': 2}}))
+
+        timeline = item.poll(interval=0)
+
+        assert timeline.data['state'] == 2
+        assert len(http_client.identity_map) == 0
+
+    def test_task_writes_invalidate(self, http_client):
+        http_client.identity_map = IdentityMap()
+        http_client.set_response('/api/v1/taskdefinition/2/', FakeResponse(200, {'id': 2, 'name': 'old'}), method='GET')
+        http_client.set_response('/api/v1/taskdefinition/2/', FakeResponse(200, {}), method='PUT')
+        http_client.set_response('/api/v1/taskdefinition/2/', FakeResponse(204, {}), method='DELETE')
+
+        task = Task.get(2, http_client=http_client)
+        task.save()
+        Task.get(2, http_client=http_client)
+        task.delete()
+        Task.get(2, http_client=http_client)
+
+        assert get_requests(http_client) == ['/api/v1/taskdefinition/2/'] * 3
@@ -0,0 +1,153 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from gtagora.exception import AgoraException
+from gtagora.models.import_package import ImportPackage
+from gtagora.models.upload_scheduler import ByteBudget, UploadScheduler
+from gtagora.utils import UploadFile, UploadState
+from tests.helper import FakeResponse
+
+UPLOAD_URL = '/api/v1/import/1/upload/'
+COMPLETE_URL = '/api/v1/import/1/complete/'
+
+
+@pytest.fixture()
+def import_package(http_client):
+    http_client.UPLOAD_CHUCK_SIZE = 64
+    http_client.set_response('/api/v1/version/', FakeResponse(200, {'server': 'test'}))
+    http_client.set_response(UPLOAD_URL, FakeResponse(200, {}))
+    http_client.set_response(COMPLETE_URL, FakeResponse(204, None))
+    return ImportPackage.from_response({'id': 1}, http_client=http_client)
+
+
+@pytest.fixture()
+def upload_state(tmpdir):
+    files = []
+    for index in range(8):
+        file = Path(tmpdir) / f'file_{index}.dcm'
+        file.write_bytes(bytes([index]) * (20 if index < 6 else 150))
+        files.append(UploadFile(id=index, file=file, target=file.name, zip=index < 6, size=file.stat().st_size))
+    return UploadState(import_package=1, files=files, wait=False)
+
+
+class TestUploadScheduler:
+
+    def test_runs_jobs_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def job(index):
+            # only returns when all three jobs run at the same time
+            barrier.wait()
+            return index
+
+        scheduler = UploadScheduler(workers=3, max_bytes=300)
+        for index in range(3):
+            scheduler.add(100, job, index)
+
+        assert scheduler.run() == [0, 1, 2]
+
+    def test_byte_budget_limits_running_jobs(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def job():
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+        scheduler = UploadScheduler(workers=4, max_bytes=250)
+        for _ in range(6):
+            scheduler.add(100, job)
+        scheduler.run()
+
+        assert running[1] == 2
+
+    def test_oversized_job_runs_alone(self):
+        budget = ByteBudget(100)
+
+        assert budget.acquire(1000) == 100
+        budget.release(100)
+        assert budget.used == 0
+
+    def test_first_error_is_raised_and_stops_pending_jobs(self):
+        started = []
+
+        def job(index):
+            started.append(index)
+            if index == 0:
+                raise AgoraException('upload failed')
+
+        scheduler = UploadScheduler(workers=1)
+        for index in range(5):
+            scheduler.add(10, job, index)
+
+        with pytest.raises(AgoraException):
+            scheduler.run()
+        assert started == [0]
+
+
+class TestImportPackageUpload:
+
+    def test_upload_from_state(self, import_package, upload_state, tmpdir):
+        progress_file = Path(tmpdir) / 'progress.json'
+
+        import_package.upload_from_state(upload_state, progress_file=progress_file, workers=3)
+
+        assert all(f.uploaded for f in upload_state.files)
+        saved = UploadState.from_file(progress_file)
+        assert all(f.uploaded for f in saved.files)
+        assert [f.chunks_completed for f in saved.files[6:]] == [3, 3]
+
+        http_client = import_package.http_client
+        posts = [r for r in http_client.requests if r['method'] == 'POST' and r['url'] == UPLOAD_URL]
+        uploaded_targets = {r['data'].fields['flowFilename'] for r in posts}
+        assert {'file_6.dcm', 'file_7.dcm'} <= uploaded_targets
+        assert len([t for t in uploaded_targets if t.endswith('.agora_upload')]) == 1
+        assert http_client.requests[-1]['url'] == COMPLETE_URL
+
+    def test_zip_packages_are_uploaded_concurrently(self, import_package, upload_state):
+        import_package.http_client.UPLOAD_CHUCK_SIZE = 20
+        # with a chunk size of 20 bytes every zip package gets 3 files
+        packages = import_package._create_zip_packages(upload_state)
+        assert len(packages) == 2
+
+        import_package.upload_from_state(upload_state, workers=2)
+
+        posts = [r['data'].fields for r in import_package.http_client.requests
+                 if r['method'] == 'POST' and r['url'] == UPLOAD_URL]
+        zip_identifiers = {p['flowIdentifier'] for p in posts if p['flowFilename'].endswith('.agora_upload')}
+        assert len(zip_identifiers) == 2
+        assert all(f.uploaded for f in upload_state.files)
+
+    def test_progress_callback_is_serialized(self, import_package, upload_state):
+        lock = threading.Lock()
+        calls = []
+
+        def progress(file):
+            assert lock.acquire(blocking=False)
+            calls.append(file.file)
+            time.sleep(0.001)
+            lock.release()
+
+        import_package.upload_from_state(upload_state, progress_callback_user=progress, workers=4)
+
+        assert calls
+
+
+class TestImportState:
+
+    def test_uploaded_sha1_is_compared_without_reading_the_files(self, import_package, upload_state, monkeypatch):
+        upload_state.files[6].sha1 = 'abc'
+        import_package.http_client.set_response('/api/v1/import/1/result/', FakeResponse(200, {'datafiles': [
+            {'path': 'file_6.dcm', 'sha1': 'abc'}, {'path': 'file_7.dcm', 'sha1': 'abc'}]}))
+        monkeypatch.setattr('gtagora.models.import_package.sha1', lambda path: 'read')
+
+        import_package._update_import_state(upload_state)
+
+        assert [f.imported for f in upload_state.files[6:]] == [True, False]
@@ -0,0 +1,189 @@
+import random
+import threading
+import time
+
+import pytest
+
+from gtagora.exception import AgoraException
+from gtagora.models.exam import Exam
+from gtagora.models.folder import Folder
+from gtagora.models.folder_item import FolderItem
+from gtagora.models.project import Project
+from gtagora.models.series import Series
+from tests.helper import FakeResponse
+
+
+def paginate(http_client, objects, paginated=True, delay=0, max_limit=None):
+    requests = []
+
+    def get(url, timeout=None, params=None, **kwargs):
+        requests.append((url, dict(params)))
+        if delay and params['offset']:
+            time.sleep(random.uniform(0, delay))
+        if not paginated:
+            return FakeResponse(200, objects)
+        limit, offset = params['limit'], params['offset']
+        # like the max_limit of a DRF LimitOffsetPagination
+        limit = min(limit, max_limit) if max_limit else limit
+        results = objects[offset:offset + limit]
+        has_next = offset + limit < len(objects)
+        return FakeResponse(200, {'count': len(objects), 'next': 'url' if has_next else None, 'previous': None,
+                                  'results': results})
+
+    http_client.get = get
+    return requests
+
+
+class TestPagination:
+
+    def test_pages_are_requested_lazily(self, http_client):
+        requests = paginate(http_client, [{'id': i, 'name': f'exam {i}'} for i in range(25)])
+        project = Project.from_response({'id': 3}, http_client=http_client)
+
+        exams = project.iter_exams(page_size=10, prefetch_pages=0)
+        first = next(exams)
+
+        assert isinstance(first, Exam)
+        assert first.http_client is http_client
+        assert len(requests) == 1
+        assert [e.id for e in exams] == list(range(1, 25))
+        assert requests == [('/api/v2/project/3/exam/', {'limit': 10, 'offset': 0}),
+                            ('/api/v2/project/3/exam/', {'limit': 10, 'offset': 10}),
+                            ('/api/v2/project/3/exam/', {'limit': 10, 'offset': 20})]
+
+    def test_filters_limit_and_offset(self, http_client):
+        requests = paginate(http_client, [{'id': i} for i in range(25)])
+        exam = Exam.from_response({'id': 1}, http_client=http_client)
+
+        series = list(exam.iter_series(filters={'name': 'T1', 'limit': 12, 'offset': 5}, page_size=10))
+
+        assert [s.id for s in series] == list(range(5, 17))
+        assert all(isinstance(s, Series) for s in series)
+        assert requests == [('/api/v1/exam/1/series/', {'name': 'T1', 'limit': 10, 'offset': 5}),
+                            ('/api/v1/exam/1/series/', {'name': 'T1', 'limit': 2, 'offset': 15})]
+
+    def test_iter_list(self, http_client):
+        requests = paginate(http_client, [{'id': i} for i in range(3)])
+
+        exams = list(Exam.iter_list(page_size=2, http_client=http_client))
+
+        assert [e.id for e in exams] == [0, 1, 2]
+        assert len(requests) == 2
+
+    def test_unpaginated_endpoint(self, http_client):
+        requests = paginate(http_client, [
+            {'id': 1, 'content_type': 'folder', 'content_object': {'id': 7, 'name': 'sub'}},
+            {'id': 2, 'content_type': 'folder'},
+        ], paginated=False)
+        folder = Folder.from_response({'id': 5}, http_client=http_client)
+
+        items = list(folder.iter_items(page_size=1))
+
+        assert len(items) == 1
+        assert isinstance(items[0], FolderItem)
+        assert items[0].object.name == 'sub'
+        assert len(requests) == 1
+
+    def test_iter_items(self, http_client):
+        requests = paginate(http_client, [
+            {'id': i, 'content_type': 'dataset', 'content_object': {'id': i, 'name': f'raw {i}', 'datafiles': [i]}}
+            for i in range(5)])
+        folder = Folder.from_response({'id': 5}, http_client=http_client)
+
+        items = folder.iter_items(page_size=2, prefetch_pages=0)
+        first = next(items)
+
+        assert first.object.name == 'raw 0'
+        assert first.object._lazy_datafiles
+        assert len(requests) == 1
+        assert [item.object.id for item in items] == [1, 2, 3, 4]
+        assert [r[0] for r in requests] == ['/api/v2/folder/5/items/'] * 3
+
+    def test_iter_search(self, http_client):
+        requests = paginate(http_client, [{'id': i} for i in range(3)])
+
+        series = list(Series.iter_search('brain', page_size=2, http_client=http_client))
+
+        assert [s.id for s in series] == [0, 1, 2]
+        assert requests[0] == ('/api/v1/serie/search/', {'q': 'brain', 'limit': 2, 'offset': 0})
+
+    def test_error(self, http_client):
+        http_client.set_next_response(FakeResponse(500, {}))
+        exam = Exam.from_response({'id': 1}, http_client=http_client)
+
+        with pytest.raises(AgoraException):
+            next(exam.iter_datasets())
+
+    def test_prefetch_keeps_the_order(self, http_client):
+        requests = paginate(http_client, [{'id': i} for i in range(95)], delay=0.01)
+        project = Project.from_response({'id': 3}, http_client=http_client)
+
+        exams = list(project.iter_exams(page_size=10, prefetch_pages=4))
+
+        assert [e.id for e in exams] == list(range(95))
+        assert sorted(r[1]['offset'] for r in requests) == list(range(0, 95, 10))
+
+    def test_prefetch_is_bounded(self, http_client):
+        paginate(http_client, [{'id': i} for i in range(200)])
+        get = http_client.get
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def slow_get(url, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return get(url, **kwargs)
+
+        http_client.get = slow_get
+        exams = list(Exam.iter_list(page_size=10, prefetch_pages=3, http_client=http_client))
+
+        assert len(exams) == 200
+        assert in_flight[1] <= 3
+
+    def test_prefetch_respects_limit(self, http_client):
+        requests = paginate(http_client, [{'id': i} for i in range(100)])
+        exam = Exam.from_response({'id': 1}, http_client=http_client)
+
+        series = list(exam.iter_series(filters={'limit': 25}, page_size=10, prefetch_pages=2))
+
+        assert [s.id for s in series] == list(range(25))
+        assert sorted((r[1]['offset'], r[1]['limit']) for r in requests) == [(0, 10), (10, 10), (20, 5)]
+
+    @pytest.mark.parametrize('prefetch_pages', [0, 3])
+    def test_server_caps_the_page_size(self, http_client, prefetch_pages):
+        requests = paginate(http_client, [{'id': i} for i in range(50)], max_limit=5)
+        project = Project.from_response({'id': 3}, http_client=http_client)
+
+        exams = list(project.iter_exams(page_size=10, prefetch_pages=prefetch_pages))
+
+        assert [e.id for e in exams] == list(range(50))
+        assert len(requests) == 10
+
+    def test_server_lowers_the_page_size_while_prefetching(self, http_client):
+        paginate(http_client, [{'id': i} for i in range(50)])
+        get = http_client.get
+
+        def capped_get(url, params=None, **kwargs):
+            # the first page is complete, the later ones are capped
+            if params['offset']:
+                params = {**params, 'limit': min(params['limit'], 4)}
+            return get(url, params=params, **kwargs)
+
+        http_client.get = capped_get
+        exams = list(Exam.iter_list(page_size=10, prefetch_pages=2, http_client=http_client))
+
+        assert [e.id for e in exams] == list(range(50))
+
+    def test_stopping_early_stops_prefetching(self, http_client):
+        requests = paginate(http_client, [{'id': i} for i in range(1000)])
+        project = Project.from_response({'id': 3}, http_client=http_client)
+
+        exams = project.iter_exams(page_size=10, prefetch_pages=2)
+        assert [next(exams).id for _ in range(15)] == list(range(15))
+        exams.close()
+
+        assert len(requests) <= 4
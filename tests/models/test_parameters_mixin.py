@@ -254,3 +254,56 @@ class TestParametersMixin:
         from gtagora.models.base import ParametersMixin
         assert issubclass(cls, ParametersMixin)
 
+    # ------------------------------------------------------------------
+    # the loaded parametersets are kept on the object
+    # ------------------------------------------------------------------
+
+    def set_parametersets(self, http_client, parameterset):
+        parameterset_list = load_fixture('parameterset/parameterset_list.json')
+        http_client.set_response(PARAMETERSET_LIST_URL, FakeResponse(200, parameterset_list))
+        http_client.set_response(PARAMETERSET_10_URL, FakeResponse(200, parameterset))
+        http_client.set_response(PARAMETERSET_11_URL,
+                                 FakeResponse(200, {'id': 11, 'name': 'DICOM Parameters', 'read_only': True}))
+
+    def test_get_parametersets_is_memoised(self, http_client):
+        self.set_parametersets(http_client, load_fixture('parameterset/parameterset.json'))
+
+        exam = Exam.from_response({'id': 1, 'name': 'Test Exam'}, http_client=http_client)
+        first = exam.get_parametersets()
+        second = exam.get_parametersets()
+        exam.get_parametersets(refresh=True)
+
+        assert [ps.id for ps in first] == [ps.id for ps in second] == [10, 11]
+        assert len(http_client.requests) == 6
+        assert '_parametersets' not in exam.to_dict()
+
+    def test_upserts_reuse_the_loaded_parametersets(self, http_client):
+        parameterset_full = load_fixture('parameterset/parameterset.json')
+        self.set_parametersets(http_client, parameterset_full)
+        http_client.set_next_response(FakeResponse(200, parameterset_full))
+
+        exam = Exam.from_response({'id': 1, 'name': 'Test Exam'}, http_client=http_client)
+        exam.set_parameters({'TR': 2.0})
+        exam.update_parameters({'TE': 0.05})
+
+        list_requests = [r for r in http_client.requests if r['url'] == PARAMETERSET_LIST_URL]
+        assert len(list_requests) == 1
+        assert len([r for r in http_client.requests if r['method'] == 'PATCH']) == 2
+
+    def test_update_parameters_merges_into_the_current_parameterset(self, http_client):
+        parameterset_full = load_fixture('parameterset/parameterset.json')
+        self.set_parametersets(http_client, parameterset_full)
+        exam = Exam.from_response({'id': 1, 'name': 'Test Exam'}, http_client=http_client)
+        exam.get_parametersets()
+
+        # another client adds a parameter after the parametersets were loaded
+        changed = dict(parameterset_full)
+        changed['parameters'] = parameterset_full['parameters'] + [{'Name': 'Flip', 'Value': 45}]
+        http_client.set_response(PARAMETERSET_10_URL, FakeResponse(200, changed))
+        http_client.set_next_response(FakeResponse(200, changed))
+        exam.update_parameters({'TE': 0.05})
+
+        patch_req = next(r for r in http_client.requests if r['method'] == 'PATCH')
+        sent_params = {p['Name']: p['Value'] for p in patch_req['data']['parameters']}
+        assert sent_params['Flip'] == 45
+        assert sent_params['TE'] == 0.05
@@ -35,3 +35,19 @@ class TestPatient:
         p = patient_list[2]
         assert p.id == 3
         assert p.name == "Stefan Meier"
+
+    def test_get_series_from_exam_trees(self, http_client):
+        http_client.set_response('/api/v1/patient/1/exams/?limit=10000000000',
+                                 FakeResponse(200, [{'id': 1}, {'id': 2}]))
+        for id in (1, 2):
+            http_client.set_response(f'/api/v2/exam/{id}/tree/', FakeResponse(200, {
+                'id': id, 'series': [{'id': id * 10, 'datasets': [{'id': id * 100}]}], 'datasets': []}))
+        patient = Patient.from_response({'id': 1}, http_client=http_client)
+
+        series = patient.get_series()
+        datasets = patient.get_datasets()
+
+        assert [s.id for s in series] == [10, 20]
+        assert [d.id for d in datasets] == [100, 200]
+        assert len([r for r in http_client.requests if 'tree' in r['url']]) == 4
+        assert not [r for r in http_client.requests if 'series' in r['url'] or 'datasets' in r['url']]
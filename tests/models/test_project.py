@@ -68,3 +68,30 @@ class TestProject:
 
         with pytest.raises(AgoraException):
             Project.get(999, http_client=http_client)
+
+    def test_get_exams_prefetch(self, http_client):
+        http_client.set_response('/api/v2/project/3/exam/?limit=10000000000', FakeResponse(200, [{'id': 1}, {'id': 2}]))
+        http_client.set_response('/api/v2/project/3/tree/', FakeResponse(200, [
+            {'id': 1, 'name': 'Brain', 'series': [{'id': 5, 'name': 'T1', 'datasets': [{'id': 8}]}],
+             'datasets': [{'id': 9}]},
+            {'id': 2, 'name': 'Knee', 'series': [], 'datasets': []},
+        ]))
+        project = Project.from_response({'id': 3}, http_client=http_client)
+
+        exams = project.get_exams(prefetch=['series', 'datasets'])
+        series = exams[0].get_series()
+
+        assert [s.id for s in series] == [5]
+        assert [d.id for d in series[0].get_datasets()] == [8]
+        assert [d.id for d in exams[0].get_files()] == [9]
+        assert sorted(d.id for d in exams[0].get_datasets()) == [8, 9]
+        assert exams[1].get_series() == []
+        assert [r['url'] for r in http_client.requests] == ['/api/v2/project/3/exam/?limit=10000000000',
+                                                            '/api/v2/project/3/tree/']
+
+    def test_get_exams_prefetch_unknown_relation(self, http_client):
+        http_client.set_next_response(FakeResponse(200, []))
+        project = Project.from_response({'id': 3}, http_client=http_client)
+
+        with pytest.raises(AgoraException):
+            project.get_exams(prefetch=['tasks'])
@@ -0,0 +1,85 @@
+import hashlib
+import os
+
+import pytest
+
+from gtagora.hash_index import HashIndex, set_hash_index
+from gtagora.models.datafile import Datafile
+from gtagora.utils import sha1, sha256
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = HashIndex(tmp_path / 'index.sqlite')
+    set_hash_index(index)
+    yield index
+    set_hash_index(None)
+    index.close()
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(b'agora' * 100)
+    return path
+
+
+class TestHashIndex:
+
+    def test_unchanged_files_are_not_read_again(self, index, data_file, monkeypatch):
+        expected = hashlib.sha1(data_file.read_bytes()).hexdigest()
+        assert sha1(data_file) == expected
+
+        monkeypatch.setattr(type(data_file), 'open', lambda *args, **kwargs: pytest.fail('file was read'))
+        assert sha1(data_file) == expected
+        assert index.hits == 1
+
+    def test_algorithms_are_stored_separately(self, index, data_file):
+        assert sha1(data_file) == hashlib.sha1(data_file.read_bytes()).hexdigest()
+        assert sha256(data_file) == hashlib.sha256(data_file.read_bytes()).hexdigest()
+        assert len(index) == 2
+
+    def test_changed_files_are_hashed_again(self, index, data_file):
+        sha1(data_file)
+        stat = data_file.stat()
+        data_file.write_bytes(b'AGORA' * 100)
+        os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        assert sha1(data_file) == hashlib.sha1(b'AGORA' * 100).hexdigest()
+        assert index.hits == 0
+
+    def test_index_is_kept_between_runs(self, tmp_path, data_file):
+        first = HashIndex(tmp_path / 'index.sqlite')
+        first.put(data_file, 'sha1', 'abc')
+        first.close()
+
+        second = HashIndex(tmp_path / 'index.sqlite')
+        assert second.get(data_file, 'sha1') == 'abc'
+        second.close()
+
+    def test_files_changed_while_hashing_are_not_stored(self, index, data_file):
+        stat = data_file.stat()
+        data_file.write_bytes(b'changed')
+        os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        assert not index.put(data_file, 'sha1', 'abc', stat=stat)
+        assert len(index) == 0
+
+    def test_downloaded_files_are_remembered(self, index, data_file):
+        datafile = Datafile.from_response({'id': 1, 'original_filename': data_file.name,
+                                           'size': data_file.stat().st_size,
+                                           'sha1': hashlib.sha1(data_file.read_bytes()).hexdigest()})
+
+        assert datafile.remember_hash(data_file)
+
+        assert datafile.check_for_existing_file(data_file)
+        assert index.hits == 1
+
+    def test_corrupted_downloads_are_not_trusted(self, index, data_file):
+        datafile = Datafile.from_response({'id': 1, 'original_filename': data_file.name,
+                                           'size': data_file.stat().st_size, 'sha1': 'abc'})
+
+        assert not datafile.remember_hash(data_file)
+
+        assert not datafile.check_for_existing_file(data_file)
+        assert not datafile.check_for_existing_file(data_file)
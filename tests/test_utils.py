@@ -1,3 +1,4 @@
+import hashlib
 import zipfile
 from pathlib import Path
 
@@ -35,9 +36,13 @@ class TestZipUploadFiles:
         assert result[0].file == Path(upload_path, 'upload_0.agora_upload')
         assert result[0].target == 'upload_0.agora_upload'
 
+        assert result[0].temporary
         with zipfile.ZipFile(result[0].file, 'r') as z:
             assert len(z.infolist()) == 25
             assert [info.filename for info in z.infolist()] == test_data.target_files
+            for file in upload_files:
+                assert file.sha1 == hashlib.sha1(z.read(file.target)).hexdigest()
+                assert file.sha1 == hashlib.sha1(file.file.read_bytes()).hexdigest()
 
     def test_create_zip_2(self, zip_upload_files_test_data):
         test_data = zip_upload_files_test_data